@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+#: Cached response. `content` is the response body text, decoded again on each cache hit.
+CacheEntry = namedtuple('CacheEntry', ['etag', 'last_modified', 'content'])
+
+
+class ResponseCache(object):
+    """
+    Least recently used cache of GET responses.
+    Entries are stored with ETag and Last-Modified validators and are revalidated by the server on each request.
+    """
+
+    def __init__(self, max_entries=1000):
+        #: `int` maximum number of cached responses
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path, params):
+        return path, tuple(sorted((k, str(v)) for k, v in params.items())) if params else ()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, etag, last_modified, content):
+        with self._lock:
+            self._entries[key] = CacheEntry(etag, last_modified, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class WriteCache(object):
+    """
+    Digests of recently inserted records. A record is unchanged if its digest is equal to the stored digest
+    and the digest is stored less than ttl seconds ago, otherwise the record has to be sent again.
+    """
+
+    def __init__(self, ttl=3600, max_entries=100000):
+        #: `Number` seconds after which unchanged records are sent again
+        self.ttl = ttl
+        #: `int` maximum number of stored digests
+        self.max_entries = max_entries
+        #: `OrderedDict` of key: (digest, time stored)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def changed(self, key, digest, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry is None or entry[0] != digest or now - entry[1] >= self.ttl
+
+    def put(self, key, digest, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[key] = (digest, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -14,10 +14,14 @@ on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
 express or implied. See the License for the specific language governing
 permissions and limitations under the License.
 """
-import logging, requests, sys
+import json as json_module
+import logging, os, requests, sys, time, types
+from contextlib import contextmanager
 from requests.compat import urljoin
 from . import _jsonutil
+from ._cache import ResponseCache
 from .exceptions import ServerException
+from .instrumentation import Instrumentation, RequestRecord, HOOK_EVENTS
 import datetime
 
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
@@ -35,13 +39,15 @@ class Client(object):
 
     def __init__(self, base_url,
                  username=None, password=None,
-                 ssl_verify=False, timeout=None):
+                 ssl_verify=False, timeout=None, cache_size=1000, request_id_header='X-Request-ID'):
         """
         :param base_url: ATSD url
         :param username: login
         :param password:
         :param ssl_verify: verify ssl certificate
         :param timeout: request timeout
+        :param cache_size: maximum number of responses stored for conditional GET requests
+        :param request_id_header: name of the header with the request identifier, None to omit the header
         """
         logging.debug('Connecting to ATSD at %s as %s user.' % (base_url, username))
         self.context = urljoin(base_url, 'api/')
@@ -54,35 +60,160 @@ class Client(object):
         self.timeout = int(timeout) if timeout is not None else None
         self.client_version = sys.modules[_jsonutil.__package__].__version__
         self.python_version = sys.version_info[:3]
+        self.response_cache = ResponseCache(int(cache_size))
+        #: :class:`.Instrumentation` request statistics by endpoint
+        self.instrumentation = Instrumentation()
+        self.request_id_header = request_id_header
+        #: `dict` of hook event: `list` of functions
+        self.hooks = {event: [] for event in HOOK_EVENTS}
 
-    def _request(self, method, path, params=None, json=None, data=None, portal=False, portal_file=None):
+    def stats(self):
+        """
+        :return: `dict` of (method, endpoint template): :class:`.EndpointStats` for requests sent by the client
+        """
+        return self.instrumentation.snapshot()
+
+    def add_hook(self, event, hook):
+        """Register a function called with the :class:`.RequestRecord` of each request at the lifecycle event:
+
+        - before_serialize: before the request payload is encoded, `payload` is set
+        - before_send: before the request is sent, `request` is the prepared request and can be modified
+        - after_receive: when the response status and headers are received, `response` is set
+        - after_decode: after the response body is decoded, `content` is set
+        - on_error: if the request failed, `error` is set
+
+        Exceptions raised by hooks are logged and do not interrupt the request.
+
+        :param event: `str` one of :data:`.HOOK_EVENTS`
+        :param hook: callable
+        """
+        if event not in self.hooks:
+            raise ValueError('Unknown hook event: %s, expected one of: %s' % (event, ', '.join(HOOK_EVENTS)))
+        self.hooks[event].append(hook)
+
+    def remove_hook(self, event, hook):
+        self.hooks[event].remove(hook)
+
+    def _call_hooks(self, event, record):
+        for hook in self.hooks[event]:
+            try:
+                hook(record)
+            except Exception as e:
+                logging.warning('Hook %s failed for %s %s: %s', event, record.method, record.path, e)
+
+    @contextmanager
+    def _instrument(self, method, path):
+        record = RequestRecord(method, path)
+        try:
+            yield record
+        except Exception as e:
+            record.error = e
+            record.latency = time.perf_counter() - record.start
+            self._call_hooks('on_error', record)
+            raise
+        finally:
+            record.latency = time.perf_counter() - record.start
+            self.instrumentation.add(record)
+
+    def _decode(self, response, record):
+        started = time.perf_counter()
+        try:
+            record.content = response.json()
+        except ValueError:
+            record.content = response.text
+        record.decode_time += time.perf_counter() - started
+        self._call_hooks('after_decode', record)
+        return record.content
+
+    def _decode_text(self, text, record):
+        started = time.perf_counter()
+        try:
+            record.content = json_module.loads(text)
+        except ValueError:
+            record.content = text
+        record.decode_time += time.perf_counter() - started
+        self._call_hooks('after_decode', record)
+        return record.content
+
+    def _send(self, record, params=None, json=None, data=None, headers=None, stream=False, timeout=None):
+        record.payload = json if data is None else data
+        self._call_hooks('before_serialize', record)
+        started = time.perf_counter()
+        if isinstance(data, types.GeneratorType):
+            data = _counted(data, record)
+        request_headers = {
+            'user-agent': 'atsd-api-python/{} python/{}.{}.{}'.format(self.client_version, *self.python_version)}
+        if self.request_id_header is not None:
+            request_headers[self.request_id_header] = record.request_id
+        if headers is not None:
+            request_headers.update(headers)
         request = requests.Request(
-            method=method,
-            url=urljoin(self.context, path),
+            method=record.method,
+            url=urljoin(self.context, record.path),
             data=data,
             json=_jsonutil.serialize(json),
             params=params,
-            headers={
-                'user-agent': 'atsd-api-python/{} python/{}.{}.{}'.format(self.client_version, *self.python_version)}
+            headers=request_headers
         )
         prepared_request = self.session.prepare_request(request)
-        response = self.session.send(prepared_request, timeout=self.timeout, stream=portal)
-        if not (200 <= response.status_code < 300):
-            raise ServerException(response.status_code, response.text)
-        try:
-            if portal:
-                if not portal_file:
-                    portal_name = response.headers.get("Content-Disposition").split("\"")[1]
-                    file_name = {"name": portal_name.split(".")[0],
-                                 "entity": "" if params["entity"] is None else "_{}".format(params["entity"]),
-                                 "date": datetime.datetime.now().strftime("%Y%m%d")}
-                    portal_file = "{name}{entity}_{date}.png".format(**file_name)
-                image = response.raw.read()
-                with open(portal_file, 'wb') as f:
-                    f.write(image)
-            return response.json()
-        except ValueError:
-            return response.text
+        record.serialize_time += time.perf_counter() - started
+        if isinstance(prepared_request.body, (str, bytes)):
+            record.request_bytes += len(prepared_request.body)
+        record.request = prepared_request
+        self._call_hooks('before_send', record)
+        started = time.perf_counter()
+        response = self.session.send(prepared_request, timeout=self.timeout if timeout is None else timeout,
+                                     stream=stream)
+        record.send_time = time.perf_counter() - started
+        record.status_code = response.status_code
+        if not stream:
+            record.response_bytes += len(response.content)
+        record.response = response
+        self._call_hooks('after_receive', record)
+        return response
+
+    def _request(self, method, path, params=None, json=None, data=None, portal=False, portal_file=None, headers=None):
+        if portal:
+            return self.download(path, params, portal_file)
+        with self._instrument(method, path) as record:
+            response = self._send(record, params=params, json=json, data=data, headers=headers)
+            if not (200 <= response.status_code < 300):
+                raise ServerException(response.status_code, response.text)
+            return self._decode(response, record)
+
+    def download(self, path, params=None, file=None, chunk_size=65536, timeout=None):
+        """
+        GET request with the response body written to a file in chunks as it is received.
+
+        :param file: `str` file name | file object opened in binary mode.
+        Default: portal name from the Content-Disposition header, entity name and current date.
+        A file specified by name is replaced only when the download completes.
+        :param chunk_size: `int` maximum number of bytes read at once
+        :param timeout: `Number` request timeout in seconds. Default: client timeout
+        :return: file name | file object
+        """
+        with self._instrument('GET', path) as record:
+            response = self._send(record, params=params, stream=True, timeout=timeout)
+            try:
+                if not (200 <= response.status_code < 300):
+                    raise ServerException(response.status_code, response.text)
+                if file is None:
+                    file = _portal_file_name(response, params)
+                if not isinstance(file, str):
+                    _write_chunks(response, file, chunk_size, record)
+                    return file
+                part_file = file + '.part'
+                try:
+                    with open(part_file, 'wb') as f:
+                        _write_chunks(response, f, chunk_size, record)
+                    os.replace(part_file, file)
+                except BaseException:
+                    if os.path.exists(part_file):
+                        os.remove(part_file)
+                    raise
+                return file
+            finally:
+                response.close()
 
     def post(self, path, data, params=None):
         return self._request('POST', path, params=params, json=data)
@@ -90,12 +221,42 @@ class Client(object):
     def post_plain_text(self, path, data, params=None):
         return self._request('POST', path, params=params, data=data)
 
+    def post_csv(self, path, data, params=None):
+        return self._request('POST', path, params=params, data=data, headers={'Content-Type': 'text/csv'})
+
     def patch(self, path, data):
         return self._request('PATCH', path, json=data)
 
     def get(self, path, params=None, portal=False, portal_file=None):
         return self._request('GET', path, params=params, portal=portal, portal_file=portal_file)
 
+    def get_cached(self, path, params=None):
+        """
+        GET request revalidated against the response cache.
+        Cached response is returned if the server replies 304 Not Modified to If-None-Match or If-Modified-Since.
+        """
+        key = self.response_cache.key(path, params)
+        entry = self.response_cache.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+        with self._instrument('GET', path) as record:
+            response = self._send(record, params=params, headers=headers)
+            if response.status_code == 304 and entry is not None:
+                # The response body is cached, each caller receives a new decoded copy
+                return self._decode_text(entry.content, record)
+            if not (200 <= response.status_code < 300):
+                raise ServerException(response.status_code, response.text)
+            content = self._decode_text(response.text, record)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag is not None or last_modified is not None:
+            self.response_cache.put(key, etag, last_modified, response.text)
+        return content
+
     def put(self, path, data):
         return self._request('PUT', path, json=data)
 
@@ -104,3 +265,24 @@ class Client(object):
 
     def close(self):
         self.session.close()
+
+
+def _portal_file_name(response, params):
+    portal_name = response.headers.get("Content-Disposition").split("\"")[1]
+    entity = (params or {}).get("entity")
+    file_name = {"name": portal_name.split(".")[0],
+                 "entity": "" if entity is None else "_{}".format(entity),
+                 "date": datetime.datetime.now().strftime("%Y%m%d")}
+    return "{name}{entity}_{date}.png".format(**file_name)
+
+
+def _write_chunks(response, f, chunk_size, record):
+    for chunk in response.iter_content(chunk_size):
+        record.response_bytes += len(chunk)
+        f.write(chunk)
+
+
+def _counted(chunks, record):
+    for chunk in chunks:
+        record.request_bytes += len(chunk)
+        yield chunk
@@ -6,9 +6,12 @@ display_series_part = 10
 #---------------------------------------------Data
 series_insert_url            = 'v1/series/insert'
 series_query_url             = 'v1/series/query'
+series_csv_insert_url        = 'v1/series/csv/{entity}'
+series_url_query_url         = 'v1/series/{format}/{entity}/{metric}'
 properties_insert_url        = 'v1/properties/insert'
 properties_query_url         = 'v1/properties/query'
 properties_types_url         = 'v1/properties/{entity}/types'
+properties_url_query_url     = 'v1/properties/{entity}/types/{type}'
 properties_delete_url        = 'v1/properties/delete'
 alerts_query_url             = 'v1/alerts/query'
 alerts_update_url            = 'v1/alerts/update'
@@ -53,7 +53,7 @@ def to_date(time):
 
 def to_iso(date):
     """
-    :param date: :class:`datetime` | `str`
+    :param date: :class:`datetime` | `str` | `int` milliseconds
     :return: `str`
     """
     if date is None:
@@ -62,6 +62,10 @@ def to_iso(date):
     if isinstance(date, (bytes, str)):
         return date
 
+    if isinstance(date, numbers.Number):
+        ms = int(date)
+        date = pytz.utc.localize(datetime.utcfromtimestamp(ms // 1000)).replace(microsecond=ms % 1000 * 1000)
+
     if date.tzinfo is None:
         date = get_localzone().localize(date)
     microsecond = date.microsecond
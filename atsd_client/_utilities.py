@@ -1,3 +1,6 @@
+from itertools import islice
+
+
 def copy_not_empty_attrs(src, dst):
     if src is not None and dst is not None:
         for attribute in src.__dict__:
@@ -12,3 +15,15 @@ class NoneDict(dict):
 
     def __getitem__(self, key):
         return dict.get(self, key)
+
+
+def chunked(iterable, size):
+    """
+    Split iterable into lists of at most size elements.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+from ._aggregate import aggregate, aggregate_arrays
+from ._anomaly import Anomaly, MaxDeltaDetector, ZScoreDetector, MadDetector, EwmaDetector, detect, insert_messages
+from ._columnar import series_arrays, to_series
+from ._gaps import Gap, Violation, find_gaps, find_violations, gap_arrays, schedule_positions
+from ._interpolate import interpolate, interpolate_arrays, align
+from ._periods import Period
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import numpy as np
+
+from ._columnar import series_arrays, to_series
+from ._periods import Period
+from .._time_utilities import to_milliseconds
+from ..models import Aggregate, AggregateType
+
+_percentiles = {
+    AggregateType.PERCENTILE_999: 99.9,
+    AggregateType.PERCENTILE_995: 99.5,
+    AggregateType.PERCENTILE_99: 99.0,
+    AggregateType.PERCENTILE_95: 95.0,
+    AggregateType.PERCENTILE_90: 90.0,
+    AggregateType.PERCENTILE_75: 75.0,
+    AggregateType.PERCENTILE_50: 50.0,
+    AggregateType.MEDIAN: 50.0,
+}
+
+_threshold_types = (AggregateType.THRESHOLD_COUNT, AggregateType.THRESHOLD_DURATION, AggregateType.THRESHOLD_PERCENT)
+
+
+def aggregate(series, aggregate, start_date=None, end_date=None, timezone=None):
+    """Aggregate series locally, the same way the server aggregates series when a query contains aggregate settings.
+    Each aggregation type produces a separate series with `aggregate` attribute, for example
+    ``{'type': 'AVG', 'period': {'count': 1, 'unit': 'HOUR'}}``. Periods without samples are not returned.
+    Interpolation, calendar and working minutes settings are not supported.
+
+    :param series: :class:`.Series` | `list` of :class:`.Series`
+    :param aggregate: :class:`.Aggregate` | `dict` with types, period and optional threshold keys
+    :param start_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date.
+    Samples before the start date are ignored, required for START_TIME alignment
+    :param end_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date.
+    Samples at or after the end date are ignored, required for END_TIME alignment
+    :param timezone: `str` timezone of calendar aligned periods unless the period specifies it. Default: UTC
+    :return: `list` of :class:`.Series`
+    """
+    if not isinstance(series, (list, tuple)):
+        series = [series]
+    if isinstance(aggregate, Aggregate):
+        aggregate = vars(aggregate)
+    types = aggregate.get('types', [AggregateType.DETAIL])
+    period = aggregate.get('period')
+    start = None if start_date is None else int(to_milliseconds(start_date))
+    end = None if end_date is None else int(to_milliseconds(end_date))
+    result = []
+    for s in series:
+        times, values = series_arrays(s)
+        aggregated = aggregate_arrays(times, values, period, types, aggregate.get('threshold'), start, end, timezone)
+        for typ in types:
+            attributes = {'type': typ}
+            if period is not None:
+                attributes['period'] = dict(period)
+            agg_times, agg_values = aggregated[typ]
+            result.append(to_series(s, agg_times, agg_values, aggregate=attributes))
+    return result
+
+
+def aggregate_arrays(times, values, period, types, threshold=None, start=None, end=None, timezone=None):
+    """Aggregate arrays of sorted sample times and values.
+
+    :param times: `numpy.ndarray` sorted times in milliseconds
+    :param values: `numpy.ndarray` values, NaN values are ignored
+    :param period: :class:`.Period` | `dict` with count, unit and optional align and timezone keys.
+    If None, all samples are aggregated into one period which starts at start or at the first sample
+    :param types: `list` of :class:`.AggregateType` values
+    :param threshold: `dict` with min and max keys, required for THRESHOLD_* types
+    :param start: `int` start time in milliseconds
+    :param end: `int` end time in milliseconds
+    :param timezone: `str` default timezone of calendar aligned periods
+    :return: `dict` of aggregation type: `tuple` of period start times and aggregated values arrays
+    """
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    mask = ~np.isnan(values)
+    if start is not None:
+        mask &= times >= start
+    if end is not None:
+        mask &= times < end
+    times = times[mask]
+    values = values[mask]
+
+    if len(times) == 0:
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+        return {typ: empty for typ in types}
+
+    if period is None:
+        period_starts = np.full(len(times), times[0] if start is None else start, dtype=np.int64)
+    else:
+        period = Period.of(period, timezone)
+        period_starts = period.floor(times, start, end)
+    first_index = np.flatnonzero(np.r_[True, period_starts[1:] != period_starts[:-1]])
+    groups = _Groups(times, values, period_starts[first_index], first_index)
+    if period is None:
+        groups.ends = np.array([times[-1] + 1 if end is None else end], dtype=np.int64)
+    else:
+        groups.ends = period.next(groups.starts)
+        if end is not None:
+            groups.ends = np.minimum(groups.ends, end)
+
+    result = {}
+    for typ in types:
+        if typ == AggregateType.DETAIL:
+            result[typ] = (times, values)
+            continue
+        if typ in _threshold_types:
+            if threshold is None:
+                raise ValueError('Threshold is required for ' + typ + ' aggregation')
+            aggregated = groups.threshold(typ, threshold.get('min'), threshold.get('max'))
+        elif typ in _percentiles:
+            aggregated = groups.percentile(_percentiles[typ])
+        else:
+            function = _functions.get(typ)
+            if function is None:
+                raise ValueError('Unsupported aggregation type: ' + str(typ))
+            aggregated = function(groups)
+        result[typ] = (groups.starts, np.asarray(aggregated, dtype=np.float64))
+    return result
+
+
+class _Groups(object):
+    """
+    Samples split into periods, each period is a contiguous slice of the time and value arrays.
+    """
+
+    def __init__(self, times, values, starts, first_index):
+        self.times = times
+        self.values = values
+        self.starts = starts
+        self.ends = None
+        self.first = first_index
+        self.last = np.r_[first_index[1:], len(times)] - 1
+        self.counts = self.last - self.first + 1
+        self.ids = np.repeat(np.arange(len(first_index)), self.counts)
+
+    def sum(self, values=None):
+        return np.add.reduceat(self.values if values is None else values, self.first)
+
+    def order(self, values):
+        """
+        Indexes which sort values within each period. Equal values keep the time order.
+        """
+        return np.lexsort((values, self.ids))
+
+    def percentile(self, p):
+        # Position p * (n + 1) between sorted values, same as the server percentile estimation
+        sorted_values = self.values[self.order(self.values)]
+        n = self.counts
+        position = p / 100.0 * (n + 1)
+        lower = np.clip(np.floor(position).astype(np.int64), 1, n)
+        upper = np.minimum(lower + 1, n)
+        fraction = np.where(position < 1, 0.0, np.where(position >= n, 0.0, position - np.floor(position)))
+        low = sorted_values[self.first + lower - 1]
+        high = sorted_values[self.first + upper - 1]
+        return low + fraction * (high - low)
+
+    def threshold(self, typ, min_value, max_value):
+        violation = np.zeros(len(self.values), dtype=bool)
+        if min_value is not None:
+            violation |= self.values < min_value
+        if max_value is not None:
+            violation |= self.values > max_value
+        if typ == AggregateType.THRESHOLD_COUNT:
+            previous = np.r_[False, violation[:-1]]
+            previous[self.first] = False
+            return self.sum((violation & ~previous).astype(np.float64))
+        # Each value lasts until the next sample or the period end
+        until = np.r_[self.times[1:], 0]
+        until[self.last] = self.ends
+        duration = self.sum(np.where(violation, until - self.times, 0).astype(np.float64))
+        # Value of the previous period lasts until the first sample of the period
+        carried = np.r_[False, violation[self.last[:-1]]]
+        duration += np.where(carried, self.times[self.first] - self.starts, 0)
+        if typ == AggregateType.THRESHOLD_DURATION:
+            return duration
+        return 100.0 * (1.0 - duration / (self.ends - self.starts))
+
+
+def _count(groups):
+    return groups.counts
+
+
+def _sum(groups):
+    return groups.sum()
+
+
+def _avg(groups):
+    return groups.sum() / groups.counts
+
+
+def _min(groups):
+    return np.minimum.reduceat(groups.values, groups.first)
+
+
+def _max(groups):
+    return np.maximum.reduceat(groups.values, groups.first)
+
+
+def _first(groups):
+    return groups.values[groups.first]
+
+
+def _last(groups):
+    return groups.values[groups.last]
+
+
+def _min_value_time(groups):
+    return groups.times[groups.order(groups.values)[groups.first]]
+
+
+def _max_value_time(groups):
+    return groups.times[groups.order(-groups.values)[groups.first]]
+
+
+def _delta(groups):
+    last = groups.values[groups.last]
+    previous = np.r_[groups.values[0], last[:-1]]
+    return last - previous
+
+
+def _counter(groups):
+    # A decrease is a counter reset, the value after reset is the increment
+    diff = np.diff(groups.values)
+    increments = np.r_[0.0, np.where(diff < 0, groups.values[1:], diff)]
+    return groups.sum(increments)
+
+
+def _standard_deviation(groups):
+    mean = groups.sum() / groups.counts
+    squares = groups.sum((groups.values - mean[groups.ids]) ** 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = np.sqrt(squares / (groups.counts - 1))
+    return np.where(groups.counts > 1, result, 0.0)
+
+
+def _wavg(groups):
+    # Weight is the sample index within the period starting with 1
+    weights = (np.arange(len(groups.values)) - groups.first[groups.ids] + 1).astype(np.float64)
+    return groups.sum(weights * groups.values) / groups.sum(weights)
+
+
+def _wtavg(groups):
+    # Weight is the time elapsed since the previous sample or since the period start
+    previous = np.r_[0, groups.times[:-1]]
+    previous[groups.first] = groups.starts
+    weights = (groups.times - np.maximum(previous, groups.starts[groups.ids])).astype(np.float64)
+    total = groups.sum(weights)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = groups.sum(weights * groups.values) / total
+    return np.where(total > 0, result, groups.sum() / groups.counts)
+
+
+_functions = {
+    AggregateType.COUNT: _count,
+    AggregateType.SUM: _sum,
+    AggregateType.AVG: _avg,
+    AggregateType.MIN: _min,
+    AggregateType.MAX: _max,
+    AggregateType.FIRST: _first,
+    AggregateType.LAST: _last,
+    AggregateType.MIN_VALUE_TIME: _min_value_time,
+    AggregateType.MAX_VALUE_TIME: _max_value_time,
+    AggregateType.DELTA: _delta,
+    AggregateType.COUNTER: _counter,
+    AggregateType.STANDARD_DEVIATION: _standard_deviation,
+    AggregateType.WAVG: _wavg,
+    AggregateType.WTAVG: _wtavg,
+}
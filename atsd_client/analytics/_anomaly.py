@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from ._columnar import series_arrays
+from ._periods import interval_ms
+from .._time_utilities import to_date
+from .._utilities import chunked
+from ..models import Message
+
+#: Anomalous sample found by a detector. `score` is the detector statistic for the sample.
+Anomaly = namedtuple('Anomaly', ['metric', 'entity', 'tags', 'date', 'value', 'score', 'detector'])
+
+
+class _Detector(object):
+    """
+    Base class of detectors. Subclasses calculate score of each sample and mark samples with the absolute score
+    greater than the threshold as anomalies.
+    """
+    name = None
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def score(self, times, values):
+        """
+        :param times: `numpy.ndarray` sorted sample times in milliseconds
+        :param values: `numpy.ndarray` sample values
+        :return: `numpy.ndarray` score of each sample, NaN if the score is undefined
+        """
+        raise NotImplementedError()
+
+    def detect(self, times, values):
+        """
+        :param times: `numpy.ndarray` sorted sample times in milliseconds
+        :param values: `numpy.ndarray` sample values
+        :return: `tuple` of `numpy.ndarray` indexes of anomalous samples and `numpy.ndarray` their scores
+        """
+        scores = self.score(np.asarray(times, dtype=np.int64), np.asarray(values, dtype=np.float64))
+        with np.errstate(invalid='ignore'):
+            index = np.flatnonzero(np.abs(scores) > self.threshold)
+        return index, scores[index]
+
+
+class MaxDeltaDetector(_Detector):
+    """
+    Sample is an outlier if its differences from both the previous and the next sample exceed the largest difference
+    between consecutive samples within the interval before and after the sample, multiplied by the threshold.
+    Score is the smaller of the two ratios.
+    """
+    name = 'max_delta'
+
+    def __init__(self, interval, threshold=5, min_window_size=5):
+        """
+        :param interval: `dict` with count and unit, for example {"count": 10, "unit": "DAY"}
+        :param threshold: `Number` ratio of sample difference to the maximum difference in the windows. Default: 5
+        :param min_window_size: `int` minimum number of samples before and after the sample. Default: 5
+        """
+        super(MaxDeltaDetector, self).__init__(threshold)
+        self.interval = interval_ms(interval)
+        self.min_window_size = min_window_size
+
+    def score(self, times, values):
+        n = len(values)
+        scores = np.full(n, np.nan)
+        if n < 3:
+            return scores
+        index = np.arange(n)
+        deltas = np.abs(np.diff(values))
+        # Window before sample i contains samples [start, i - 1], after: [i + 1, end]
+        start = np.searchsorted(times, times - self.interval, side='left')
+        end = np.searchsorted(times, times + self.interval, side='right') - 1
+        enough = (index - start >= self.min_window_size) & (end - index >= self.min_window_size)
+        enough[0] = enough[-1] = False
+        table = _SparseMax(deltas)
+        max_before = table.max(start, index - 2)
+        max_after = table.max(index + 1, end - 1)
+        before = np.r_[np.nan, deltas]
+        after = np.r_[deltas, np.nan]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = np.minimum(before / max_before, after / max_after)
+        scores[enough] = ratio[enough]
+        return scores
+
+
+class ZScoreDetector(_Detector):
+    """
+    Score is the number of standard deviations between the sample and the mean of the preceding window.
+    """
+    name = 'z_score'
+
+    def __init__(self, window, threshold=3, min_window_size=2):
+        """
+        :param window: `int` number of preceding samples | `dict` interval with count and unit
+        :param threshold: `Number` Default: 3
+        :param min_window_size: `int` minimum number of samples in the window. Default: 2
+        """
+        super(ZScoreDetector, self).__init__(threshold)
+        self.window = window
+        self.min_window_size = max(min_window_size, 2)
+
+    def score(self, times, values):
+        start = _window_start(times, self.window)
+        index = np.arange(len(values))
+        if len(values) > 0:
+            # Shift values to keep cumulative sums of squares precise, the score does not depend on the shift
+            values = values - values[0]
+        sums = np.r_[0.0, np.cumsum(values)]
+        squares = np.r_[0.0, np.cumsum(values * values)]
+        count = index - start
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (sums[index] - sums[start]) / count
+            variance = ((squares[index] - squares[start]) - count * mean * mean) / (count - 1)
+            scores = (values - mean) / np.sqrt(np.maximum(variance, 0))
+        scores[count < self.min_window_size] = np.nan
+        return scores
+
+
+#: Maximum number of window values copied at once by :class:`.MadDetector`
+_MAD_BLOCK_SIZE = 1 << 20
+
+
+class MadDetector(_Detector):
+    """
+    Modified z-score: distance from the median of the preceding window in median absolute deviations,
+    scaled by 0.6745 so that the score is comparable to z-score for normally distributed values.
+    """
+    name = 'mad'
+
+    def __init__(self, window, threshold=3.5):
+        """
+        :param window: `int` number of preceding samples
+        :param threshold: `Number` Default: 3.5
+        """
+        if not isinstance(window, int):
+            raise ValueError('MAD window must be a number of samples, found: ' + str(type(window)))
+        super(MadDetector, self).__init__(threshold)
+        self.window = window
+
+    def score(self, times, values):
+        n = len(values)
+        scores = np.full(n, np.nan)
+        if n <= self.window:
+            return scores
+        values = np.ascontiguousarray(values)
+        stride = values.strides[0]
+        # Windows are processed in blocks of rows so that at most about _MAD_BLOCK_SIZE values are copied at once
+        block_rows = max(1, _MAD_BLOCK_SIZE // self.window)
+        for start in range(0, n - self.window, block_rows):
+            rows = min(block_rows, n - self.window - start)
+            windows = np.lib.stride_tricks.as_strided(values[start:], shape=(rows, self.window),
+                                                      strides=(stride, stride), writeable=False)
+            median = np.median(windows, axis=1)
+            mad = np.median(np.abs(windows - median[:, None]), axis=1)
+            target = slice(start + self.window, start + self.window + rows)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                scores[target] = 0.6745 * (values[target] - median) / mad
+        return scores
+
+
+class EwmaDetector(_Detector):
+    """
+    Score is the difference between the sample and exponentially weighted moving average of preceding samples
+    in exponentially weighted standard deviations.
+    """
+    name = 'ewma'
+
+    def __init__(self, alpha=0.3, threshold=3, min_window_size=10):
+        """
+        :param alpha: `float` smoothing factor between 0 and 1. Default: 0.3
+        :param threshold: `Number` Default: 3
+        :param min_window_size: `int` number of initial samples without score. Default: 10
+        """
+        if not 0 < alpha < 1:
+            raise ValueError('Alpha must be between 0 and 1, found: ' + str(alpha))
+        super(EwmaDetector, self).__init__(threshold)
+        self.alpha = alpha
+        self.min_window_size = min_window_size
+
+    def score(self, times, values):
+        n = len(values)
+        scores = np.full(n, np.nan)
+        if n < 2:
+            return scores
+        mean = _ewma(values, self.alpha, values[0])
+        deviation = values[1:] - mean[:-1]
+        variance = _ewma(deviation * deviation, self.alpha, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores[2:] = deviation[1:] / np.sqrt(variance[:-1])
+        scores[:self.min_window_size] = np.nan
+        return scores
+
+
+def detect(series, detector):
+    """Find anomalies in each series.
+
+    :param series: :class:`.Series` | `list` of :class:`.Series`
+    :param detector: :class:`.MaxDeltaDetector` | :class:`.ZScoreDetector` | :class:`.MadDetector` |
+    :class:`.EwmaDetector`
+    :return: `list` of :class:`.Anomaly`
+    """
+    if not isinstance(series, (list, tuple)):
+        series = [series]
+    result = []
+    for s in series:
+        times, values = series_arrays(s)
+        finite = np.isfinite(values)
+        times = times[finite]
+        values = values[finite]
+        index, scores = detector.detect(times, values)
+        tags = dict(s.tags)
+        for i, score in zip(index, scores):
+            result.append(Anomaly(s.metric, s.entity, tags, to_date(int(times[i])), float(values[i]), float(score),
+                                  detector.name))
+    return result
+
+
+def insert_messages(anomalies, message_service, message_type='anomaly', source='atsd_client', severity='WARNING',
+                    batch_size=1000):
+    """Insert anomalies as messages, one request for each batch of messages.
+    Message tags contain series tags, metric, value, score and detector name.
+
+    :param anomalies: iterable of :class:`.Anomaly`
+    :param message_service: :class:`.MessageService`
+    :param message_type: `str` Default: 'anomaly'
+    :param source: `str` Default: 'atsd_client'
+    :param severity: `str` message severity. Default: 'WARNING'
+    :param batch_size: `int` maximum number of messages in one request. Default: 1000
+    :return: `int` number of inserted messages
+    """
+    count = 0
+    for batch in chunked((_to_message(anomaly, message_type, source, severity) for anomaly in anomalies), batch_size):
+        message_service.insert(*batch)
+        count += len(batch)
+    return count
+
+
+def _to_message(anomaly, message_type, source, severity):
+    tags = dict(anomaly.tags or {})
+    tags.update(metric=anomaly.metric, value=str(anomaly.value), score='%.4g' % anomaly.score,
+                detector=anomaly.detector)
+    text = '%s anomaly %s=%s score=%.4g' % (anomaly.detector, anomaly.metric, anomaly.value, anomaly.score)
+    return Message(message_type, source, anomaly.entity, anomaly.date, severity, tags, text)
+
+
+def _window_start(times, window):
+    """
+    Index of the first sample of the window preceding each sample.
+    """
+    if isinstance(window, dict):
+        return np.searchsorted(times, times - interval_ms(window), side='left')
+    return np.maximum(np.arange(len(times)) - window, 0)
+
+
+class _SparseMax(object):
+    """
+    Sparse table for range maximum queries over an array in constant time.
+    """
+
+    def __init__(self, values):
+        self.levels = [values]
+        width = 1
+        while 2 * width <= len(values):
+            previous = self.levels[-1]
+            self.levels.append(np.maximum(previous[:-width], previous[width:]))
+            width *= 2
+
+    def max(self, start, end):
+        """
+        :return: maximum of values[start:end + 1] for each pair, -1 for empty ranges
+        """
+        start = np.asarray(start)
+        end = np.asarray(end)
+        length = end - start + 1
+        result = np.full(len(start), -1.0)
+        valid = length > 0
+        level = np.zeros(len(start), dtype=np.int64)
+        level[valid] = np.floor(np.log2(length[valid])).astype(np.int64)
+        for k in np.unique(level[valid]):
+            mask = valid & (level == k)
+            values = self.levels[k]
+            result[mask] = np.maximum(values[start[mask]], values[end[mask] - (1 << k) + 1])
+        return result
+
+
+def _ewma(values, alpha, initial):
+    """
+    Exponentially weighted moving average: y[i] = (1 - alpha) * y[i - 1] + alpha * values[i], y[-1] = initial.
+    Values are processed in blocks short enough for decay factors to stay within float precision.
+    """
+    decay = 1.0 - alpha
+    block = max(1, int(15 / -math.log10(decay)))
+    result = np.empty(len(values))
+    previous = initial
+    for offset in range(0, len(values), block):
+        chunk = values[offset:offset + block]
+        powers = decay ** np.arange(len(chunk))
+        weighted = np.cumsum(alpha * chunk / powers) * powers
+        result[offset:offset + len(chunk)] = weighted + previous * decay * powers
+        previous = result[offset + len(chunk) - 1]
+    return result
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import numpy as np
+
+from ..models import Series, Sample
+
+
+def series_arrays(series):
+    """Convert series samples to arrays.
+    Samples are sorted by time, for samples with the same time the last sample is kept, same as :meth:`.Series.values`.
+    Non-numeric values are converted to NaN.
+
+    :param series: :class:`.Series`
+    :return: `tuple` of `numpy.ndarray` times in milliseconds (int64) and `numpy.ndarray` values (float64)
+    """
+    data = series.data
+    times = np.fromiter((sample.t for sample in data), dtype=np.float64, count=len(data))
+    times = np.round(times).astype(np.int64)
+    values = np.fromiter((_to_float(sample.v) for sample in data), dtype=np.float64, count=len(data))
+    order = np.argsort(times, kind='mergesort')
+    times = times[order]
+    values = values[order]
+    if len(times) > 1:
+        last = np.append(times[1:] != times[:-1], True)
+        times = times[last]
+        values = values[last]
+    return times, values
+
+
+def to_series(template, times, values, **attributes):
+    """Create series with the same entity, metric and tags as template from arrays.
+
+    :param template: :class:`.Series`
+    :param times: `numpy.ndarray` times in milliseconds
+    :param values: `numpy.ndarray` values
+    :param attributes: additional series attributes, for example aggregate={'type': 'AVG'}
+    :return: :class:`.Series`
+    """
+    result = Series(template.entity, template.metric, tags=dict(template.tags))
+    result.data = [Sample(float(v), int(t)) for t, v in zip(times, values)]
+    for name, value in attributes.items():
+        setattr(result, name, value)
+    return result
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from ._columnar import series_arrays
+from ._periods import Period, utc_offsets, to_utc, month_index, add_months_to_month_start
+from .._time_utilities import to_date
+
+_day_ms = 24 * 60 * 60 * 1000
+
+#: Missing samples between two samples on the schedule. `missing` is the number of skipped periods.
+Gap = namedtuple('Gap', ['metric', 'entity', 'tags', 'start', 'end', 'missing'])
+
+#: Sample with time off the schedule. `expected_date` is the next time on the schedule.
+Violation = namedtuple('Violation', ['metric', 'entity', 'tags', 'date', 'expected_date', 'value'])
+
+
+def schedule_positions(times, period, timezone=None):
+    """Calculate position of samples on the schedule which starts at the first sample and repeats every period.
+    Monthly, quarterly and yearly schedules which start on the last day of a month continue on the last days
+    of the following months.
+
+    :param times: `numpy.ndarray` sorted sample times in milliseconds
+    :param period: :class:`.Period` | `dict` with count, unit and optional timezone keys
+    :param timezone: `str` default timezone of the schedule. Default: UTC
+    :return: `tuple` of `numpy.ndarray` number of periods since the first sample, rounded down, and
+    `numpy.ndarray` of `bool`, True if the sample time is on the schedule
+    """
+    period = Period.of(period, timezone)
+    times = np.asarray(times, dtype=np.int64)
+    if len(times) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+    local = times + utc_offsets(times, period.timezone)
+    if not period.calendar:
+        delta = local - local[0]
+        return delta // period.length, delta % period.length == 0
+    months = month_index(local) - month_index(local[:1])
+    position = months // period.months
+    expected = _calendar_schedule(int(local[0]), position * period.months)
+    # A sample before the scheduled day of its month belongs to the previous period
+    position[(months % period.months == 0) & (local < expected)] -= 1
+    return position, (months % period.months == 0) & (local == expected)
+
+
+def gap_arrays(times, period, timezone=None):
+    """Find gaps and schedule violations.
+
+    :param times: `numpy.ndarray` sorted sample times in milliseconds
+    :param period: :class:`.Period` | `dict` with count, unit and optional timezone keys
+    :param timezone: `str` default timezone of the schedule. Default: UTC
+    :return: `tuple` of `numpy.ndarray` indexes of samples before gaps, `numpy.ndarray` indexes of samples after gaps,
+    `numpy.ndarray` number of missing periods in each gap, `numpy.ndarray` indexes of samples off the schedule
+    and `numpy.ndarray` next times on the schedule for them
+    """
+    period = Period.of(period, timezone)
+    times = np.asarray(times, dtype=np.int64)
+    position, on_schedule = schedule_positions(times, period)
+    scheduled = np.flatnonzero(on_schedule)
+    steps = np.diff(position[scheduled])
+    gaps = np.flatnonzero(steps > 1)
+    violations = np.flatnonzero(~on_schedule)
+    expected = _schedule_times(times[:1], position[violations] + 1, period)
+    return scheduled[gaps], scheduled[gaps + 1], steps[gaps] - 1, violations, expected
+
+
+def find_gaps(series, period, timezone=None, dataframe=False):
+    """Find missing samples in series expected to have one sample each period,
+    for example {"count": 1, "unit": "MONTH"} for monthly series. The schedule starts at the first sample.
+
+    :param series: :class:`.Series` | `list` of :class:`.Series`
+    :param period: :class:`.Period` | `dict` with count, unit and optional timezone keys
+    :param timezone: `str` default timezone of the schedule. Default: UTC
+    :param dataframe: `bool` If True return :class:`pandas.DataFrame`. Default: False
+    :return: `list` of :class:`.Gap` | :class:`pandas.DataFrame` with Gap fields as columns
+    """
+    result = []
+    for s in _as_list(series):
+        times, _ = series_arrays(s)
+        before, after, missing, _, _ = gap_arrays(times, period, timezone)
+        tags = dict(s.tags)
+        for i, j, count in zip(before, after, missing):
+            result.append(Gap(s.metric, s.entity, tags, to_date(int(times[i])), to_date(int(times[j])), int(count)))
+    return _frame(result, Gap) if dataframe else result
+
+
+def find_violations(series, period, timezone=None, dataframe=False):
+    """Find samples with times off the schedule, which starts at the first sample and repeats every period.
+
+    :param series: :class:`.Series` | `list` of :class:`.Series`
+    :param period: :class:`.Period` | `dict` with count, unit and optional timezone keys
+    :param timezone: `str` default timezone of the schedule. Default: UTC
+    :param dataframe: `bool` If True return :class:`pandas.DataFrame`. Default: False
+    :return: `list` of :class:`.Violation` | :class:`pandas.DataFrame` with Violation fields as columns
+    """
+    result = []
+    for s in _as_list(series):
+        times, values = series_arrays(s)
+        _, _, _, violations, expected = gap_arrays(times, period, timezone)
+        tags = dict(s.tags)
+        for i, expected_time in zip(violations, expected):
+            result.append(Violation(s.metric, s.entity, tags, to_date(int(times[i])), to_date(int(expected_time)),
+                                    float(values[i])))
+    return _frame(result, Violation) if dataframe else result
+
+
+def _calendar_schedule(first, months):
+    """
+    Local times of a calendar schedule which starts at the first local time, months after the start.
+    The day of month is limited by the month length. Schedule which starts on the last day of a month
+    continues on the last days.
+    """
+    first_month = int(month_index(np.array([first]))[0])
+    months = np.asarray(months, dtype=np.int64)
+    month_starts = add_months_to_month_start(first_month, months)
+    last_days = (add_months_to_month_start(first_month, months + 1) - month_starts) // _day_ms - 1
+    first_month_start, next_month_start = add_months_to_month_start(first_month, np.array([0, 1]))
+    day, time_of_day = divmod(first - int(first_month_start), _day_ms)
+    if day == (next_month_start - first_month_start) // _day_ms - 1:
+        days = last_days
+    else:
+        days = np.minimum(day, last_days)
+    return month_starts + days * _day_ms + time_of_day
+
+
+def _schedule_times(first, positions, period):
+    if len(first) == 0:
+        return np.empty(0, dtype=np.int64)
+    first_local = int(first[0] + utc_offsets(first, period.timezone)[0])
+    if period.calendar:
+        local = _calendar_schedule(first_local, positions * period.months)
+    else:
+        local = first_local + positions * period.length
+    return to_utc(local, period.timezone)
+
+
+def _as_list(series):
+    return series if isinstance(series, (list, tuple)) else [series]
+
+
+def _frame(records, record_class):
+    import pandas as pd
+    return pd.DataFrame.from_records(records, columns=record_class._fields)
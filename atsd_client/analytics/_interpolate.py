@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import numbers
+
+import numpy as np
+
+from ._columnar import series_arrays, to_series
+from ._periods import Period
+from .._time_utilities import to_milliseconds
+from ..models import Interpolate, InterpolateFunction, InterpolateBoundary, PeriodAlign
+
+
+def interpolate(series, interpolate, start_date=None, end_date=None, timezone=None):
+    """Regularize series locally: calculate values at period start times, the same way the server does when
+    a query contains interpolate settings.
+
+    :param series: :class:`.Series` | `list` of :class:`.Series`
+    :param interpolate: :class:`.Interpolate` | `dict` with period, function and optional boundary and fill keys
+    :param start_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: first sample time
+    :param end_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: after the last sample
+    :param timezone: `str` timezone of calendar aligned periods unless the period specifies it. Default: UTC
+    :return: `list` of :class:`.Series`
+    """
+    if not isinstance(series, (list, tuple)):
+        series = [series]
+    settings = _settings(interpolate)
+    result = []
+    for s in series:
+        times, values = series_arrays(s)
+        grid, start, end = _grid(settings['period'], [times], start_date, end_date, timezone)
+        function = _function(settings['function'], s)
+        grid_times, grid_values = interpolate_arrays(times, values, grid, function, settings['boundary'],
+                                                     settings['fill'], start, end)
+        result.append(to_series(s, grid_times, grid_values))
+    return result
+
+
+def align(series, interpolate, start_date=None, end_date=None, timezone=None):
+    """Interpolate series to the same time grid.
+    The grid covers the interval from the earliest to the latest sample of all series unless dates are specified.
+
+    :param series: `list` of :class:`.Series`
+    :param interpolate: :class:`.Interpolate` | `dict` with period, function and optional boundary and fill keys
+    :param start_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date
+    :param end_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date
+    :param timezone: `str` timezone of calendar aligned periods unless the period specifies it. Default: UTC
+    :return: `tuple` of `numpy.ndarray` grid times in milliseconds and 2-dimensional `numpy.ndarray` of values,
+    one row for each series, NaN where a series has no value
+    """
+    settings = _settings(interpolate)
+    arrays = [series_arrays(s) for s in series]
+    grid, start, end = _grid(settings['period'], [times for times, _ in arrays], start_date, end_date, timezone)
+    matrix = np.full((len(series), len(grid)), np.nan)
+    for row, (s, (times, values)) in enumerate(zip(series, arrays)):
+        matrix[row] = interpolate_arrays(times, values, grid, _function(settings['function'], s),
+                                         settings['boundary'], np.nan, start, end)[1]
+    return grid, matrix
+
+
+def interpolate_arrays(times, values, grid, function=InterpolateFunction.LINEAR, boundary=InterpolateBoundary.INNER,
+                       fill=False, start=None, end=None):
+    """Calculate values at grid times.
+
+    :param times: `numpy.ndarray` sorted sample times in milliseconds
+    :param values: `numpy.ndarray` sample values
+    :param grid: `numpy.ndarray` sorted grid times in milliseconds
+    :param function: :class:`.InterpolateFunction` LINEAR or PREVIOUS
+    :param boundary: :class:`.InterpolateBoundary` INNER: samples outside the interval are ignored,
+    OUTER: samples before and after the interval are used to calculate values at the interval boundaries
+    :param fill: `bool` | `Number`. False: grid times before the first or after the last sample are omitted,
+    True: the nearest sample value is used, number: the number is used
+    :param start: `int` interval start in milliseconds. Default: first grid time
+    :param end: `int` interval end in milliseconds, exclusive. Default: after the last grid time
+    :return: `tuple` of `numpy.ndarray` grid times and `numpy.ndarray` values
+    """
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    grid = np.asarray(grid, dtype=np.int64)
+    if boundary != InterpolateBoundary.OUTER and len(grid) > 0:
+        start = grid[0] if start is None else start
+        end = grid[-1] + 1 if end is None else end
+        inside = (times >= start) & (times < end)
+        times = times[inside]
+        values = values[inside]
+    result = np.full(len(grid), np.nan)
+    if len(times) == 0:
+        return _fill(grid, result, np.ones(len(grid), dtype=bool), np.zeros(len(grid), dtype=bool), fill, values)
+
+    previous = np.searchsorted(times, grid, side='right') - 1
+    leading = previous < 0
+    has_previous = ~leading
+    exact = has_previous.copy()
+    exact[has_previous] = times[previous[has_previous]] == grid[has_previous]
+    if function == InterpolateFunction.PREVIOUS:
+        result[has_previous] = values[previous[has_previous]]
+        trailing = np.zeros(len(grid), dtype=bool)
+    else:
+        following = previous + 1
+        trailing = (following >= len(times)) & ~exact
+        between = has_previous & ~trailing & ~exact
+        t0 = times[previous[between]]
+        t1 = times[following[between]]
+        v0 = values[previous[between]]
+        v1 = values[following[between]]
+        result[between] = v0 + (v1 - v0) * (grid[between] - t0) / (t1 - t0)
+        result[exact] = values[previous[exact]]
+    return _fill(grid, result, leading, trailing, fill, values)
+
+
+def _fill(grid, result, leading, trailing, fill, values):
+    if fill is False or fill is None:
+        keep = ~(leading | trailing)
+        return grid[keep], result[keep]
+    if fill is True:
+        if len(values) > 0:
+            result[leading] = values[0]
+            result[trailing] = values[-1]
+    elif isinstance(fill, numbers.Number):
+        result[leading | trailing] = fill
+    return grid, result
+
+
+def _settings(interpolate):
+    if isinstance(interpolate, Interpolate):
+        interpolate = vars(interpolate)
+    return {
+        'period': interpolate['period'],
+        'function': interpolate.get('function', InterpolateFunction.AUTO),
+        'boundary': interpolate.get('boundary', InterpolateBoundary.INNER),
+        'fill': interpolate.get('fill', False),
+    }
+
+
+def _function(function, series):
+    """
+    Resolve AUTO function with the metric interpolation setting if series metadata contains the metric.
+    """
+    if function != InterpolateFunction.AUTO:
+        return function
+    meta = series.meta or {}
+    metric = meta.get('metric')
+    if getattr(metric, 'interpolate', None) == InterpolateFunction.PREVIOUS:
+        return InterpolateFunction.PREVIOUS
+    return InterpolateFunction.LINEAR
+
+
+def _grid(period, times_list, start_date, end_date, timezone):
+    """
+    :return: `tuple` of grid times, interval start and interval end in milliseconds
+    """
+    period = Period.of(period, timezone)
+    non_empty = [times for times in times_list if len(times) > 0]
+    start = None if start_date is None else int(to_milliseconds(start_date))
+    end = None if end_date is None else int(to_milliseconds(end_date))
+    if non_empty:
+        if start is None or period.align == PeriodAlign.FIRST_VALUE_TIME:
+            start = min(int(times[0]) for times in non_empty)
+        if end is None:
+            end = max(int(times[-1]) for times in non_empty) + 1
+    if start is None or end is None:
+        return np.empty(0, dtype=np.int64), start, end
+    return period.grid(start, end), start, end
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from ..models import TimeUnit, PeriodAlign
+
+_unit_ms = {
+    TimeUnit.MILLISECOND: 1,
+    TimeUnit.SECOND: 1000,
+    TimeUnit.MINUTE: 60 * 1000,
+    TimeUnit.HOUR: 60 * 60 * 1000,
+    TimeUnit.DAY: 24 * 60 * 60 * 1000,
+    TimeUnit.WEEK: 7 * 24 * 60 * 60 * 1000,
+}
+
+_unit_months = {
+    TimeUnit.MONTH: 1,
+    TimeUnit.QUARTER: 3,
+    TimeUnit.YEAR: 12,
+}
+
+_local_units = (TimeUnit.DAY, TimeUnit.WEEK, TimeUnit.MONTH, TimeUnit.QUARTER, TimeUnit.YEAR)
+
+_day_ms = _unit_ms[TimeUnit.DAY]
+_hour_ms = _unit_ms[TimeUnit.HOUR]
+# 1970-01-01 is Thursday, weeks start on Monday
+_week_shift_ms = 3 * _day_ms
+
+
+class Period(object):
+    """
+    Period of count time units, for example 15 MINUTE or 1 MONTH, with alignment and timezone.
+    """
+
+    def __init__(self, count, unit=TimeUnit.SECOND, align=PeriodAlign.CALENDAR, timezone=None):
+        if unit not in _unit_ms and unit not in _unit_months:
+            raise ValueError('Unsupported period unit: ' + str(unit))
+        if count <= 0:
+            raise ValueError('Period count must be positive, found: ' + str(count))
+        self.count = count
+        self.unit = unit
+        self.align = PeriodAlign.CALENDAR if align is None else align
+        self.timezone = pytz.utc if timezone is None else (
+            pytz.timezone(timezone) if isinstance(timezone, str) else timezone)
+
+    @staticmethod
+    def of(period, timezone=None):
+        """
+        :param period: :class:`.Period` | `dict` with count, unit and optional align and timezone keys
+        :param timezone: `str` default timezone if the period does not specify one
+        :return: :class:`.Period`
+        """
+        if isinstance(period, Period):
+            return period
+        return Period(period['count'], period.get('unit', TimeUnit.SECOND), period.get('align'),
+                      period.get('timezone', timezone))
+
+    @property
+    def calendar(self):
+        """
+        True if the period length in milliseconds depends on the calendar: MONTH, QUARTER, YEAR
+        """
+        return self.unit in _unit_months
+
+    @property
+    def months(self):
+        return self.count * _unit_months[self.unit]
+
+    @property
+    def length(self):
+        """
+        Period length in milliseconds for fixed units
+        """
+        return int(round(self.count * _unit_ms[self.unit]))
+
+    def floor(self, times, start=None, end=None):
+        """Calculate start of the period containing each time.
+
+        :param times: `numpy.ndarray` sorted times in milliseconds
+        :param start: `int` selection interval start in milliseconds, required for START_TIME alignment
+        :param end: `int` selection interval end in milliseconds, required for END_TIME alignment
+        :return: `numpy.ndarray` period start times in milliseconds
+        """
+        times = np.asarray(times, dtype=np.int64)
+        align = self.align
+        if align == PeriodAlign.FIRST_VALUE_TIME:
+            if len(times) == 0:
+                return times.copy()
+            align, start = PeriodAlign.START_TIME, int(times[0])
+        if align == PeriodAlign.START_TIME:
+            if start is None:
+                raise ValueError('Start date is required for START_TIME alignment')
+            if self.calendar:
+                return self._floor_months_from(times, start)
+            return start + (times - start) // self.length * self.length
+        if align == PeriodAlign.END_TIME:
+            if end is None:
+                raise ValueError('End date is required for END_TIME alignment')
+            if self.calendar:
+                raise ValueError('END_TIME alignment is not supported for ' + self.unit + ' periods')
+            return end - ((end - times - 1) // self.length + 1) * self.length
+        return self._floor_calendar(times)
+
+    def next(self, starts):
+        """
+        :param starts: `numpy.ndarray` period start times in milliseconds
+        :return: `numpy.ndarray` start times of the following periods
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        if self.unit not in _local_units:
+            return starts + self.length
+        # Days and longer periods have the same local time of day regardless of daylight saving time changes
+        local = starts + utc_offsets(starts, self.timezone)
+        if self.calendar:
+            return to_utc(_add_months(local, self.months), self.timezone)
+        return to_utc(local + self.length, self.timezone)
+
+    def grid(self, start, end):
+        """Generate period start times within the interval.
+
+        :param start: `int` interval start in milliseconds, inclusive
+        :param end: `int` interval end in milliseconds, exclusive
+        :return: `numpy.ndarray` sorted period start times in milliseconds
+        """
+        if end <= start:
+            return np.empty(0, dtype=np.int64)
+        if self.align == PeriodAlign.END_TIME and not self.calendar:
+            return np.arange(end - self.length, start - 1, -self.length, dtype=np.int64)[::-1]
+        first = int(self.floor(np.array([start]), start, end)[0])
+        if first < start:
+            first = int(self.next(np.array([first]))[0])
+        if self.align in (PeriodAlign.START_TIME, PeriodAlign.FIRST_VALUE_TIME):
+            if not self.calendar:
+                return np.arange(first, end, self.length, dtype=np.int64)
+            local = first + int(utc_offsets(np.array([first]), self.timezone)[0])
+            count = _months_between(first, end, self.timezone) // self.months + 1
+            starts = np.full(count + 1, local, dtype=np.int64)
+            starts = to_utc(_add_months(starts, np.arange(count + 1) * self.months), self.timezone)
+            return starts[starts < end]
+        if self.unit in _local_units:
+            starts = [first]
+            while True:
+                following = int(self.next(np.array([starts[-1]]))[0])
+                if following >= end:
+                    break
+                starts.append(following)
+            return np.array(starts, dtype=np.int64)
+        if self.timezone == pytz.utc and _day_ms % self.length == 0:
+            return np.arange(first, end, self.length, dtype=np.int64)
+        # Sub-day periods restart at the beginning of each local day
+        days = Period(1, TimeUnit.DAY, timezone=self.timezone)
+        day_starts = days.grid(int(days.floor(np.array([start]))[0]), end)
+        parts = [np.arange(day, following, self.length, dtype=np.int64)
+                 for day, following in zip(day_starts, days.next(day_starts))]
+        starts = np.concatenate(parts)
+        return starts[(starts >= start) & (starts < end)]
+
+    def _floor_calendar(self, times):
+        local = times + utc_offsets(times, self.timezone)
+        if self.calendar:
+            months = local.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+            if self.unit == TimeUnit.YEAR:
+                years = months // 12
+                months = (years - (years + 1970) % self.count) * 12
+            else:
+                months = months - months % 12 % self.months
+            floored = months.astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+        elif self.unit == TimeUnit.WEEK:
+            floored = (local + _week_shift_ms) // self.length * self.length - _week_shift_ms
+        elif self.unit == TimeUnit.DAY:
+            floored = local // self.length * self.length
+        else:
+            # Sub-day periods are aligned to the start of the day
+            day = local // _day_ms * _day_ms
+            floored = day + (local - day) // self.length * self.length
+        return to_utc(floored, self.timezone)
+
+    def _floor_months_from(self, times, start):
+        local_start = start + int(utc_offsets(np.array([start]), self.timezone)[0])
+        local = times + utc_offsets(times, self.timezone)
+        start_month = np.datetime64(local_start, 'ms').astype('datetime64[M]').astype(np.int64)
+        months = local.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64) - start_month
+        count = months // self.months * self.months
+        floored = _add_months(np.full(len(times), local_start, dtype=np.int64), count)
+        # Period started in the month of the time has not begun yet
+        late = floored > local
+        count[late] -= self.months
+        floored[late] = _add_months(np.full(int(late.sum()), local_start, dtype=np.int64), count[late])
+        return to_utc(floored, self.timezone)
+
+
+def interval_ms(interval):
+    """
+    :param interval: `dict` with count and unit, for example {"count": 10, "unit": "MINUTE"}. MONTH and longer units
+    are not supported
+    :return: `int` interval length in milliseconds
+    """
+    unit = interval.get('unit', TimeUnit.SECOND)
+    if unit not in _unit_ms:
+        raise ValueError('Unsupported interval unit: ' + str(unit))
+    return int(round(interval['count'] * _unit_ms[unit]))
+
+
+def utc_offsets(times, tz):
+    """
+    :param times: `numpy.ndarray` times in milliseconds
+    :param tz: timezone
+    :return: `numpy.ndarray` UTC offsets of the timezone in milliseconds at the specified times
+    """
+    times = np.asarray(times, dtype=np.int64)
+    if tz is None or tz == pytz.utc or len(times) == 0:
+        return np.zeros(len(times), dtype=np.int64)
+    # Offsets change at most once an hour, calculate them for distinct hours only
+    hours, inverse = np.unique(times // _hour_ms, return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(int(h) * 3600, tz).utcoffset().total_seconds() * 1000
+                        for h in hours], dtype=np.int64)
+    return offsets[inverse.reshape(-1)]
+
+
+def to_utc(local, tz):
+    """
+    :param local: `numpy.ndarray` local times in milliseconds
+    :param tz: timezone
+    :return: `numpy.ndarray` UTC times in milliseconds
+    """
+    local = np.asarray(local, dtype=np.int64)
+    return local - utc_offsets(local - utc_offsets(local, tz), tz)
+
+
+def month_index(local):
+    """
+    :param local: `numpy.ndarray` local times in milliseconds
+    :return: `numpy.ndarray` number of months since January 1970
+    """
+    return np.asarray(local, dtype=np.int64).astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+
+
+def add_months_to_month_start(month, months):
+    """
+    :param month: `int` month number since January 1970
+    :param months: `int` | `numpy.ndarray` number of months to add
+    :return: `numpy.ndarray` local times in milliseconds of the resulting month starts
+    """
+    result = np.asarray(month + np.asarray(months, dtype=np.int64), dtype=np.int64)
+    return result.astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+
+
+def _months_between(start, end, tz):
+    months = np.array([start, end], dtype=np.int64) + utc_offsets(np.array([start, end]), tz)
+    months = months.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+    return int(months[1] - months[0])
+
+
+def _add_months(local, months):
+    """
+    Add months to local times, the day of month is limited by the month length.
+    """
+    local = np.asarray(local, dtype=np.int64)
+    month_start = local.astype('datetime64[ms]').astype('datetime64[M]')
+    intra_month = local - month_start.astype('datetime64[ms]').astype(np.int64)
+    target = month_start + np.asarray(months, dtype=np.int64)
+    target_ms = target.astype('datetime64[ms]').astype(np.int64)
+    month_length = (target + 1).astype('datetime64[ms]').astype(np.int64) - target_ms
+    # Keep time of day for days beyond the month end
+    day_offset = intra_month // _day_ms * _day_ms
+    limited = np.minimum(day_offset, month_length - _day_ms)
+    return target_ms + limited + (intra_month - day_offset)
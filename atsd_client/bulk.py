@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from requests.exceptions import RequestException
+
+from . import _jsonutil
+from ._utilities import chunked
+from .exceptions import ServerException
+from .models import Entity, Metric, Series, SeriesDeleteQuery
+from .services import SeriesService, EntitiesService, MetricsService, CommandsService
+
+#: Result of a bulk operation. `failed` is a `list` of (item, exception) pairs for failed requests.
+BulkResult = namedtuple('BulkResult', ['matched', 'processed', 'failed'])
+
+
+class _RateLimiter(object):
+    """
+    Allow at most rate calls of acquire per second, shared by all threads.
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _BulkExecutor(object):
+    """
+    Run requests on a bounded pool of threads with rate limiting and progress reporting.
+    """
+
+    def __init__(self, max_workers=4, rate_limit=None, dry_run=False, progress=None):
+        """
+        :param max_workers: `int` maximum number of concurrent requests. Default: 4
+        :param rate_limit: `Number` maximum number of requests per second. Default: None, not limited
+        :param dry_run: `bool` If True only count matched items without sending requests. Default: False
+        :param progress: callable invoked with the number of processed and total items after each request
+        """
+        self.max_workers = max_workers
+        self.dry_run = dry_run
+        self.progress = progress
+        self._rate_limiter = _RateLimiter(rate_limit)
+
+    def _run(self, tasks, total):
+        """
+        :param tasks: `list` of (items, function) pairs, the function sends one request for the items
+        :param total: `int` number of items in all tasks
+        :return: :class:`.BulkResult`
+        """
+        if self.dry_run:
+            return BulkResult(total, 0, [])
+        done = 0
+        processed = 0
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._call, function, items): items for items, function in tasks}
+            for future in as_completed(futures):
+                items = futures[future]
+                try:
+                    future.result()
+                    processed += len(items)
+                except (ServerException, RequestException) as e:
+                    logging.warning('Request for %s items failed: %s', len(items), e)
+                    failed.extend((item, e) for item in items)
+                done += len(items)
+                if self.progress is not None:
+                    self.progress(done, total)
+        return BulkResult(total, processed, failed)
+
+    def _call(self, function, items):
+        self._rate_limiter.acquire()
+        return function(items)
+
+
+class BulkDeleter(_BulkExecutor):
+    """
+    Delete many series or entities. Series delete queries are sent in batches, one request for each batch,
+    entities are deleted one request per entity. Requests are executed concurrently.
+    """
+
+    def __init__(self, conn, batch_size=100, max_workers=4, rate_limit=None, dry_run=False, progress=None):
+        """
+        :param conn: :class:`.Client`
+        :param batch_size: `int` maximum number of series delete queries in one request. Default: 100
+        :param max_workers: `int` maximum number of concurrent requests. Default: 4
+        :param rate_limit: `Number` maximum number of requests per second. Default: None, not limited
+        :param dry_run: `bool` If True only count matched series and entities without deleting them. Default: False
+        :param progress: callable invoked with the number of processed and total items after each request
+        """
+        super(BulkDeleter, self).__init__(max_workers, rate_limit, dry_run, progress)
+        self.batch_size = batch_size
+        self._series_service = SeriesService(conn)
+        self._entities_service = EntitiesService(conn)
+        self._metrics_service = MetricsService(conn)
+
+    def delete_series(self, series):
+        """Delete series.
+
+        :param series: iterable of :class:`.SeriesDeleteQuery` | :class:`.Series` objects.
+        Series are matched exactly by metric, entity and tags
+        :return: :class:`.BulkResult` with counts of delete queries
+        """
+        queries = [_delete_query(s) for s in series]
+        tasks = [(batch, self._delete_series_batch) for batch in chunked(queries, self.batch_size)]
+        return self._run(tasks, len(queries))
+
+    def delete_metric_series(self, metric, entity=None, tags=None, min_insert_date=None, max_insert_date=None):
+        """Delete series of the metric which match the filters.
+
+        :param metric: `str` | :class:`.Metric`
+        :param entity: `str` | :class:`.Entity`
+        :param tags: `dict`
+        :param min_insert_date: `int` | `str` | None | :class:`datetime`
+        :param max_insert_date: `int` | `str` | None | :class:`datetime`
+        :return: :class:`.BulkResult` with counts of series
+        """
+        series = self._metrics_service.series(metric, entity=entity, tags=tags, min_insert_date=min_insert_date,
+                                              max_insert_date=max_insert_date)
+        return self.delete_series(series)
+
+    def delete_entities(self, entities=None, expression=None, min_insert_date=None, max_insert_date=None):
+        """Delete entities from the list or entities matching the expression and insert dates.
+
+        :param entities: iterable of `str` entity names | :class:`.Entity` objects
+        :param expression: `str` entity filter expression, used if entities are not specified.
+        Either entities or expression is required, use expression 'true' to delete all entities
+        :param min_insert_date: `int` | `str` | None | :class:`datetime`
+        :param max_insert_date: `int` | `str` | None | :class:`datetime`
+        :return: :class:`.BulkResult` with counts of entities
+        """
+        if entities is None and not expression:
+            raise ValueError('Either entities or expression must be specified.')
+        if entities is None:
+            entities = self._entities_service.list(expression=expression, min_insert_date=min_insert_date,
+                                                   max_insert_date=max_insert_date, limit=0)
+        names = [e.name if isinstance(e, Entity) else e for e in entities]
+        tasks = [([name], self._delete_entity) for name in names]
+        return self._run(tasks, len(names))
+
+    def _delete_series_batch(self, queries):
+        return self._series_service.delete(*queries)
+
+    def _delete_entity(self, names):
+        return self._entities_service.delete(names[0])
+
+
+def _delete_query(series):
+    if isinstance(series, Series):
+        return SeriesDeleteQuery(series.entity, series.metric, dict(series.tags), exact_match=True)
+    return series
+
+
+#: Fields which are not changed by updates
+_read_only_fields = {'name', 'lastInsertDate', 'createdDate'}
+
+#: Network API command field prefixes
+_command_fields = {
+    Entity: ('entity', 'e', {'label': 'l', 'enabled': 'b', 'interpolate': 'i', 'timeZone': 'z'}),
+    Metric: ('metric', 'm', {'label': 'l', 'enabled': 'b', 'dataType': 'p', 'description': 'd', 'interpolate': 'i',
+                             'units': 'u', 'filter': 'f', 'timeZone': 'z', 'versioned': 'v', 'invalidAction': 'a',
+                             'minValue': 'min', 'maxValue': 'max'}),
+}
+
+
+class BulkUpserter(_BulkExecutor):
+    """
+    Create or update many entities and metrics. Objects are compared with the current server state, or with
+    a :class:`.MetadataCatalog` snapshot, and only changed fields and tags are sent.
+    Updates are sent as concurrent PATCH requests or as batches of `entity` and `metric` Network API commands.
+    """
+
+    def __init__(self, conn, max_workers=4, rate_limit=None, dry_run=False, progress=None, catalog=None,
+                 use_commands=False, batch_size=100):
+        """
+        :param conn: :class:`.Client`
+        :param max_workers: `int` maximum number of concurrent requests. Default: 4
+        :param rate_limit: `Number` maximum number of requests per second. Default: None, not limited
+        :param dry_run: `bool` If True only count changed objects without updating them. Default: False
+        :param progress: callable invoked with the number of processed and total changed objects after each request
+        :param catalog: :class:`.MetadataCatalog` with current objects. Default: None, objects are requested
+        :param use_commands: `bool` If True send changes as Network API commands. Fields which cannot be set
+        with commands, for example retention days, are sent with PATCH requests. Default: False
+        :param batch_size: `int` maximum number of names in one listing request and commands in one request.
+        Default: 100
+        """
+        super(BulkUpserter, self).__init__(max_workers, rate_limit, dry_run, progress)
+        self.catalog = catalog
+        self.use_commands = use_commands
+        self.batch_size = batch_size
+        self._services = {Entity: EntitiesService(conn), Metric: MetricsService(conn)}
+        self._commands_service = CommandsService(conn)
+
+    def upsert(self, objects):
+        """Create objects which do not exist and update changed fields and tags of existing objects.
+
+        :param objects: iterable of :class:`.Entity` | :class:`.Metric` objects
+        :return: :class:`.BulkResult` with counts of changed objects
+        """
+        objects = list(objects)
+        tasks = []
+        commands = []
+        total = 0
+        for obj, current in self._current(objects):
+            change = _changes(obj, current)
+            if change is None:
+                continue
+            total += 1
+            command = _to_command(change) if self.use_commands else None
+            if command is not None:
+                commands.append(command)
+            elif current is None:
+                tasks.append(([obj], self._create))
+            else:
+                tasks.append(([change], self._update))
+        tasks.extend((batch, self._send_commands) for batch in chunked(commands, self.batch_size))
+        return self._run(tasks, total)
+
+    def _current(self, objects):
+        """
+        :return: `list` of (object, current object or None) pairs
+        """
+        current = {}
+        if self.catalog is not None:
+            for obj in objects:
+                lookup = self.catalog.entity if isinstance(obj, Entity) else self.catalog.metric
+                current[(type(obj), obj.name.lower())] = lookup(obj.name)
+        else:
+            tasks = []
+            for model_class in (Entity, Metric):
+                names = sorted(set(obj.name.lower() for obj in objects if isinstance(obj, model_class)))
+                tasks.extend((model_class, chunk) for chunk in chunked(names, self.batch_size))
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for model_class, listed in executor.map(lambda task: (task[0], self._list(*task)), tasks):
+                    for obj in listed:
+                        current[(model_class, obj.name.lower())] = obj
+        return [(obj, current.get((type(obj), obj.name.lower()))) for obj in objects]
+
+    def _list(self, model_class, names):
+        self._rate_limiter.acquire()
+        expression = ' or '.join('name = "%s"' % name.replace('"', '\\"') for name in names)
+        return self._services[model_class].list(expression=expression, tags='*', limit=0)
+
+    def _update(self, changes):
+        return self._services[type(changes[0])].update(changes[0])
+
+    def _create(self, objects):
+        return self._services[type(objects[0])].create_or_replace(objects[0])
+
+    def _send_commands(self, commands):
+        return self._commands_service.send_commands(commands, commit=True)
+
+
+def _changes(obj, current):
+    """
+    :return: object with the name, changed fields and changed tags, or None if nothing is changed
+    """
+    desired = _jsonutil.serialize(obj)
+    existing = {} if current is None else _jsonutil.serialize(current)
+    changed = {key: value for key, value in desired.items()
+               if key not in _read_only_fields and key != 'tags' and existing.get(key) != value}
+    existing_tags = existing.get('tags') or {}
+    tags = {key: value for key, value in (desired.get('tags') or {}).items() if existing_tags.get(key) != value}
+    if tags:
+        changed['tags'] = tags
+    if not changed and current is not None:
+        return None
+    changed['name'] = obj.name
+    return _jsonutil.deserialize(changed, type(obj))
+
+
+def _to_command(change):
+    command, name_field, fields = _command_fields[type(change)]
+    serialized = _jsonutil.serialize(change)
+    parts = [command, '%s:%s' % (name_field, _quote(change.name))]
+    for key, value in serialized.items():
+        if key in ('name', 'tags'):
+            continue
+        if key not in fields:
+            return None
+        parts.append('%s:%s' % (fields[key], _quote(value)))
+    for key, value in (serialized.get('tags') or {}).items():
+        parts.append('t:%s=%s' % (_quote(key), _quote(value)))
+    return ' '.join(parts)
+
+
+def _quote(value):
+    value = str(value)
+    if not value or any(c in value for c in ' ="\t\n\r'):
+        return '"%s"' % value.replace('"', '""')
+    return value
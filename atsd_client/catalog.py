@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import bisect
+import json
+import logging
+import re
+import sqlite3
+from fnmatch import fnmatchcase
+
+from . import _jsonutil
+from ._time_utilities import to_iso, to_milliseconds
+from .models import Entity, Metric, EntityGroup
+from .services import EntitiesService, MetricsService, EntityGroupsService
+
+_model_classes = {'entity': Entity, 'metric': Metric, 'group': EntityGroup}
+
+
+def _to_record(obj):
+    return {key[1:] if key.startswith('_') else key: value for key, value in vars(obj).items() if value is not None}
+
+
+class MetadataCatalog(object):
+    """
+    Local copy of entities, metrics and entity groups.
+    Entities and metrics are refreshed incrementally: after the initial listing only objects with last insert date
+    at or after the previous watermark are requested. Objects without inserted data, deleted objects and group
+    membership are updated by a full refresh.
+    The catalog is optionally persisted to an sqlite database file and loaded from it on creation.
+    """
+
+    def __init__(self, conn, path=None):
+        """
+        :param conn: :class:`.Client`
+        :param path: `str` sqlite database file. Default: None, the catalog is kept in memory only
+        """
+        self._entities_service = EntitiesService(conn)
+        self._metrics_service = MetricsService(conn)
+        self._groups_service = EntityGroupsService(conn)
+        self._objects = {'entity': {}, 'metric': {}, 'group': {}}
+        #: `dict` of group name: `set` of member entity names
+        self._members = {}
+        #: `dict` of entity name: `set` of group names
+        self._entity_groups = {}
+        #: `dict` of object kind: maximum last insert date in milliseconds
+        self._watermarks = {}
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._create_tables()
+            self._load()
+
+    # ------------------------------------------------------------------ refresh
+    def refresh(self, full=False):
+        """Update entities and metrics from the server. Groups and their members are updated on full refresh
+        or if the catalog contains no groups.
+
+        :param full: `bool` If True all objects are listed again and objects deleted on the server are removed.
+        Default: False
+        :return: `int` number of received entities and metrics
+        """
+        count = 0
+        for kind, service in (('entity', self._entities_service), ('metric', self._metrics_service)):
+            watermark = None if full else self._watermarks.get(kind)
+            objects = service.list(min_insert_date=to_iso(watermark), tags='*', limit=0)
+            count += len(objects)
+            self._update(kind, objects, replace=full or watermark is None)
+            logging.debug('Catalog received %s %s objects since %s', len(objects), kind, to_iso(watermark))
+        if full or not self._objects['group']:
+            self.refresh_groups()
+        return count
+
+    def refresh_groups(self, *group_names):
+        """Update entity groups and their members.
+
+        :param group_names: `str` names of groups to update. Default: all groups
+        """
+        if group_names:
+            groups = [self._groups_service.get(name) for name in group_names]
+            groups = [g for g in groups if g is not None]
+        else:
+            groups = self._groups_service.list(tags='*', limit=0)
+        self._update('group', groups, replace=not group_names)
+        if not group_names:
+            self._members = {}
+            self._entity_groups = {}
+        for group in groups:
+            members = self._groups_service.get_entities(group.name, limit=0)
+            self._set_members(group.name, [e.name for e in members])
+        self._save_members(groups, replace=not group_names)
+
+    def _update(self, kind, objects, replace):
+        store = self._objects[kind]
+        if replace:
+            store.clear()
+        watermark = self._watermarks.get(kind)
+        for obj in objects:
+            store[obj.name.lower()] = obj
+            last_insert_date = getattr(obj, 'last_insert_date', None)
+            if last_insert_date is not None:
+                ms = int(to_milliseconds(last_insert_date))
+                if watermark is None or ms > watermark:
+                    watermark = ms
+        if watermark is not None:
+            self._watermarks[kind] = watermark
+        self._save(kind, objects, replace)
+
+    def _set_members(self, group_name, entity_names):
+        group_name = group_name.lower()
+        for entity_name in self._members.get(group_name, ()):
+            self._entity_groups.get(entity_name, set()).discard(group_name)
+        members = set(name.lower() for name in entity_names)
+        self._members[group_name] = members
+        for entity_name in members:
+            self._entity_groups.setdefault(entity_name, set()).add(group_name)
+
+    # ------------------------------------------------------------------ lookups
+    def entity(self, name):
+        """
+        :param name: `str` entity name
+        :return: :class:`.Entity` or None
+        """
+        return self._objects['entity'].get(name.lower())
+
+    def metric(self, name):
+        """
+        :param name: `str` metric name
+        :return: :class:`.Metric` or None
+        """
+        return self._objects['metric'].get(name.lower())
+
+    def group(self, name):
+        """
+        :param name: `str` entity group name
+        :return: :class:`.EntityGroup` or None
+        """
+        return self._objects['group'].get(name.lower())
+
+    def entities(self):
+        """
+        :return: `list` of :class:`.Entity` objects
+        """
+        return list(self._objects['entity'].values())
+
+    def metrics(self):
+        """
+        :return: `list` of :class:`.Metric` objects
+        """
+        return list(self._objects['metric'].values())
+
+    def groups(self):
+        """
+        :return: `list` of :class:`.EntityGroup` objects
+        """
+        return list(self._objects['group'].values())
+
+    def entity_label(self, name):
+        """
+        :param name: `str` entity name
+        :return: `str` entity label or None
+        """
+        entity = self.entity(name)
+        return None if entity is None else entity.label
+
+    def metric_retention_days(self, name):
+        """
+        :param name: `str` metric name
+        :return: `Number` retention days or None
+        """
+        metric = self.metric(name)
+        return None if metric is None else metric.retention_days
+
+    def group_members(self, group_name):
+        """
+        :param group_name: `str` entity group name
+        :return: `frozenset` of member entity names
+        """
+        return frozenset(self._members.get(group_name.lower(), ()))
+
+    def entity_groups(self, entity_name):
+        """
+        :param entity_name: `str` entity name
+        :return: `frozenset` of names of groups the entity belongs to
+        """
+        return frozenset(self._entity_groups.get(entity_name.lower(), ()))
+
+    def entity_tag_index(self, ignore_case=True):
+        """
+        :param ignore_case: `bool` If True tag values are compared case-insensitively. Default: True
+        :return: :class:`.TagIndex` of entity tags
+        """
+        return TagIndex(self._objects['entity'].values(), ignore_case)
+
+    def metric_tag_index(self, ignore_case=True):
+        """
+        :param ignore_case: `bool` If True tag values are compared case-insensitively. Default: True
+        :return: :class:`.TagIndex` of metric tags
+        """
+        return TagIndex(self._objects['metric'].values(), ignore_case)
+
+    # -------------------------------------------------------------- persistence
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _create_tables(self):
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS objects '
+                             '(kind TEXT, name TEXT, body TEXT, PRIMARY KEY (kind, name))')
+            self._db.execute('CREATE TABLE IF NOT EXISTS members '
+                             '(group_name TEXT, entity_name TEXT, PRIMARY KEY (group_name, entity_name))')
+            self._db.execute('CREATE TABLE IF NOT EXISTS watermarks (kind TEXT PRIMARY KEY, value INTEGER)')
+
+    def _load(self):
+        for kind, name, body in self._db.execute('SELECT kind, name, body FROM objects'):
+            self._objects[kind][name] = _jsonutil.deserialize(json.loads(body), _model_classes[kind])
+        members = {}
+        for group_name, entity_name in self._db.execute('SELECT group_name, entity_name FROM members'):
+            members.setdefault(group_name, []).append(entity_name)
+        for group_name, entity_names in members.items():
+            self._set_members(group_name, entity_names)
+        self._watermarks = dict(self._db.execute('SELECT kind, value FROM watermarks'))
+
+    def _save(self, kind, objects, replace):
+        if self._db is None:
+            return
+        with self._db:
+            if replace:
+                self._db.execute('DELETE FROM objects WHERE kind = ?', (kind,))
+            self._db.executemany('INSERT OR REPLACE INTO objects VALUES (?, ?, ?)',
+                                 [(kind, obj.name.lower(), json.dumps(_to_record(obj), default=to_iso))
+                                  for obj in objects])
+            if kind in self._watermarks:
+                self._db.execute('INSERT OR REPLACE INTO watermarks VALUES (?, ?)', (kind, self._watermarks[kind]))
+
+    def _save_members(self, groups, replace):
+        if self._db is None:
+            return
+        with self._db:
+            if replace:
+                self._db.execute('DELETE FROM members')
+            for group in groups:
+                group_name = group.name.lower()
+                self._db.execute('DELETE FROM members WHERE group_name = ?', (group_name,))
+                self._db.executemany('INSERT INTO members VALUES (?, ?)',
+                                     [(group_name, entity_name) for entity_name in self._members[group_name]])
+
+
+_wildcard = re.compile(r'[*?\[]')
+
+
+class TagIndex(object):
+    """
+    Inverted index of entity or metric tags: tag name, tag value, names of objects with the tag value.
+    Build the index from one listing, for example ``EntitiesService.list(tags='*')``, and answer tag lookups locally.
+    """
+
+    def __init__(self, objects=None, ignore_case=True):
+        """
+        :param objects: :class:`.Entity` | :class:`.Metric` objects with tags
+        :param ignore_case: `bool` If True tag values are compared case-insensitively. Default: True
+        """
+        self.ignore_case = ignore_case
+        #: `dict` of tag name: `dict` of tag value: `set` of object names
+        self._index = {}
+        #: `dict` of tag name: sorted `list` of tag values, built on first prefix lookup
+        self._sorted_values = {}
+        if objects is not None:
+            self.add(*objects)
+
+    def add(self, *objects):
+        for obj in objects:
+            if not obj.tags:
+                continue
+            for tag, value in obj.tags.items():
+                tag = tag.lower()
+                values = self._index.setdefault(tag, {})
+                values.setdefault(self._normalize(value), set()).add(obj.name)
+                self._sorted_values.pop(tag, None)
+
+    def _normalize(self, value):
+        value = str(value)
+        return value.lower() if self.ignore_case else value
+
+    def tags(self):
+        """
+        :return: `list` of indexed tag names
+        """
+        return list(self._index)
+
+    def values(self, tag):
+        """
+        :param tag: `str` tag name
+        :return: sorted `list` of distinct tag values
+        """
+        tag = tag.lower()
+        if tag not in self._sorted_values:
+            self._sorted_values[tag] = sorted(self._index.get(tag, ()))
+        return self._sorted_values[tag]
+
+    def equals(self, tag, value):
+        """
+        :param tag: `str` tag name
+        :param value: `str` tag value
+        :return: `set` of names of objects with the tag equal to the value
+        """
+        return set(self._index.get(tag.lower(), {}).get(self._normalize(value), ()))
+
+    def prefix(self, tag, prefix):
+        """
+        :param tag: `str` tag name
+        :param prefix: `str` tag value prefix
+        :return: `set` of names of objects with the tag value starting with the prefix
+        """
+        values = self._index.get(tag.lower(), {})
+        result = set()
+        for value in self._values_with_prefix(tag, self._normalize(prefix)):
+            result.update(values[value])
+        return result
+
+    def match(self, tag, pattern):
+        """
+        :param tag: `str` tag name
+        :param pattern: `str` tag value pattern with * and ? wildcards
+        :return: `set` of names of objects with the tag value matching the pattern
+        """
+        pattern = self._normalize(pattern)
+        wildcard = _wildcard.search(pattern)
+        if wildcard is None:
+            return self.equals(tag, pattern)
+        values = self._index.get(tag.lower(), {})
+        result = set()
+        # Only values starting with the literal part of the pattern are matched
+        for value in self._values_with_prefix(tag, pattern[:wildcard.start()]):
+            if fnmatchcase(value, pattern):
+                result.update(values[value])
+        return result
+
+    def group_by(self, tag):
+        """
+        :param tag: `str` tag name
+        :return: `dict` of tag value: `set` of object names
+        """
+        return {value: set(names) for value, names in self._index.get(tag.lower(), {}).items()}
+
+    def _values_with_prefix(self, tag, prefix):
+        values = self.values(tag)
+        start = bisect.bisect_left(values, prefix)
+        for value in values[start:]:
+            if not value.startswith(prefix):
+                break
+            yield value
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import namedtuple, deque
+
+from . import _constants
+from .exceptions import ServerException
+from .models import Series, Sample
+
+#: Request lifecycle events for :meth:`.Client.add_hook`
+HOOK_EVENTS = ('before_serialize', 'before_send', 'after_receive', 'after_decode', 'on_error')
+
+#: Upper bounds of latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+
+#: Statistics of requests to one endpoint. Latency percentiles are calculated from the most recent requests,
+#: `errors` is a `dict` of status code or exception name: count, `buckets` contains cumulative request counts
+#: for each of :data:`LATENCY_BUCKETS`. Times are in seconds.
+EndpointStats = namedtuple('EndpointStats', ['method', 'endpoint', 'count', 'errors', 'p50', 'p95', 'p99',
+                                             'max_latency', 'total_latency', 'request_bytes', 'response_bytes',
+                                             'serialize_time', 'decode_time', 'buckets'])
+
+
+def _url_templates():
+    literal = {}
+    patterns = []
+    for name, value in vars(_constants).items():
+        if not isinstance(value, str) or not (name.endswith('_url') or name == 'portal_export'):
+            continue
+        if '{' not in value:
+            literal[value] = value
+        else:
+            regex = re.escape(value)
+            regex = re.sub(r'\\{\w+\\}', '[^/]+', regex)
+            patterns.append((len(re.sub(r'{\w+}', '', value)), re.compile(regex + '$'), value))
+    # Templates with longer literal parts are more specific
+    patterns.sort(key=lambda pattern: -pattern[0])
+    return literal, [(regex, value) for _, regex, value in patterns]
+
+
+_literal_urls, _url_patterns = _url_templates()
+_url_segments = set(segment for url in list(_literal_urls) + [template for _, template in _url_patterns]
+                    for segment in url.split('/') if '{' not in segment)
+
+
+def endpoint_template(path):
+    """
+    :param path: `str` request path relative to the API context, for example v1/metrics/cpu_busy/series?limit=1
+    :return: `str` API url template without query string, for example v1/metrics/{metric}/series.
+    Segments of unknown paths that do not occur in API urls are replaced with {param}
+    """
+    path = path.split('?', 1)[0]
+    if path in _literal_urls:
+        return path
+    for regex, template in _url_patterns:
+        if regex.match(path):
+            return template
+    return '/'.join(segment if segment in _url_segments else '{param}' for segment in path.split('/'))
+
+
+class RequestRecord(object):
+    """
+    Timings and sizes of one request, filled by :class:`.Client` while the request is executed
+    and passed to request hooks. Times are in seconds.
+    """
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint_template(path)
+        #: `str` identifier sent in the request id header, can be replaced by before_serialize hooks
+        self.request_id = uuid.uuid4().hex
+        self.start = time.perf_counter()
+        #: `Number` seconds from the start to the end of the request including reading and decoding the response
+        self.latency = None
+        self.serialize_time = 0
+        #: `Number` seconds from sending the request to receiving the response headers
+        self.send_time = None
+        #: `Number` seconds spent parsing the JSON response body. Conversion to model objects is not included
+        self.decode_time = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.status_code = None
+        #: JSON request payload before serialization or request body
+        self.payload = None
+        #: :class:`requests.PreparedRequest`
+        self.request = None
+        #: :class:`requests.Response`
+        self.response = None
+        #: decoded response body
+        self.content = None
+        #: `Exception` raised by the request
+        self.error = None
+
+    @property
+    def elapsed(self):
+        """
+        :return: `Number` seconds since the start of the request
+        """
+        return time.perf_counter() - self.start
+
+    @property
+    def error_code(self):
+        if self.error is None:
+            return None
+        if isinstance(self.error, ServerException):
+            return str(self.error.status_code)
+        return type(self.error).__name__
+
+
+class _EndpointCounters(object):
+    def __init__(self, method, endpoint, reservoir_size):
+        self.method = method
+        self.endpoint = endpoint
+        self.count = 0
+        self.errors = {}
+        self.latencies = deque(maxlen=reservoir_size)
+        self.max_latency = 0
+        self.total_latency = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.serialize_time = 0
+        self.decode_time = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def add(self, record):
+        self.count += 1
+        code = record.error_code
+        if code is not None:
+            self.errors[code] = self.errors.get(code, 0) + 1
+        self.latencies.append(record.latency)
+        self.max_latency = max(self.max_latency, record.latency)
+        self.total_latency += record.latency
+        self.request_bytes += record.request_bytes
+        self.response_bytes += record.response_bytes
+        self.serialize_time += record.serialize_time
+        self.decode_time += record.decode_time
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, record.latency)] += 1
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        buckets = []
+        cumulative = 0
+        for count in self.buckets:
+            cumulative += count
+            buckets.append(cumulative)
+        return EndpointStats(self.method, self.endpoint, self.count, dict(self.errors),
+                             _percentile(latencies, 50), _percentile(latencies, 95), _percentile(latencies, 99),
+                             self.max_latency, self.total_latency, self.request_bytes, self.response_bytes,
+                             self.serialize_time, self.decode_time, buckets)
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+class Instrumentation(object):
+    """
+    Request statistics of a client grouped by HTTP method and endpoint template.
+    """
+
+    def __init__(self, reservoir_size=1000):
+        """
+        :param reservoir_size: `int` number of the most recent requests to each endpoint
+        used to calculate latency percentiles. Default: 1000
+        """
+        self.reservoir_size = reservoir_size
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        """
+        :param record: :class:`.RequestRecord` of a completed request
+        """
+        key = (record.method, record.endpoint)
+        with self._lock:
+            counters = self._endpoints.get(key)
+            if counters is None:
+                counters = self._endpoints[key] = _EndpointCounters(record.method, record.endpoint,
+                                                                    self.reservoir_size)
+            counters.add(record)
+
+    def snapshot(self):
+        """
+        :return: `dict` of (method, endpoint): :class:`.EndpointStats`
+        """
+        with self._lock:
+            return {key: counters.snapshot() for key, counters in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+# -------------------------------------------------------------------- EXPORTERS
+class LoggingExporter(object):
+    """
+    Write statistics of each endpoint to the log.
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        """
+        :param logger: :class:`logging.Logger`. Default: root logger
+        :param level: `int` logging level. Default: INFO
+        """
+        self.logger = logger or logging.getLogger()
+        self.level = level
+
+    def export(self, stats):
+        """
+        :param stats: `dict` returned by :meth:`.Client.stats`
+        """
+        for s in sorted(stats.values(), key=lambda s: -s.total_latency):
+            self.logger.log(self.level, '%s %s: count=%s errors=%s p50=%.3fs p95=%.3fs p99=%.3fs max=%.3fs '
+                                        'total=%.3fs sent=%sB received=%sB serialize=%.3fs decode=%.3fs',
+                            s.method, s.endpoint, s.count, s.errors, s.p50 or 0, s.p95 or 0, s.p99 or 0,
+                            s.max_latency, s.total_latency, s.request_bytes, s.response_bytes, s.serialize_time,
+                            s.decode_time)
+
+
+def _prometheus_labels(**labels):
+    return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                             for k, v in sorted(labels.items()))
+
+
+class PrometheusExporter(object):
+    """
+    Write statistics to a file in Prometheus text format, for example for the node exporter textfile collector.
+    The file is replaced atomically.
+    """
+
+    def __init__(self, path, prefix='atsd_client'):
+        """
+        :param path: `str` file name, should end with .prom for the textfile collector
+        :param prefix: `str` prefix of metric names. Default: atsd_client
+        """
+        self.path = path
+        self.prefix = prefix
+
+    def export(self, stats):
+        """
+        :param stats: `dict` returned by :meth:`.Client.stats`
+        """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.format(stats))
+        os.replace(tmp_path, self.path)
+
+    def format(self, stats):
+        """
+        :param stats: `dict` returned by :meth:`.Client.stats`
+        :return: `str` statistics in Prometheus text format
+        """
+        p = self.prefix
+        stats = sorted(stats.values(), key=lambda s: (s.endpoint, s.method))
+        lines = []
+
+        def counter(name, help, value_of):
+            lines.append('# HELP %s_%s %s' % (p, name, help))
+            lines.append('# TYPE %s_%s counter' % (p, name))
+            for s in stats:
+                lines.append('%s_%s%s %s' % (p, name, _prometheus_labels(method=s.method, endpoint=s.endpoint),
+                                             value_of(s)))
+
+        counter('requests_total', 'Number of requests.', lambda s: s.count)
+        lines.append('# HELP %s_request_errors_total Number of failed requests.' % p)
+        lines.append('# TYPE %s_request_errors_total counter' % p)
+        for s in stats:
+            for code, count in sorted(s.errors.items()):
+                lines.append('%s_request_errors_total%s %s'
+                             % (p, _prometheus_labels(method=s.method, endpoint=s.endpoint, code=code), count))
+        lines.append('# HELP %s_request_duration_seconds Request latency.' % p)
+        lines.append('# TYPE %s_request_duration_seconds histogram' % p)
+        for s in stats:
+            for bound, count in zip(LATENCY_BUCKETS, s.buckets):
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append('%s_request_duration_seconds_bucket%s %s'
+                             % (p, _prometheus_labels(method=s.method, endpoint=s.endpoint, le=le), count))
+            labels = _prometheus_labels(method=s.method, endpoint=s.endpoint)
+            lines.append('%s_request_duration_seconds_sum%s %r' % (p, labels, s.total_latency))
+            lines.append('%s_request_duration_seconds_count%s %s' % (p, labels, s.count))
+        counter('request_bytes_total', 'Size of request bodies.', lambda s: s.request_bytes)
+        counter('response_bytes_total', 'Size of response bodies.', lambda s: s.response_bytes)
+        counter('serialize_seconds_total', 'Time spent encoding request bodies.', lambda s: repr(s.serialize_time))
+        counter('decode_seconds_total', 'Time spent parsing JSON response bodies.', lambda s: repr(s.decode_time))
+        return '\n'.join(lines) + '\n'
+
+
+class SeriesExporter(object):
+    """
+    Insert statistics into ATSD as series of the specified entity, tagged with method and endpoint.
+    """
+
+    _fields = ('count', 'p50', 'p95', 'p99', 'max_latency', 'total_latency', 'request_bytes', 'response_bytes',
+               'serialize_time', 'decode_time')
+
+    def __init__(self, conn, entity, metric_prefix='atsd_client.'):
+        """
+        :param conn: :class:`.Client` connection used to insert series, can be the instrumented client
+        :param entity: `str` entity name, for example the application host name
+        :param metric_prefix: `str` prefix of metric names. Default: atsd_client.
+        """
+        self.conn = conn
+        self.entity = entity
+        self.metric_prefix = metric_prefix
+
+    def export(self, stats):
+        """
+        :param stats: `dict` returned by :meth:`.Client.stats`
+        """
+        now = int(time.time() * 1000)
+        series = []
+        for s in stats.values():
+            tags = {'method': s.method, 'endpoint': s.endpoint}
+            values = {field: getattr(s, field) for field in self._fields}
+            values['errors'] = sum(s.errors.values())
+            for field, value in sorted(values.items()):
+                if value is not None:
+                    series.append(Series(self.entity, self.metric_prefix + field, data=[Sample(value, now)],
+                                         tags=tags))
+        if series:
+            self.conn.post(_constants.series_insert_url, series)
+
+
+class PeriodicExporter(object):
+    """
+    Export statistics of a client in a background thread.
+    """
+
+    def __init__(self, client, interval, *exporters):
+        """
+        :param client: :class:`.Client`
+        :param interval: `Number` seconds between exports
+        :param exporters: objects with `export(stats)` method, for example :class:`.PrometheusExporter`
+        """
+        self.client = client
+        self.interval = interval
+        self.exporters = exporters
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='atsd-client-stats-exporter')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and export statistics for the last time."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.export()
+
+    def export(self):
+        stats = self.client.stats()
+        for exporter in self.exporters:
+            try:
+                exporter.export(stats)
+            except Exception as e:
+                logging.warning('Failed to export client statistics with %s: %s', type(exporter).__name__, e)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.export()
@@ -0,0 +1,519 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from requests.exceptions import RequestException
+
+from ._time_utilities import to_milliseconds
+from ._utilities import chunked
+from .exceptions import ServerException
+from .models import Metric, Entity, Series, Sample, SeriesQuery, SeriesFilter, EntityFilter, DateFilter, \
+    TransformationFilter, Aggregate, AggregateType, PeriodAlign, ControlFilter
+from .services import SeriesService, MetricsService
+
+#: Result of a replication. `skipped` is the number of series without samples to copy, for example series copied
+#: by a previous run recorded in the checkpoint. `failed` is a `list` of (chunk, exception) pairs for chunks
+#: which were not copied.
+ReplicationResult = namedtuple('ReplicationResult', ['chunks', 'samples', 'skipped', 'failed'])
+
+#: Part of the copied data: series of one metric and the [start, end) interval in milliseconds.
+#: `series` is a `tuple` of (entity, tags) pairs.
+Chunk = namedtuple('Chunk', ['metric', 'series', 'start', 'end'])
+
+#: Summary of series samples in a time window. `hash` is None unless samples are hashed on the client.
+Digest = namedtuple('Digest', ['count', 'min', 'max', 'sum', 'hash'])
+
+#: Time window [start, end) in milliseconds with different source and target digests of the source series.
+#: A digest is None if the server has no samples in the window.
+Mismatch = namedtuple('Mismatch', ['metric', 'entity', 'tags', 'start', 'end', 'source', 'target'])
+
+_unit_ms = {
+    'MILLISECOND': 1,
+    'SECOND': 1000,
+    'MINUTE': 60000,
+    'HOUR': 3600000,
+    'DAY': 86400000,
+    'WEEK': 604800000,
+}
+
+
+def _interval_ms(interval):
+    if isinstance(interval, dict):
+        if interval['unit'] not in _unit_ms:
+            raise ValueError('Unsupported interval unit: %s' % interval['unit'])
+        return int(interval['count'] * _unit_ms[interval['unit']])
+    return int(interval)
+
+
+def _series_key(metric, entity, tags):
+    return '%s\t%s\t%s' % (metric, entity, json.dumps(tags, sort_keys=True))
+
+
+class Transform(object):
+    """
+    Change series identifiers and timestamps while data is copied.
+    """
+
+    def __init__(self, metric=None, entity=None, rename_tags=None, drop_tags=None, time_shift=0):
+        """
+        :param metric: `str` target metric name. Default: None, source metric name
+        :param entity: `str` target entity name. Default: None, source entity name
+        :param rename_tags: `dict` of source tag name: target tag name
+        :param drop_tags: `list` of names of tags which are not copied
+        :param time_shift: `int` milliseconds | `dict` interval with count and unit added to sample timestamps
+        """
+        self.metric = metric
+        self.entity = entity
+        self.rename_tags = rename_tags or {}
+        self.drop_tags = set(drop_tags or ())
+        self.time_shift = _interval_ms(time_shift)
+
+    def __call__(self, series):
+        """
+        :param series: :class:`.Series` source series
+        :return: :class:`.Series` target series
+        """
+        tags = {self.rename_tags.get(k, k): v for k, v in series.tags.items() if k not in self.drop_tags}
+        data = series.data
+        if self.time_shift:
+            data = [Sample(value=s.v, time=s.t + self.time_shift, version=s.version, x=s.x) for s in data]
+        return Series(self.entity or series.entity, self.metric or series.metric, data=data, tags=tags)
+
+
+class Checkpoint(object):
+    """
+    Replication progress stored in a JSON file: for each series the time until which samples are copied.
+    A replication interrupted and started again with the same checkpoint file continues each series
+    from its stored time.
+    """
+
+    def __init__(self, path, save_interval=5):
+        """
+        :param path: `str` checkpoint file, created if it does not exist
+        :param save_interval: `Number` minimum number of seconds between writes of the file. Default: 5
+        """
+        self.path = path
+        self.save_interval = save_interval
+        #: `dict` of series key: time in milliseconds before which all samples are copied
+        self._positions = {}
+        #: `dict` of series key: `dict` of start: end of windows copied after the position
+        self._completed = {}
+        self._saved = time.time()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self._positions = json.load(f)
+
+    def position(self, key):
+        """
+        :param key: `str` series key
+        :return: `int` milliseconds before which samples of the series are copied or None
+        """
+        with self._lock:
+            return self._positions.get(key)
+
+    def start(self, key, position):
+        """Set the position of a series which is not copied yet.
+        """
+        with self._lock:
+            self._positions.setdefault(key, position)
+
+    def add(self, key, start, end):
+        """Record copied window [start, end) of the series. The position moves forward when all windows
+        before the window are copied.
+        """
+        with self._lock:
+            completed = self._completed.setdefault(key, {})
+            completed[start] = max(end, completed.get(start, end))
+            position = self._positions[key]
+            advanced = True
+            while advanced:
+                advanced = False
+                for window_start in [w for w in completed if w <= position]:
+                    position = max(position, completed.pop(window_start))
+                    advanced = True
+            self._positions[key] = position
+            if not completed:
+                del self._completed[key]
+            if time.time() - self._saved < self.save_interval:
+                return
+        self.save()
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._positions, f)
+            os.replace(tmp_path, self.path)
+            self._saved = time.time()
+
+
+class Replicator(object):
+    """
+    Copy series from one server to another without loading all data in memory.
+    Series of each metric are split into chunks: groups of at most series_per_request series and windows of time.
+    Windows of a group start at the first sample of its series and end after the last sample, the bounds are
+    found by one query per group. Chunks are read from the source by max_readers threads, transformed and inserted
+    into the target by max_writers threads. At most max_readers + max_writers chunks are in progress, so the memory used by the copy is bounded
+    by the window size. The time until which each series is copied is recorded in the optional checkpoint.
+    """
+
+    def __init__(self, source, target, window=None, series_per_request=10, max_readers=4, max_writers=4,
+                 transform=None, checkpoint=None, progress=None):
+        """
+        :param source: :class:`.Client` source server
+        :param target: :class:`.Client` target server, can be the same as source if series are transformed
+        :param window: `dict` interval with count and unit | `int` milliseconds. Duration of a chunk.
+        Default: {'count': 1, 'unit': 'DAY'}
+        :param series_per_request: `int` maximum number of series read and inserted by one request. Default: 10
+        :param max_readers: `int` maximum number of concurrent source queries. Default: 4
+        :param max_writers: `int` maximum number of concurrent target inserts. Default: 4
+        :param transform: :class:`.Transform` | callable which returns a new :class:`.Series` for the source series
+        or None to skip it. Default: None, series are copied as is
+        :param checkpoint: :class:`.Checkpoint` | `str` checkpoint file. Default: None, progress is not saved
+        :param progress: callable invoked with the number of copied chunks and samples after each chunk
+        """
+        self._source_series = SeriesService(source)
+        self._source_metrics = MetricsService(source)
+        self._target_series = SeriesService(target)
+        self.window = _interval_ms({'count': 1, 'unit': 'DAY'} if window is None else window)
+        self.series_per_request = series_per_request
+        self.max_readers = max_readers
+        self.max_writers = max_writers
+        self.transform = transform
+        self.checkpoint = Checkpoint(checkpoint) if isinstance(checkpoint, str) else checkpoint
+        self.progress = progress
+
+    def run(self, metrics=None, entity=None, tags=None, start_date='1970-01-01T00:00:00Z', end_date='now'):
+        """Copy series of the metrics which match the filters.
+
+        :param metrics: `list` of `str` metric names | :class:`.Metric` objects. Default: all metrics
+        :param entity: `str` | :class:`.Entity` copy series of the entity only
+        :param tags: `dict` copy series with the tags only
+        :param start_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: 1970-01-01
+        :param end_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: now
+        :return: :class:`.ReplicationResult`
+        """
+        start = int(to_milliseconds(start_date))
+        end = int(to_milliseconds(time.time() * 1000 if end_date == 'now' else end_date))
+        if metrics is None:
+            metrics = self._source_metrics.list()
+        if isinstance(entity, Entity):
+            entity = entity.name
+        skipped = []
+        chunks = self._chunks(metrics, entity, tags, start, end, skipped)
+        try:
+            result = self._copy(chunks)
+            return result._replace(skipped=len(skipped))
+        finally:
+            if self.checkpoint is not None:
+                self.checkpoint.save()
+
+    def _chunks(self, metrics, entity, tags, start, end, skipped):
+        for metric in metrics:
+            name = metric.name if isinstance(metric, Metric) else metric
+            series_list = [s for s in self._source_metrics.series(name, entity=entity, tags=tags)
+                           if s.last_insert_date is None or to_milliseconds(s.last_insert_date) >= start]
+            for group in chunked(series_list, self.series_per_request):
+                series = [(s.entity, dict(s.tags)) for s in group]
+                bounds = self._bounds(name, series, start, end)
+                ranges = []
+                for (entity_name, series_tags), (first, last) in zip(series, bounds):
+                    key = _series_key(name, entity_name, series_tags)
+                    position = None if self.checkpoint is None or first is None else self.checkpoint.position(key)
+                    series_start = first if position is None else max(first, position)
+                    if first is None or series_start > last:
+                        skipped.append(key)
+                    else:
+                        ranges.append(((entity_name, series_tags), series_start, last + 1))
+                if not ranges:
+                    continue
+                group_start = min(r[1] for r in ranges)
+                group_end = max(r[2] for r in ranges)
+                if self.checkpoint is not None:
+                    for (entity_name, series_tags), series_start, _ in ranges:
+                        self.checkpoint.start(_series_key(name, entity_name, series_tags), group_start)
+                series = tuple(r[0] for r in ranges)
+                for window_start in range(group_start, group_end, self.window):
+                    yield Chunk(name, series, window_start, min(window_start + self.window, group_end))
+
+    def _bounds(self, metric, series, start, end):
+        """
+        :return: `list` of (first, last) sample times in milliseconds within [start, end) for each series,
+        (None, None) for series without samples
+        """
+        date_filter = DateFilter(start_date=start, end_date=end)
+        queries = []
+        for i, (entity, tags) in enumerate(series):
+            for direction in ('ASC', 'DESC'):
+                queries.append(SeriesQuery(series_filter=SeriesFilter(metric, tags=tags, exact_match=True),
+                                           entity_filter=EntityFilter(entity), date_filter=date_filter,
+                                           control_filter=ControlFilter(limit=1, direction=direction,
+                                                                        request_id='%s-%s' % (direction, i),
+                                                                        time_format='milliseconds')))
+        times = {}
+        for result in self._source_series.query(*queries):
+            if result.data:
+                times[result.request_id] = result.data[0].t
+        return [(times.get('ASC-%s' % i), times.get('DESC-%s' % i)) for i in range(len(series))]
+
+    def _copy(self, chunks):
+        copied = 0
+        samples = 0
+        failed = []
+        limit = self.max_readers + self.max_writers
+        # future: (stage, chunk)
+        futures = {}
+        chunks = iter(chunks)
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.max_readers) as readers, \
+                ThreadPoolExecutor(max_workers=self.max_writers) as writers:
+            while True:
+                while not exhausted and len(futures) < limit:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                    else:
+                        futures[readers.submit(self._read, chunk)] = ('read', chunk)
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, chunk = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except (ServerException, RequestException) as e:
+                        logging.warning('Failed to %s %s series of %s from %s to %s: %s', stage, len(chunk.series),
+                                        chunk.metric, chunk.start, chunk.end, e)
+                        failed.append((chunk, e))
+                        continue
+                    if stage == 'read' and result:
+                        futures[writers.submit(self._write, result)] = ('write', chunk)
+                        continue
+                    copied += 1
+                    samples += result or 0
+                    if self.checkpoint is not None:
+                        for entity, tags in chunk.series:
+                            self.checkpoint.add(_series_key(chunk.metric, entity, tags), chunk.start, chunk.end)
+                    if self.progress is not None:
+                        self.progress(copied, samples)
+        return ReplicationResult(copied, samples, 0, failed)
+
+    def _read(self, chunk):
+        """
+        :return: `list` of transformed :class:`.Series` with samples
+        """
+        date_filter = DateFilter(start_date=chunk.start, end_date=chunk.end)
+        queries = [SeriesQuery(series_filter=SeriesFilter(chunk.metric, tags=tags, exact_match=True),
+                               entity_filter=EntityFilter(entity), date_filter=date_filter)
+                   for entity, tags in chunk.series]
+        result = []
+        for series in self._source_series.query(*queries):
+            if not series.data:
+                continue
+            if self.transform is not None:
+                series = self.transform(series)
+                if series is None or not series.data:
+                    continue
+            result.append(series)
+        return result
+
+    def _write(self, series_list):
+        """
+        :return: `int` number of inserted samples
+        """
+        self._target_series.insert(*series_list)
+        return sum(len(series.data) for series in series_list)
+
+
+def replicate(source, target, metrics=None, entity=None, tags=None, start_date='1970-01-01T00:00:00Z',
+              end_date='now', **options):
+    """Copy series of the metrics which match the filters from source to target server.
+
+    :param source: :class:`.Client` source server
+    :param target: :class:`.Client` target server
+    :param metrics: `list` of `str` metric names | :class:`.Metric` objects. Default: all metrics
+    :param entity: `str` | :class:`.Entity` copy series of the entity only
+    :param tags: `dict` copy series with the tags only
+    :param start_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: 1970-01-01
+    :param end_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: now
+    :param options: :class:`.Replicator` parameters: window, series_per_request, max_readers, max_writers,
+    transform, checkpoint, progress
+    :return: :class:`.ReplicationResult`
+    """
+    return Replicator(source, target, **options).run(metrics, entity, tags, start_date, end_date)
+
+
+def _digests_equal(a, b):
+    if a is None or b is None:
+        return a is b
+    return a.count == b.count and a.hash == b.hash and all(
+        x == y or (x is not None and y is not None and math.isclose(x, y, rel_tol=1e-9))
+        for x, y in ((a.min, b.min), (a.max, b.max), (a.sum, b.sum)))
+
+
+class Verifier(object):
+    """
+    Compare series copied by a migration without transferring samples.
+    Count, minimum, maximum and sum of samples in each window are calculated by the source and target servers
+    with aggregation queries. Windows with different digests are split in halves and compared again until
+    the window is not longer than min_window, so only the differing intervals are reported.
+    If hash_samples is enabled, samples are read instead and digests including a hash of timestamps and values
+    are calculated on the client, one window at a time.
+    """
+
+    def __init__(self, source, target, window=None, min_window=None, hash_samples=False, transform=None,
+                 max_workers=4):
+        """
+        :param source: :class:`.Client` source server
+        :param target: :class:`.Client` target server
+        :param window: `dict` interval with count and unit | `int` milliseconds. Duration of compared windows.
+        Default: {'count': 1, 'unit': 'DAY'}
+        :param min_window: `dict` interval with count and unit | `int` milliseconds. Mismatching windows are not split
+        below this duration. Default: {'count': 1, 'unit': 'MINUTE'}
+        :param hash_samples: `bool` If True samples are read and hashed on the client. Default: False
+        :param transform: :class:`.Transform` applied by the migration, maps source series to target series
+        :param max_workers: `int` maximum number of series compared concurrently. Default: 4
+        """
+        self._source_series = SeriesService(source)
+        self._source_metrics = MetricsService(source)
+        self._target_series = SeriesService(target)
+        self.window = _interval_ms({'count': 1, 'unit': 'DAY'} if window is None else window)
+        self.min_window = _interval_ms({'count': 1, 'unit': 'MINUTE'} if min_window is None else min_window)
+        self.hash_samples = hash_samples
+        self.transform = transform
+        self.max_workers = max_workers
+
+    def run(self, metrics=None, entity=None, tags=None, start_date='1970-01-01T00:00:00Z', end_date='now'):
+        """Compare series of the metrics which match the filters.
+
+        :param metrics: `list` of `str` metric names | :class:`.Metric` objects. Default: all metrics
+        :param entity: `str` | :class:`.Entity` compare series of the entity only
+        :param tags: `dict` compare series with the tags only
+        :param start_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: 1970-01-01
+        :param end_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: now
+        :return: `list` of :class:`.Mismatch` sorted by metric, entity and start
+        """
+        start = int(to_milliseconds(start_date))
+        end = int(to_milliseconds(time.time() * 1000 if end_date == 'now' else end_date))
+        if metrics is None:
+            metrics = self._source_metrics.list()
+        if isinstance(entity, Entity):
+            entity = entity.name
+        series = []
+        for metric in metrics:
+            name = metric.name if isinstance(metric, Metric) else metric
+            series.extend((name, s.entity, dict(s.tags)) for s in self._source_metrics.series(name, entity, tags))
+        result = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for mismatches in executor.map(lambda key: self._verify(key, start, end), series):
+                result.extend(mismatches)
+        return result
+
+    def _verify(self, key, start, end):
+        metric, entity, tags = key
+        shift = 0
+        target_key = key
+        if self.transform is not None:
+            target = self.transform(Series(entity, metric, tags=tags))
+            target_key = (target.metric, target.entity, dict(target.tags))
+            shift = getattr(self.transform, 'time_shift', 0)
+        if self.hash_samples:
+            pending = [(s, min(s + self.window, end), self.window) for s in range(start, end, self.window)]
+        else:
+            pending = [(start, end, self.window)]
+        mismatches = []
+        while pending:
+            window_start, window_end, period = pending.pop()
+            source = self._digests(self._source_series, key, window_start, window_end, period, 0)
+            target = self._digests(self._target_series, target_key, window_start, window_end, period, shift)
+            for s in range(window_start, window_end, period):
+                e = min(s + period, window_end)
+                a, b = source.get(s), target.get(s)
+                if _digests_equal(a, b):
+                    continue
+                if e - s <= self.min_window or a is None or b is None:
+                    mismatches.append(Mismatch(metric, entity, tags, s, e, a, b))
+                else:
+                    pending.append((s, e, (e - s + 1) // 2))
+        mismatches.sort(key=lambda m: m.start)
+        return mismatches
+
+    def _digests(self, service, key, start, end, period, shift):
+        """
+        :return: `dict` of period start in source time: :class:`.Digest`
+        """
+        metric, entity, tags = key
+        query = SeriesQuery(series_filter=SeriesFilter(metric, tags=tags, exact_match=True),
+                            entity_filter=EntityFilter(entity),
+                            date_filter=DateFilter(start_date=start + shift, end_date=end + shift))
+        if self.hash_samples:
+            return self._sample_digests(service.query(query), start, period, shift)
+        types = [AggregateType.COUNT, AggregateType.MIN, AggregateType.MAX, AggregateType.SUM]
+        aggregate = Aggregate(period={'count': period, 'unit': 'MILLISECOND', 'align': PeriodAlign.START_TIME},
+                              types=types)
+        query.set_transformation_filter(TransformationFilter(aggregate=aggregate))
+        values = {}
+        for series in service.query(query):
+            aggregate_type = series.aggregate['type']
+            for sample in series.data:
+                values.setdefault(sample.t - shift, {})[aggregate_type] = sample.v
+        return {t: Digest(int(v.get(AggregateType.COUNT, 0)), v.get(AggregateType.MIN), v.get(AggregateType.MAX),
+                          v.get(AggregateType.SUM), None)
+                for t, v in values.items() if v.get(AggregateType.COUNT)}
+
+    @staticmethod
+    def _sample_digests(series_list, start, period, shift):
+        windows = {}
+        for series in series_list:
+            for sample in series.data:
+                t = sample.t - shift
+                windows.setdefault(start + (t - start) // period * period, []).append((t, sample.v))
+        result = {}
+        for t, samples in windows.items():
+            samples.sort()
+            values = [v for _, v in samples if v is not None and not math.isnan(v)]
+            digest = hashlib.sha1(''.join('%d:%r;' % sample for sample in samples).encode('utf-8')).hexdigest()
+            result[t] = Digest(len(samples), min(values) if values else None, max(values) if values else None,
+                               sum(values), digest)
+        return result
+
+
+def verify(source, target, metrics=None, entity=None, tags=None, start_date='1970-01-01T00:00:00Z',
+           end_date='now', **options):
+    """Compare series of the metrics which match the filters on source and target servers.
+
+    :param source: :class:`.Client` source server
+    :param target: :class:`.Client` target server
+    :param metrics: `list` of `str` metric names | :class:`.Metric` objects. Default: all metrics
+    :param entity: `str` | :class:`.Entity` compare series of the entity only
+    :param tags: `dict` compare series with the tags only
+    :param start_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: 1970-01-01
+    :param end_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: now
+    :param options: :class:`.Verifier` parameters: window, min_window, hash_samples, transform, max_workers
+    :return: `list` of :class:`.Mismatch`
+    """
+    return Verifier(source, target, **options).run(metrics, entity, tags, start_date, end_date)
@@ -16,6 +16,10 @@ permissions and limitations under the License.
 """
 
 import copy
+import numbers
+import sys
+import threading
+from collections import namedtuple, OrderedDict
 
 from ._meta_models import Entity, Metric
 from .._constants import display_series_threshold, display_series_part
@@ -50,11 +54,15 @@ class Sample(object):
     """
 
     def __init__(self, value, time=None, version=None, x=None):
-        self._v = copy.deepcopy(value) if not value == "Nan" else float("nan")
+        if isinstance(value, numbers.Number) or value is None:
+            self._v = value
+        else:
+            self._v = copy.deepcopy(value) if not value == "Nan" else float("nan")
         self._x = x
         #: class:`datetime` object | `long` milliseconds | `str`  ISO 8601 date
         self._t = to_milliseconds(time)
-        self._d = to_date(self._t)
+        # datetime is created on first access
+        self._d = None
         # `.dict` version object including 'source' and 'status' keys
         self._version = version
 
@@ -82,6 +90,8 @@ class Sample(object):
         return self._t
 
     def get_date(self):
+        if self._d is None:
+            self._d = to_date(self._t)
         return self._d
 
     @property
@@ -99,7 +109,7 @@ class Sample(object):
     @t.setter
     def t(self, t):
         self._t = to_milliseconds(t)
-        self._d = to_date(self._t)
+        self._d = None
 
     @version.setter
     def version(self, value):
@@ -127,6 +137,56 @@ class Sample(object):
         return self._compare(other) != 0
 
 
+# ------------------------------------------------------------------------------
+#: Recently used tag tuples, least recently used tuples are discarded when the limit is reached
+_interned_tags = OrderedDict()
+_interned_tags_limit = 100000
+_interned_tags_lock = threading.Lock()
+
+
+def _intern_tags(tags):
+    """
+    Convert tags to a sorted tuple of name-value pairs. Equal tuples of recently used tags and tag strings
+    are shared between keys.
+    """
+    if not tags:
+        return ()
+    pairs = []
+    for k, v in tags.items():
+        if isinstance(v, str):
+            v = sys.intern(v)
+        elif isinstance(v, list):
+            v = tuple(v)
+        pairs.append((sys.intern(k), v))
+    pairs = tuple(sorted(pairs))
+    with _interned_tags_lock:
+        interned = _interned_tags.get(pairs)
+        if interned is not None:
+            _interned_tags.move_to_end(pairs)
+            return interned
+        _interned_tags[pairs] = pairs
+        if len(_interned_tags) > _interned_tags_limit:
+            _interned_tags.popitem(last=False)
+    return pairs
+
+
+class SeriesKey(namedtuple('SeriesKey', ['metric', 'entity', 'tags'])):
+    """
+    Hashable series identifier: metric name, entity name, and sorted tuple of ``(tag_name, tag_value)`` pairs.
+    """
+    __slots__ = ()
+
+    @staticmethod
+    def of(metric, entity, tags=None):
+        """
+        :param metric: `str` metric name
+        :param entity: `str` entity name
+        :param tags: `dict` of ``tag_name: tag_value`` pairs
+        :return: :class:`.SeriesKey`
+        """
+        return SeriesKey(sys.intern(metric), sys.intern(entity), _intern_tags(tags))
+
+
 # ------------------------------------------------------------------------------
 class Series(object):
     """
@@ -148,9 +208,11 @@ class Series(object):
         if data is not None:
             for data_unit in data:
                 if isinstance(data_unit, dict):  # Compatibility
+                    # 't' is returned as integer milliseconds, 'd' as ISO date
+                    t = data_unit.get('t')
                     self._data.append(Sample(
                         value=data_unit['v'],
-                        time=data_unit.get('t', data_unit.get('d', None)),
+                        time=t if t is not None else data_unit.get('d', None),
                         version=data_unit.get('version', None)
                     )
                     )
@@ -166,9 +228,9 @@ class Series(object):
             self._meta = {}
             for k, v in meta.items():
                 if k == 'entity':
-                    self._meta[k] = deserialize(v, Entity)
+                    self._meta[k] = v if isinstance(v, Entity) else deserialize(v, Entity)
                 elif k == 'metric':
-                    self._meta[k] = deserialize(v, Metric)
+                    self._meta[k] = v if isinstance(v, Metric) else deserialize(v, Metric)
                 else:
                     self._meta[k] = v
 
@@ -308,8 +370,18 @@ class Series(object):
 
     @property
     def meta(self):
+        """
+        :return: `dict` with :class:`.Entity` and :class:`.Metric` metadata if requested with addMeta.
+        Series returned by one query share the Entity and Metric objects, copy them before modification.
+        """
         return self._meta
 
+    def series_key(self):
+        """
+        :return: :class:`.SeriesKey` of this series
+        """
+        return SeriesKey.of(self._metric, self._entity, self._tags)
+
     @entity.setter
     def entity(self, value):
         self._entity = value
@@ -354,6 +426,67 @@ class Series(object):
         return self._data[-1].get_date()
 
 
+# ------------------------------------------------------------------------------
+class SeriesIndex(object):
+    """
+    Dictionary of series by :class:`.SeriesKey`.
+    If several series have the same key, for example series with different aggregation types,
+    the last added series is stored.
+    """
+
+    def __init__(self, series=None):
+        self._series = {}
+        if series is not None:
+            self.add(*series)
+
+    def add(self, *series):
+        for s in series:
+            self._series[s.series_key()] = s
+
+    def get(self, key, default=None):
+        """
+        :param key: :class:`.SeriesKey`
+        :return: :class:`.Series` or default if there is no series with the key
+        """
+        return self._series.get(key, default)
+
+    def keys(self):
+        return self._series.keys()
+
+    def values(self):
+        return self._series.values()
+
+    def __getitem__(self, key):
+        return self._series[key]
+
+    def __contains__(self, key):
+        return key in self._series
+
+    def __len__(self):
+        return len(self._series)
+
+    def __iter__(self):
+        return iter(self._series)
+
+    @staticmethod
+    def join(*result_sets):
+        """Match series from several query results by key.
+
+        :param result_sets: `list` of :class:`.Series` objects for each query
+        :return: `list` of tuples ``(key, series_1, ..., series_n)`` in order of first key appearance,
+        None is placed where the result set has no series with the key
+        """
+        indexes = [SeriesIndex(result_set) for result_set in result_sets]
+        keys = []
+        seen = set()
+        for index in indexes:
+            for key in index:
+                if key not in seen:
+                    seen.add(key)
+                    keys.append(key)
+        return [(key,) + tuple(index.get(key) for index in indexes) for key in keys]
+
+
 # ------------------------------------------------------------------------------
 class Property(BaseModel):
     """
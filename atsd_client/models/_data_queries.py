@@ -129,9 +129,9 @@ class EntityFilter():
     Entity expression is applied as an additional filter to the list of entities retrieved by the above filters.
     """
 
-    def __init__(self, entity, entities=None, entity_group=None, entity_expression=None):
-        if not entity:
-            raise ValueError("Entity is required.")
+    def __init__(self, entity=None, entities=None, entity_group=None, entity_expression=None):
+        if not (entity or entities or entity_group or entity_expression):
+            raise ValueError("Entity, entities, entity group or entity expression is required.")
         #: `str` entity name or entity name pattern.
         self.entity = entity
         #: `list` of entity names or entity name patterns
@@ -334,7 +334,8 @@ class ControlFilter:
         self.cache = False if cache is None else cache
         #: `str` optional identifier used to associate query object in request with series objects in response.
         self.requestId = "" if request_id is None else request_id
-        #: `str` time format for data array. iso or milliseconds. Default: iso
+        #: `str` time format for data array. iso or milliseconds. Default: iso.
+        # SeriesService.query requests milliseconds for queries without control filter
         self.timeFormat = "iso" if time_format is None else time_format
         # : `bool` option. If true, include metric and entity metadata (field, tags) under the meta object in response.
         # Default: false
@@ -800,3 +801,41 @@ class MessageQuery:
 
     def set_expression(self, value):
         self.expression = value
+
+
+# ------------------------------------------------------------------------------
+class MessageStatisticsQuery(MessageQuery):
+    """
+    Class to retrieve message counts for the specified filters, aggregated by the server into series.
+    """
+
+    def __init__(self, entity_filter, date_filter, type=None, source=None, tags=None, severity=None, severities=None,
+                 min_severity=None, expression=None, aggregate=None, group_keys=None):
+        super(MessageStatisticsQuery, self).__init__(entity_filter, date_filter, type=type, source=source, tags=tags,
+                                                     severity=severity, severities=severities,
+                                                     min_severity=min_severity, expression=expression)
+        del self.limit
+        self.set_aggregate(Aggregate(period=None, types=[AggregateType.COUNT]) if aggregate is None else aggregate)
+        #: `list` of fields to group counts by: type, source, entity, severity, tags.{name}
+        self.groupKeys = group_keys
+
+    def set_aggregate(self, value):
+        """
+        :param value: :class:`.Aggregate` | `dict` with COUNT type and optional period.
+        Default: count over the whole interval
+        """
+        if isinstance(value, Aggregate):
+            types = value.types
+            period = getattr(value, 'period', None)
+        else:
+            types = value.get('types', [value.get('type', AggregateType.COUNT)])
+            period = value.get('period')
+        if list(types) != [AggregateType.COUNT]:
+            raise ValueError('Message statistics support only COUNT aggregation, found: ' + unicode(types))
+        # The endpoint accepts a single aggregation type
+        self.aggregate = {'type': AggregateType.COUNT}
+        if period is not None:
+            self.aggregate['period'] = period
+
+    def set_group_keys(self, value):
+        self.groupKeys = value
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2018 Axibase Corporation or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+https://www.axibase.com/atsd/axibase-apache-2.0.pdf
+
+or in the "license" file accompanying this file. This file is distributed
+on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+express or implied. See the License for the specific language governing
+permissions and limitations under the License.
+"""
+
+import heapq
+import itertools
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+from ._time_utilities import to_date, to_milliseconds
+from .models import Metric, Entity
+from .services import MetricsService, EntitiesService
+
+#: Series lag record. `tags` is None for records produced by entity scans, `lag` is in minutes.
+LagRecord = namedtuple('LagRecord', ['metric', 'entity', 'tags', 'last_insert_date', 'lag'])
+
+
+def _ms(date):
+    return None if date is None else int(to_milliseconds(date))
+
+
+def _complete(watermark, cached_max_insert_date, max_insert_date):
+    """
+    :return: `bool` True if rows requested with the cached max insert date include all rows for the new one
+    """
+    if cached_max_insert_date is None or watermark <= cached_max_insert_date:
+        return True
+    return max_insert_date is not None and max_insert_date <= cached_max_insert_date
+
+
+class LagScanner(object):
+    """
+    Find series which have not received data for a given time.
+    Metrics or entities are scanned concurrently and lag records are returned as soon as each request completes.
+    Series with lag less than the minimum lag are excluded by the server with the maxInsertDate parameter.
+    The scanner keeps the worst offenders of the last scan and remembers received series: on the next scan
+    metrics and entities whose last insert date has not changed are not requested again.
+    """
+
+    def __init__(self, conn, max_workers=8, top_k=100):
+        """
+        :param conn: :class:`.Client`
+        :param max_workers: `int` maximum number of concurrent requests. Default: 8
+        :param top_k: `int` number of the most lagging series kept by the scanner. Default: 100
+        """
+        self._metrics_service = MetricsService(conn)
+        self._entities_service = EntitiesService(conn)
+        self.max_workers = max_workers
+        self.top_k = top_k
+        #: `dict` of scan key: (last insert date, max insert date in milliseconds, `list` of series rows)
+        self._state = {}
+        self._top = []
+
+    def scan_metrics(self, metrics=None, min_lag=0, entity=None, tags=None):
+        """Scan series of the specified metrics.
+
+        :param metrics: `list` of :class:`.Metric` objects | `list` of `str` metric names.
+        Default: all metrics. Metric objects allow to skip unchanged metrics on repeated scans
+        :param min_lag: `Number` minimum lag in minutes of returned records. Default: 0
+        :param entity: `str` | :class:`.Entity` restrict series to the entity
+        :param tags: `dict` restrict series to the tags
+        :return: generator of :class:`.LagRecord`
+        """
+        if metrics is None:
+            metrics = self._metrics_service.list()
+        if isinstance(entity, Entity):
+            entity = entity.name
+        tags_key = tuple(sorted(tags.items())) if tags else ()
+        tasks = []
+        for metric in metrics:
+            name = metric.name if isinstance(metric, Metric) else metric
+            tasks.append((('metric', name, entity, tags_key), getattr(metric, 'last_insert_date', None),
+                          partial(self._metric_series, name, entity, tags)))
+        return self._scan(tasks, min_lag)
+
+    def scan_entities(self, entities, min_lag=0):
+        """Scan metrics collected by the specified entities. Lag is calculated for each entity and metric pair.
+
+        :param entities: `list` of :class:`.Entity` objects | `list` of `str` entity names.
+        Entity objects allow to skip unchanged entities on repeated scans
+        :param min_lag: `Number` minimum lag in minutes of returned records. Default: 0
+        :return: generator of :class:`.LagRecord`
+        """
+        tasks = []
+        for entity in entities:
+            name = entity.name if isinstance(entity, Entity) else entity
+            tasks.append((('entity', name), getattr(entity, 'last_insert_date', None),
+                          partial(self._entity_metrics, name)))
+        return self._scan(tasks, min_lag)
+
+    def worst(self):
+        """
+        :return: `list` of at most top_k :class:`.LagRecord` objects with the largest lag found by the last scan,
+        sorted by lag in descending order
+        """
+        return [record for lag, _, record in sorted(self._top, reverse=True)]
+
+    def _metric_series(self, metric, entity, tags, max_insert_date):
+        series = self._metrics_service.series(metric, entity=entity, tags=tags, max_insert_date=max_insert_date)
+        return [(s.metric, s.entity, dict(s.tags), _ms(s.last_insert_date)) for s in series]
+
+    def _entity_metrics(self, entity, max_insert_date):
+        metrics = self._entities_service.metrics(entity, max_insert_date=max_insert_date, use_entity_insert_time=True)
+        return [(m.name, entity, None, _ms(m.last_insert_date)) for m in metrics]
+
+    def _scan(self, tasks, min_lag):
+        now = int(time.time() * 1000)
+        max_insert_date = now - int(min_lag * 60000) if min_lag > 0 else None
+        self._top = []
+        counter = itertools.count()
+        pending = []
+        for key, last_insert_date, fetch in tasks:
+            watermark = _ms(last_insert_date)
+            cached = self._state.get(key)
+            if watermark is not None and cached is not None and cached[0] == watermark \
+                    and _complete(watermark, cached[1], max_insert_date):
+                for record in self._records(cached[2], now, min_lag, counter):
+                    yield record
+            else:
+                pending.append((key, watermark, fetch))
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(fetch, max_insert_date): (key, watermark) for key, watermark, fetch in pending}
+            for future in as_completed(futures):
+                key, watermark = futures[future]
+                rows = future.result()
+                self._state[key] = (watermark, max_insert_date, rows)
+                for record in self._records(rows, now, min_lag, counter):
+                    yield record
+
+    def _records(self, rows, now, min_lag, counter):
+        for metric, entity, tags, last_insert in rows:
+            if last_insert is None:
+                continue
+            lag = (now - last_insert) / 60000.0
+            if lag < min_lag:
+                continue
+            record = LagRecord(metric, entity, tags, to_date(last_insert), lag)
+            item = (lag, next(counter), record)
+            if len(self._top) < self.top_k:
+                heapq.heappush(self._top, item)
+            elif lag > self._top[0][0]:
+                heapq.heapreplace(self._top, item)
+            yield record
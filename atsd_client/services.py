@@ -16,13 +16,26 @@ permissions and limitations under the License.
 """
 
 from . import _jsonutil
+from ._cache import WriteCache
 from ._client import Client
 from ._constants import *
-from ._time_utilities import to_iso, to_date
+from ._time_utilities import to_iso, to_date, to_milliseconds
+from ._utilities import chunked
 from .exceptions import DataParseException, SQLException, ServerException
-from .models import Series, Property, Alert, AlertHistory, Metric, Entity, EntityGroup, Message
+from .models import Series, Property, Alert, AlertHistory, Metric, Entity, EntityGroup, Message, PropertiesQuery, \
+    EntityFilter, DateFilter
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from dateutil.tz import tzutc
 from io import StringIO
 from requests.compat import quote
+from requests.exceptions import RequestException
+import copy
+import logging
+import sys
+import time
 
 
 def _check_name(name):
@@ -39,6 +52,33 @@ class _Service(object):
         self.conn = conn
 
 
+def _deserialize_series(response):
+    """
+    Deserialize series, entity and metric metadata is decoded once for each name and shared by all series.
+    The response is not modified.
+    """
+    decoded_meta = {'entity': {}, 'metric': {}}
+    model_classes = {'entity': Entity, 'metric': Metric}
+    result = []
+    for element in response:
+        meta = element.get('meta')
+        if meta is not None:
+            meta = dict(meta)
+            element = dict(element, meta=meta)
+            for field, cache in decoded_meta.items():
+                value = meta.get(field)
+                if isinstance(value, dict):
+                    name = value.get('name')
+                    obj = cache.get(name)
+                    if obj is None:
+                        obj = _jsonutil.deserialize(value, model_classes[field])
+                        if name is not None:
+                            cache[name] = obj
+                    meta[field] = obj
+        result.append(_jsonutil.deserialize(element, Series))
+    return result
+
+
 # ------------------------------------------------------------------------ SERIES
 class SeriesService(_Service):
     def insert(self, *series_objects):
@@ -54,25 +94,93 @@ class SeriesService(_Service):
         return True
 
     def query(self, *queries):
-        """Retrieve series for each query
+        """Retrieve series for each query.
+        Entity and Metric metadata requested with addMeta is shared by series with the same entity and metric.
 
         :param queries: :class:`.SeriesQuery` objects
         :return: list of :class:`.Series` objects
         """
-        response = self.conn.post(series_query_url, queries)
-        return [_jsonutil.deserialize(element, Series) for element in response]
+        request = []
+        for query in queries:
+            query = _jsonutil.serialize(query)
+            # Queries without control filter request milliseconds, samples are decoded without date parsing
+            if not query.get('timeFormat'):
+                query['timeFormat'] = 'milliseconds'
+            request.append(query)
+        response = self.conn.post(series_query_url, request)
+        return _deserialize_series(response)
+
+    def url_query(self, entity, metric, start_date=None, end_date=None, interval=None, tags=None, limit=None,
+                  params=None):
+        """Retrieve series for the specified entity and metric with a GET request.
+        The response is revalidated with ETag and Last-Modified headers if the server provides them,
+        unchanged series are returned from the client response cache.
 
-    def url_query(self, *queries):
-        """
-        Unimplemented
+        :param entity: `str` | :class:`.Entity`
+        :param metric: `str` | :class:`.Metric`
+        :param start_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date
+        :param end_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date
+        :param interval: `dict` with count and unit, for example {"count": 1, "unit": "HOUR"}
+        :param tags: `dict` series tags
+        :param limit: `int` maximum number of samples returned for each series
+        :param params: `dict` additional request parameters, for example {'aggregate.type': 'AVG'}
+        :return: list of :class:`.Series` objects
         """
-        raise NotImplementedError
+        entity_name = entity.name if isinstance(entity, Entity) else entity
+        metric_name = metric.name if isinstance(metric, Metric) else metric
+        _check_name(entity_name)
+        _check_name(metric_name)
+        params = {} if params is None else dict(params)
+        if start_date is not None:
+            params['startDate'] = to_iso(start_date)
+        if end_date is not None:
+            params['endDate'] = to_iso(end_date)
+        if interval is not None:
+            params['interval'] = '{}-{}'.format(interval['count'], interval['unit'])
+        if tags is not None:
+            for k, v in tags.items():
+                params['tags.%s' % k] = v
+        if limit is not None:
+            params['limit'] = limit
+        params.setdefault('timeFormat', 'milliseconds')
+        url = series_url_query_url.format(format='json', entity=quote(entity_name, ''), metric=quote(metric_name, ''))
+        response = self.conn.get_cached(url, params)
+        return _deserialize_series(response)
 
-    def csv_insert(self, *csvs):
-        """
-        Unimplemented
+    def csv_insert(self, entity, csv, tags=None, chunk_size=10000, retries=3):
+        """Insert samples in CSV format for the specified entity.
+        The first line is a header containing the time column followed by metric names, for example:
+        time,cpu_busy,memory_used. Lines are read lazily and uploaded in chunks of chunk_size lines,
+        each chunk is sent with the header as a streamed request body.
+
+        :param entity: `str` | :class:`.Entity`
+        :param csv: `str` file path | file object | iterator of `str` lines
+        :param tags: `dict` series tags applied to all samples
+        :param chunk_size: `int` maximum number of data lines per request. Default: 10000
+        :param retries: `int` number of times a chunk upload is repeated on connection or server error. Default: 3
+        :return: True if success
         """
-        raise NotImplementedError
+        entity_name = entity.name if isinstance(entity, Entity) else entity
+        _check_name(entity_name)
+        if isinstance(csv, str):
+            with open(csv) as f:
+                return self.csv_insert(entity_name, f, tags, chunk_size, retries)
+        url = series_csv_insert_url.format(entity=quote(entity_name, ''))
+        lines = (line.rstrip('\r\n') + '\n' for line in csv)
+        header = next(lines, None)
+        if header is None:
+            raise DataParseException('csv', Series, 'CSV header is missing')
+        for chunk in chunked(lines, chunk_size):
+            for attempt in range(retries + 1):
+                try:
+                    self.conn.post_csv(url, _encode_lines(header, chunk), params=tags)
+                    break
+                except (ServerException, RequestException) as e:
+                    if attempt == retries or (isinstance(e, ServerException) and e.status_code < 500):
+                        raise e
+                    logging.warning('Failed to insert CSV chunk for %s, retrying: %s', entity_name, e)
+                    time.sleep(0.5 * 2 ** attempt)
+        return True
 
     def delete(self, *delete_query):
         """Delete series matching delete_query tuple
@@ -91,14 +199,48 @@ class SeriesService(_Service):
 
 
 # -------------------------------------------------------------------- PROPERTIES
+def _property_digest(prop):
+    """
+    :return: `tuple` of property identifier: type, entity and key, and hash of property tags
+    """
+    key = (prop.type, prop.entity.lower(), tuple(sorted((k, str(v)) for k, v in (prop.key or {}).items())))
+    return key, hash(tuple(sorted((k, str(v)) for k, v in (prop.tags or {}).items())))
+
+
 class PropertiesService(_Service):
+    def __init__(self, conn, dedup_ttl=None, dedup_size=100000):
+        """
+        :param conn: :class:`.Client`
+        :param dedup_ttl: `Number` If specified, inserted properties are remembered and properties with unchanged
+        tags are not sent again during dedup_ttl seconds. Default: None, all properties are sent
+        :param dedup_size: `int` maximum number of remembered properties. Default: 100000
+        """
+        super(PropertiesService, self).__init__(conn)
+        self.write_cache = None if dedup_ttl is None else WriteCache(dedup_ttl, dedup_size)
+
     def insert(self, *properties):
-        """Insert given properties
+        """Insert given properties. If deduplication is enabled, properties with the same type, entity, key and tags
+        as recently inserted properties are skipped.
 
         :param properties: :class:`.Property`
         :return: True if success
         """
-        self.conn.post(properties_insert_url, properties)
+        if self.write_cache is None:
+            self.conn.post(properties_insert_url, properties)
+            return True
+        now = time.time()
+        changed = []
+        batch_keys = set()
+        for prop in properties:
+            key, digest = _property_digest(prop)
+            # properties with the same key in one request are all sent to keep the order of updates
+            if key in batch_keys or self.write_cache.changed(key, digest, now):
+                changed.append((prop, key, digest))
+                batch_keys.add(key)
+        if changed:
+            self.conn.post(properties_insert_url, [prop for prop, _, _ in changed])
+            for _, key, digest in changed:
+                self.write_cache.put(key, digest, now)
         return True
 
     def query(self, *queries):
@@ -116,11 +258,45 @@ class PropertiesService(_Service):
         :param queries: :class: `.PropertiesQuery`
         :param frame_params: parameters for DataFrame constructor, for example, columns=['entity', 'tags', 'message']
         :param expand_tags: `bool` If True response key and tags are converted to columns. Default: True
+        :param categorical: `bool` If True key and tag columns, entity and type are returned as `category` dtype.
+        Default: False
         :return: :class:`.DataFrame`
         """
         resp = self.conn.post(properties_query_url, queries)
         reserved = {'type', 'entity', 'tags', 'key', 'date'}
-        return response_to_dataframe(resp, reserved, **frame_params)
+        categorical_fields = {'type', 'entity'}
+        return response_to_dataframe(resp, reserved, categorical_fields, **frame_params)
+
+    def query_for_entities(self, entities, type, start_date='1970-01-01T00:00:00Z', end_date='now', key=None,
+                           exact_match=None, key_tag_expression=None, last=None, batch_size=500, max_workers=4):
+        """Retrieve property records of the specified type for many entities.
+        Entities are split into batches, each batch is retrieved with one query and batches are requested concurrently.
+
+        :param entities: iterable of :class:`.Entity` objects | `str` entity names
+        :param type: `str` property type
+        :param start_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: 1970-01-01T00:00:00Z
+        :param end_date: :class:`datetime` | `long` milliseconds | `str` ISO 8601 date. Default: now
+        :param key: `dict` property key filter
+        :param exact_match: `bool` If True only records with exactly the specified key are returned
+        :param key_tag_expression: `str` expression to filter records by key and tags
+        :param last: `bool` If True only records with the last date are returned
+        :param batch_size: `int` maximum number of entities in one query. Default: 500
+        :param max_workers: `int` maximum number of concurrent requests. Default: 4
+        :return: `dict` of (entity name, `tuple` of sorted key name-value pairs): :class:`.Property`
+        """
+        names = [e.name if isinstance(e, Entity) else e for e in entities]
+        date_filter = DateFilter(start_date=start_date, end_date=end_date)
+        queries = []
+        for chunk in chunked(names, batch_size):
+            queries.append(PropertiesQuery(entity_filter=EntityFilter(entities=chunk), date_filter=date_filter,
+                                           type=type, key=key, exact_match=exact_match,
+                                           key_tag_expression=key_tag_expression, last=last))
+        result = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for properties in executor.map(self.query, queries):
+                for prop in properties:
+                    result[(prop.entity, tuple(sorted((prop.key or {}).items())))] = prop
+        return result
 
     def type_query(self, entity):
         """Returns an array of property types for the entity.
@@ -132,11 +308,21 @@ class PropertiesService(_Service):
         response = self.conn.get(properties_types_url.format(entity=quote(entity_name, '')))
         return response
 
-    def url_query(self, *queries):
-        """
-        Unimplemented
+    def url_query(self, entity, type):
+        """Retrieve property records for the specified entity and type with a GET request.
+        The response is revalidated with ETag and Last-Modified headers if the server provides them,
+        unchanged records are returned from the client response cache.
+
+        :param entity: `str` | :class:`.Entity`
+        :param type: `str` property type
+        :return: list of :class:`.Property` objects
         """
-        raise NotImplementedError
+        entity_name = entity.name if isinstance(entity, Entity) else entity
+        _check_name(entity_name)
+        _check_name(type)
+        response = self.conn.get_cached(properties_url_query_url.format(entity=quote(entity_name, ''),
+                                                                        type=quote(type, '')))
+        return _jsonutil.deserialize(response, Property)
 
     def delete(self, *filters):
         """Delete properties for each query
@@ -145,6 +331,8 @@ class PropertiesService(_Service):
         :return: True if success
         """
         response = self.conn.post(properties_delete_url, filters)
+        if self.write_cache is not None:
+            self.write_cache.clear()
         return True
 
 
@@ -189,6 +377,9 @@ class AlertsService(_Service):
 
 # ---------------------------------------------------------------------- MESSAGES
 class MessageService(_Service):
+    _reserved = {'type', 'entity', 'tags', 'source', 'date', 'message', 'severity'}
+    _categorical_fields = {'type', 'entity', 'source', 'severity'}
+
     def insert(self, *messages):
         """Insert specified messages
 
@@ -213,17 +404,90 @@ class MessageService(_Service):
         :param queries: :class: `.MessageQuery`
         :param frame_params: parameters for DataFrame constructor, for example, columns=['entity', 'tags', 'message']
         :param expand_tags: `bool` If True response tags are converted to columns. Default: True
+        :param categorical: `bool` If True tag columns, entity, type, source and severity are returned
+        as `category` dtype. Default: False
         :return: :class:`.DataFrame`
         """
         resp = self.conn.post(messages_query_url, queries)
-        reserved = {'type', 'entity', 'tags', 'source', 'date', 'message', 'severity'}
-        return response_to_dataframe(resp, reserved, **frame_params)
-
-    def statistics(self, *params):
+        return response_to_dataframe(resp, self._reserved, self._categorical_fields, **frame_params)
+
+    def iter_query(self, query, page_size=1000, dataframe=False, **frame_params):
+        """Retrieve messages for the query page by page.
+        Each page is requested with the selection interval narrowed past the last message of the previous page.
+        Messages which share the boundary millisecond are not repeated. Pages are requested until a response
+        contains no new messages, so responses capped by the server below page_size do not end the export.
+        The next page is requested in the background while the current page is processed.
+
+        :param query: :class:`.MessageQuery` with start_date and end_date, or with interval and one of the dates.
+        If only interval is specified, the selection interval ends now
+        :param page_size: `int` maximum number of messages in a page. Default: 1000
+        :param dataframe: `bool` If True each page is returned as :class:`.DataFrame`. Default: False
+        :param frame_params: parameters for DataFrame constructor, see `query_dataframe`
+        :return: generator of :class:`.Message` objects or :class:`.DataFrame` pages
         """
-        Unimplemented
+        page_query = copy.copy(query)
+        page_query.startDate, page_query.endDate = _selection_bounds(query)
+        page_query.limit = page_size
+        if hasattr(page_query, 'interval'):
+            del page_query.interval
+        # Number of messages with each key timestamped at the boundary millisecond returned by the previous page
+        seen = Counter()
+        # Messages are returned in descending order unless a page shows otherwise
+        ascending = False
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self.conn.post, messages_query_url, [page_query])
+            while future is not None:
+                resp = future.result()
+                future = None
+                keys = [_message_key(el) for el in resp]
+                page = []
+                for el, key in zip(resp, keys):
+                    if seen[key] > 0:
+                        # The message was returned by the previous page
+                        seen[key] -= 1
+                    else:
+                        page.append(el)
+                seen = Counter()
+                if page or len(resp) >= page_size:
+                    times = [int(to_milliseconds(el['date'])) for el in resp]
+                    if times[0] != times[-1]:
+                        ascending = times[0] < times[-1]
+                    last = times[-1]
+                    # The next page starts at the boundary millisecond again, all messages at the boundary
+                    # in this response are returned again first
+                    seen.update(key for key, t in zip(keys, times) if t == last)
+                    page_query = copy.copy(page_query)
+                    if page:
+                        # Boundary millisecond is requested again to fetch remaining messages with the same time
+                        next_bound = last if ascending else last + 1
+                    else:
+                        logging.warning('More than %s messages are timestamped at %s, increase page_size to '
+                                        'retrieve all of them.', page_size, to_iso(last))
+                        next_bound = last + 1 if ascending else last
+                        seen = Counter()
+                    if ascending:
+                        page_query.startDate = to_iso(next_bound)
+                    else:
+                        page_query.endDate = to_iso(next_bound)
+                    future = executor.submit(self.conn.post, messages_query_url, [page_query])
+                if not page:
+                    continue
+                if dataframe:
+                    yield response_to_dataframe(page, self._reserved, self._categorical_fields,
+                                                **dict(frame_params))
+                else:
+                    for message in _jsonutil.deserialize(page, Message):
+                        yield message
+
+    def statistics(self, *queries):
+        """Retrieve message counts for each query. Counts are calculated by the server and returned as series
+        grouped by period and the query group keys.
+
+        :param queries: :class:`.MessageStatisticsQuery`
+        :return: `list` of :class:`.Series` objects
         """
-        raise NotImplementedError
+        response = self.conn.post(messages_statistics_url, queries)
+        return _deserialize_series(response)
 
 
 # ===============================================================================
@@ -388,6 +652,7 @@ class EntitiesService(_Service):
         :param limit: `int`
         :param frame_params: parameters for DataFrame constructor. For example, columns=['entity', 'tags', 'message']
         :param expand_tags: `bool` If True response tags are converted to columns. Default: True
+        :param categorical: `bool` If True tag columns are returned as `category` dtype. Default: False
         :return: :class:`.DataFrame`
         """
         params = {}
@@ -613,6 +878,29 @@ class EntityGroupsService(_Service):
                                   data=data)
         return True
 
+    def sync_entities(self, group_name, entities, create_entities=None, chunk_size=1000):
+        """Make members of the entity group equal to the specified entity list.
+        Unlike set_entities, only the difference between current and specified members is sent:
+        missing entities are added and extra members are removed in requests of at most chunk_size names.
+        Changing members of expression-based groups is not supported.
+
+        :param group_name: `str`
+        :param entities: iterable of :class:`.Entity` objects | `str` entity names
+        :param create_entities: `bool` option indicating new entities from the submitted list are created if such
+        entities do not exist
+        :param chunk_size: `int` maximum number of entity names in one request. Default: 1000
+        :return: `tuple` of sorted `list` of added entity names and sorted `list` of removed entity names
+        """
+        desired = set((e.name if isinstance(e, Entity) else e).lower() for e in entities)
+        current = set(e.name.lower() for e in self.get_entities(group_name, limit=0))
+        added = sorted(desired - current)
+        removed = sorted(current - desired)
+        for chunk in chunked(added, chunk_size):
+            self.add_entities(group_name, chunk, create_entities)
+        for chunk in chunked(removed, chunk_size):
+            self.delete_entities(group_name, chunk)
+        return added, removed
+
 
 # --------------------------------------------------------------------------- SQL
 class SQLService(_Service):
@@ -669,8 +957,7 @@ class CommandsService(_Service):
         if type(commands) is not list: commands = [commands]
         data = '\n'.join(commands)
         commit = 'true' if commit else 'false'
-        url = commands_url + "?commit=" + commit
-        response = self.conn.post_plain_text(url, data)
+        response = self.conn.post_plain_text(commands_url, data, params={'commit': commit})
         return response
 
 
@@ -679,11 +966,12 @@ class PortalsService(_Service):
     def get_portal(self, id=None, name=None, portal_file=None, entity=None, width=900, height=600, theme=None,
                    **kwargs):
         """Generates a screenshot of the specified portal in PNG format.
+        The screenshot is written to the file in chunks as it is received.
 
         :param id: `int` Portal identifier. Either id or name parameter must be specified. If both parameters are
         specified, id takes precedence.
         :param name: `str` Portal name.
-        :param portal_file: `str` File name where portal to be saved.
+        :param portal_file: `str` File name where portal to be saved | file object opened in binary mode.
         Default: {portal-name}[_{entity_name}]_{yyyymmdd}.png.
         :param entity: `str` Entity name. Required for template portals.
         :param width: `int`  Screenshot width, in pixels. Default: 900.
@@ -692,28 +980,59 @@ class PortalsService(_Service):
         configuration.
         :param kwargs: `str` Additional request parameters are passed to the target portal
         and are accessible using the ${parameter_name} syntax.
-        :return: PNG file
+        :return: `str` PNG file name | file object
         """
-        query_params = locals()
-        del query_params['portal_file']
-        del query_params['kwargs']
-        if id is None and name is None:
-            raise ValueError("Either id or name parameter must be specified.")
-
-        possible_themes = ["default", "black"]
-        if theme is not None:
-            if theme.lower() not in possible_themes:
-                raise ValueError("Unsupported theme, use one of: {}".format(", ".join(possible_themes)))
-
-        if len(kwargs) > 0:
-            query_params.update(kwargs)
-        self.conn.get(portal_export, query_params, portal=True, portal_file=portal_file)
-
-
-def response_to_dataframe(resp, reserved, **frame_params):
+        query_params = _portal_params(id, name, entity, width, height, theme, kwargs)
+        return self.conn.download(portal_export, query_params, portal_file)
+
+    def export_many(self, requests, max_workers=4, timeout=None):
+        """Generates screenshots of many portals concurrently, for example a template portal for each entity.
+
+        :param requests: iterable of `dict` objects with :meth:`get_portal` parameters,
+        for example {'name': 'Docker Host Breakdown', 'entity': 'nurswgvml007'}
+        :param max_workers: `int` maximum number of concurrent requests. Default: 4
+        :param timeout: `Number` timeout of each request in seconds. Default: client timeout
+        :return: `list` with PNG file name | file object for each request in the same order, or the exception
+        raised by the failed request
+        """
+        def export(request):
+            request = dict(request)
+            portal_file = request.pop('portal_file', None)
+            params = _portal_params(request.pop('id', None), request.pop('name', None), request.pop('entity', None),
+                                    request.pop('width', 900), request.pop('height', 600), request.pop('theme', None),
+                                    request)
+            try:
+                return self.conn.download(portal_export, params, portal_file, timeout=timeout)
+            except (ServerException, RequestException, IOError) as e:
+                logging.warning('Failed to export portal %s: %s', params, e)
+                return e
+
+        requests = list(requests)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(export, requests))
+
+
+def _portal_params(id, name, entity, width, height, theme, kwargs):
+    if id is None and name is None:
+        raise ValueError("Either id or name parameter must be specified.")
+
+    possible_themes = ["default", "black"]
+    if theme is not None:
+        if theme.lower() not in possible_themes:
+            raise ValueError("Unsupported theme, use one of: {}".format(", ".join(possible_themes)))
+
+    query_params = {'id': id, 'name': name, 'entity': entity, 'width': width, 'height': height, 'theme': theme}
+    query_params.update(kwargs)
+    return query_params
+
+
+def response_to_dataframe(resp, reserved, categorical_fields=(), **frame_params):
     expand_tags = frame_params.pop('expand_tags', True)
+    categorical = frame_params.pop('categorical', False)
     enc_resp = []
     fields = ['tags', 'key']
+    # Columns with low cardinality, converted to category dtype if requested
+    categorical_columns = set(categorical_fields)
     for el in resp:
         for field in fields:
             dictionary = el.pop(field, None)
@@ -721,7 +1040,15 @@ def response_to_dataframe(resp, reserved, **frame_params):
                 for k, v in dictionary.items():
                     if (expand_tags and (k in reserved)) or not expand_tags:
                         k = '{}.{}'.format(field, k)
+                    if categorical:
+                        k = _intern(k)
+                        v = _intern(v)
+                        categorical_columns.add(k)
                     el[k] = v
+        if categorical:
+            for field in categorical_fields:
+                if field in el:
+                    el[field] = _intern(el[field])
         if 'date' in el:
             # Message or Property
             el['date'] = to_date(el['date'])
@@ -734,4 +1061,62 @@ def response_to_dataframe(resp, reserved, **frame_params):
     import pandas as pd
     pd.set_option("display.expand_frame_repr", False)
     pd.set_option('max_colwidth', -1)
-    return pd.DataFrame(enc_resp, **frame_params)
+    df = pd.DataFrame(enc_resp, **frame_params)
+    if categorical:
+        for column in categorical_columns:
+            if column in df.columns:
+                df[column] = df[column].astype('category')
+    return df
+
+
+def _encode_lines(header, lines):
+    yield header.encode('utf-8')
+    for line in lines:
+        yield line.encode('utf-8')
+
+
+_interval_units = {
+    'MILLISECOND': ('microseconds', 1000),
+    'SECOND': ('seconds', 1),
+    'MINUTE': ('minutes', 1),
+    'HOUR': ('hours', 1),
+    'DAY': ('days', 1),
+    'WEEK': ('weeks', 1),
+    'MONTH': ('months', 1),
+    'QUARTER': ('months', 3),
+    'YEAR': ('years', 1),
+}
+
+
+def _selection_bounds(query):
+    """
+    :return: `tuple` of start and end dates of the query, a missing date is calculated from the interval
+    """
+    start = getattr(query, 'startDate', None)
+    end = getattr(query, 'endDate', None)
+    if start is not None and end is not None:
+        return start, end
+    interval = getattr(query, 'interval', None)
+    if interval is None:
+        raise ValueError('Paged message query requires start_date and end_date or interval')
+    field, multiplier = _interval_units[interval['unit']]
+    delta = relativedelta(**{field: interval['count'] * multiplier})
+    try:
+        if start is not None:
+            start = to_date(start)
+            return to_iso(start), to_iso(start + delta)
+        end = datetime.now(tz=tzutc()) if end is None or end == 'now' else to_date(end)
+    except ValueError:
+        raise ValueError('Paged message query requires ISO dates, found: start_date={}, end_date={}'
+                         .format(start, end))
+    return to_iso(end - delta), to_iso(end)
+
+
+def _message_key(el):
+    tags = el.get('tags')
+    return (el.get('date'), el.get('entity'), el.get('type'), el.get('source'), el.get('severity'),
+            el.get('message'), tuple(sorted(tags.items())) if tags else ())
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
@@ -1,8 +1,8 @@
 import pandas as pd
 
 from atsd_client import connect
+from atsd_client.bulk import BulkUpserter
 from atsd_client.models import Metric
-from atsd_client.services import MetricsService
 
 
 def read_csv(path):
@@ -13,7 +13,6 @@ def read_csv(path):
 
 # connection = connect_url('https://atsd_hostname:8443', 'username', 'password')
 connection = connect('/path/to/connection.properties')
-metric_service = MetricsService(connection)
 
 df = read_csv('Metric.csv')
 
@@ -49,6 +48,7 @@ def transform_field(r):
     return transform
 
 
+metrics = []
 for index, row in df.where(pd.notnull(df), None).iterrows():
     row_dict = row.to_dict()
     tag_name = row_dict['tag_name']
@@ -67,4 +67,8 @@ for index, row in df.where(pd.notnull(df), None).iterrows():
 
         metric = Metric(**metric_params)
         print(metric)
-        # metric_service.create_or_replace(metric)
+        metrics.append(metric)
+
+# Send only metrics which differ from the server, set dry_run=False to update
+result = BulkUpserter(connection, max_workers=4, dry_run=True).upsert(metrics)
+print('Changed metrics: {count}'.format(count=result.matched))
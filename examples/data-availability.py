@@ -1,5 +1,5 @@
 from atsd_client import connect, connect_url
-from atsd_client.models import SeriesFilter, EntityFilter, DateFilter, SeriesQuery, ForecastFilter
+from atsd_client.models import SeriesFilter, EntityFilter, DateFilter, SeriesQuery, ForecastFilter, ControlFilter
 from atsd_client.services import SeriesService
 
 '''
@@ -15,13 +15,14 @@ svc = SeriesService(connection)
 
 filename = 'data-availability.csv'
 
+# build one query for each line and send all queries in one request
+lines = []
+queries = []
 with open(filename) as fp:
-    line = fp.readline()
-    while line:
+    for line in fp:
 
         # skip commented lines
         if line.startswith('#'):
-            line = fp.readline()
             continue
 
         metric_name, entity_name, interval, end_date, forecast_name, comments = line.split(',')
@@ -30,6 +31,7 @@ with open(filename) as fp:
         sf = SeriesFilter(metric=metric_name)
         ef = EntityFilter(entity=entity_name)
         df = DateFilter(end_date=end_date, interval={'count': count, 'unit': unit})
+        cf = ControlFilter(request_id=str(len(queries)))
         ff = None
 
         if forecast_name:
@@ -37,13 +39,19 @@ with open(filename) as fp:
             if forecast_name != '-':
                 ff = ForecastFilter(forecast_name=forecast_name)
 
-        query = SeriesQuery(series_filter=sf, entity_filter=ef, date_filter=df, forecast_filter=ff)
-
-        series = svc.query(query)
-        if series:
-            if not series[0].data:
-                print('No data for: %s' % line)
-        else:
-            print('Empty response for %s' % line)
-
-        line = fp.readline()
+        lines.append(line)
+        queries.append(SeriesQuery(series_filter=sf, entity_filter=ef, date_filter=df, forecast_filter=ff,
+                                   control_filter=cf))
+
+# group series by request id which is the line number
+series_by_line = {}
+for series in svc.query(*queries):
+    series_by_line.setdefault(int(series.request_id), []).append(series)
+
+for i, line in enumerate(lines):
+    series = series_by_line.get(i)
+    if series:
+        if not series[0].data:
+            print('No data for: %s' % line)
+    else:
+        print('Empty response for %s' % line)
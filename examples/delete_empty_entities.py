@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 from atsd_client import connect, connect_url
+from atsd_client.bulk import BulkDeleter
 from atsd_client.services import EntitiesService
 
 '''
@@ -23,6 +24,10 @@ print("Found " + str(entity_count) + " entities. Limit= " + str(entity_limit))
 
 for idx, entity in enumerate(entity_list):
     print("- Found  " + entity.name + " : " + str(idx + 1) + "/" + str(entity_count) + " : inserted= " + str(entity.last_insert_date) + " : created= " + str(entity.created_date))
-    # Uncomment next lines to delete and print delete operation status
-    #res = entity_service.delete(entity)
-    #print("- Delete " + entity.name + " : " + str(idx + 1) + "/" + str(entity_count) + " : " + str(res))
\ No newline at end of file
+
+# Set dry_run=False to delete entities concurrently and print delete operation status
+deleter = BulkDeleter(connection, dry_run=True)
+result = deleter.delete_entities(entity_list)
+for name, error in result.failed:
+    print("- Delete " + name + " : " + str(error))
+print("Deleted " + str(result.processed) + "/" + str(result.matched))
@@ -4,6 +4,7 @@ import pprint
 import time
 
 from atsd_client import connect, connect_url
+from atsd_client.catalog import TagIndex
 from atsd_client.services import EntitiesService, MetricsService
 
 '''
@@ -32,15 +33,19 @@ docker_hosts = metric_service.series('docker.cpu.sum.usage.total.percent')
 
 print("Docker hosts found: " + str(len(docker_hosts)))
 
+# retrieve all entities with docker-host tag once and index them by tag values
+docker_entities = entity_service.list(expression="tags.docker-host != ''", limit=0, tags="*")
+entities_by_name = {entity.name: entity for entity in docker_entities}
+tag_index = TagIndex(docker_entities)
+
 for docker_host_series in docker_hosts:
     print("--------------")
 
     # get minutes since last insert
     elapsed_minutes = docker_host_series.get_elapsed_minutes()
 
-    entity_filter = "lower(tags.docker-host) = lower('" + docker_host_series.entity + "')"
-    # find related entities, which tag value equals docker host
-    entities = entity_service.list(expression=entity_filter, limit=0, tags="*")
+    # find related entities, which tag value equals docker host (case-insensitive)
+    entities = [entities_by_name[name] for name in tag_index.equals('docker-host', docker_host_series.entity)]
 
     print(" - FOUND " + str(len(entities)) + " objects for docker_host= " + docker_host_series.entity +
           " : " + docker_host_series.last_insert_date.isoformat() + " : elapsed_minutes= " + str(elapsed_minutes))
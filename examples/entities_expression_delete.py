@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 from atsd_client import connect, connect_url
+from atsd_client.bulk import BulkDeleter
 from atsd_client.services import EntitiesService
 
 '''
@@ -34,8 +35,13 @@ entity_count = len(entities)
 print(
 "Found entities: " + str(entity_count) + " for expression= " + entity_expression + " with limit= " + str(entity_limit))
 
-for idx, entity in enumerate(entities):
-    print("- Deleting " + entity.name + " : " + str(idx + 1) + "/" + str(entity_count))
 
-    # Uncomment next line to delete
-    # entity_service.delete(entity)
+def print_progress(done, total):
+    print("- Deleted " + str(done) + "/" + str(total))
+
+
+# Set dry_run=False to delete
+deleter = BulkDeleter(connection, max_workers=4, rate_limit=50, dry_run=True, progress=print_progress)
+result = deleter.delete_entities(entities)
+print("Deleted " + str(result.processed) + " of " + str(result.matched) + " entities, failed: "
+      + str(len(result.failed)))
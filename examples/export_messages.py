@@ -27,7 +27,8 @@ ef = EntityFilter(entity=entity)
 df = DateFilter(start_date=start_date, end_date=end_date)
 query = MessageQuery(entity_filter=ef, date_filter=df, type=type, source=source)
 
-messages = message_service.query(query)
+# retrieve messages in pages of 1000 records to keep memory usage constant
+messages = message_service.iter_query(query, page_size=1000)
 
 with open('export.csv', 'w') as f:
     print('date, entity, type, source, severity, tags, message', file=f)
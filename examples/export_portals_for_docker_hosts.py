@@ -23,5 +23,7 @@ entity_expression = "tags.docker-type='host'"
 # Retrieve entities
 entities = entity_service.list(expression=entity_expression, limit=entity_limit)
 
-for ent in entities:
-    ps.get_portal(name="Docker Host Breakdown", entity=ent.name)
+# Export portals concurrently, each request is limited to 60 seconds
+requests = [{'name': 'Docker Host Breakdown', 'entity': ent.name} for ent in entities]
+for request, result in zip(requests, ps.export_many(requests, max_workers=4, timeout=60)):
+    print('%s: %s' % (request['entity'], result))
@@ -1,7 +1,6 @@
-from datetime import datetime, timedelta
-
 from atsd_client import connect, connect_url
-from atsd_client.services import MetricsService, EntitiesService
+from atsd_client.scanner import LagScanner
+from atsd_client.services import EntitiesService
 from atsd_client.utils import print_tags
 
 '''
@@ -14,13 +13,9 @@ connection = connect_url('https://atsd_hostname:8443', 'username', 'password')
 
 # set grace_interval to one day
 grace_interval_minutes = 24 * 60
-# query entities with last_insert_date
-min_insert_date = "1970-01-01T00:00:00.000Z"
-# calculate the upper boundary for the allowed last_insert_date values excluding grace_interval
-max_insert_date = datetime.now() - timedelta(seconds=grace_interval_minutes * 60)
 
 entities_service = EntitiesService(connection)
-metrics_service = MetricsService(connection)
+scanner = LagScanner(connection)
 
 # query entities that have name started with 06
 entities = entities_service.list(expression="name LIKE '06*'")
@@ -29,8 +24,6 @@ print('metric, entity, tags, last_insert_date')
 for entity in entities:
     # query all metrics for each entity
     metrics = entities_service.metrics(entity)
-    for metric in metrics:
-        # query all series for each metric and entity
-        series = metrics_service.series(metric, entity, min_insert_date=min_insert_date, max_insert_date=max_insert_date)
-        for s in series:
-            print("%s,%s,%s,%s" % (s.metric, s.entity, print_tags(s.tags), s.last_insert_date))
+    # query series of each metric for the entity concurrently, series inserted within grace_interval are excluded
+    for s in scanner.scan_metrics(metrics, min_lag=grace_interval_minutes, entity=entity):
+        print("%s,%s,%s,%s" % (s.metric, s.entity, print_tags(s.tags), s.last_insert_date))
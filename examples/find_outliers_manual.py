@@ -1,6 +1,7 @@
 from datetime import datetime
 
 from atsd_client import connect, connect_url
+from atsd_client.analytics import MaxDeltaDetector, series_arrays
 from atsd_client.models import SeriesQuery, SeriesFilter, EntityFilter, DateFilter
 from atsd_client.services import MetricsService, SeriesService
 
@@ -10,8 +11,8 @@ connection = connect_url('https://atsd_hostname:8443', 'username', 'password')
 
 # set minimum window size to make decision
 min_window_size = 5
-# 10 days interval in milliseconds
-interval_ms = 10 * 24 * 60 * 60 * 1000
+# 10 days interval
+interval = {'count': 10, 'unit': 'DAY'}
 
 svc = SeriesService(connection)
 metric_service = MetricsService(connection)
@@ -32,43 +33,16 @@ series, = svc.query(query)
 
 # filter data to exclude not a numbers and non-positive values
 data = [s for s in series.data if s.v is not None and s.v > 0]
-
-for i, sample in enumerate(data):
-
-    # prepare data for previous 10 days
-    previous_window = []
-    for s in data[:i]:
-        if (sample.t - interval_ms) <= s.t < sample.t:
-            previous_window.append(s)
-
-    # calculate max delta between nearest samples during the previous days
-    max_delta_before = -1
-    for j, s in enumerate(previous_window[:-1]):
-        delta = abs(s.v - previous_window[j + 1].v)
-        if delta > max_delta_before:
-            max_delta_before = delta
-
-    # prepare data for next 10 days
-    next_window = []
-    for s in data[i:]:
-        if (sample.t + interval_ms) >= s.t > sample.t:
-            next_window.append(s)
-
-    # calculate max delta between nearest samples during the next days
-    max_delta_after = -1
-    for j, s in enumerate(next_window[1:], 1):
-        delta = abs(s.v - next_window[j - 1].v)
-        if delta > max_delta_after:
-            max_delta_after = delta
-
-    # check that there is enough data to make decision
-    if len(previous_window) < min_window_size or len(next_window) < min_window_size:
-        continue
-
-    before_delta = abs(sample.v - previous_window[-1].v)
-    after_delta = abs(sample.v - next_window[0].v)
-
-    if before_delta > 5 * max_delta_before and after_delta > 5 * max_delta_after:
-        print('%s %s' % (sample.get_date(), sample.v))
-        # replace outlier to improve the data
-        sample.v = previous_window[-1].v
+series.data = data
+
+# sample is an outlier if its differences from the previous and the next sample are 5 times greater than
+# max delta between nearest samples during the previous and the next 10 days
+detector = MaxDeltaDetector(interval, threshold=5, min_window_size=min_window_size)
+times, values = series_arrays(series)
+index, scores = detector.detect(times, values)
+
+for i in index:
+    sample = data[i]
+    print('%s %s' % (sample.get_date(), sample.v))
+    # replace outlier to improve the data
+    sample.v = data[i - 1].v
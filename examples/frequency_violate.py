@@ -1,9 +1,7 @@
-import calendar
-
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 
 from atsd_client import connect, connect_url
+from atsd_client.analytics import find_violations
 from atsd_client.models import SeriesFilter, EntityFilter, DateFilter, SeriesQuery
 from atsd_client.services import MetricsService, SeriesService
 
@@ -25,77 +23,46 @@ metric_list = metric_service.list(expression='tags.frequency != ""', tags='*')
 
 def resolve_frequency(frequency):
     """
-    Transform metric frequency tag into relativedelta instance
+    Transform metric frequency tag into period
     """
 
     if frequency in ['Daily (D)', 'Daily', 'Daily, 7-Day', 'Daily, Close']:
-        return relativedelta(days=1)
+        return {'count': 1, 'unit': 'DAY'}
     elif frequency in ['Weekly', 'Weekly, As of Monday', 'Weekly, As of Wednesday', 'Weekly, As of Thursday',
                        'Weekly, Ending Monday', 'Weekly, Ending Wednesday', 'Weekly, Ending Thursday',
                        'Weekly, Ending Friday', 'Weekly, Ending Saturday', ]:
-        return relativedelta(weeks=1)
+        return {'count': 1, 'unit': 'WEEK'}
     elif frequency in ['Biweekly, Beg. of Period', 'Biweekly, Ending Wednesday']:
-        return relativedelta(weeks=2)
+        return {'count': 2, 'unit': 'WEEK'}
     elif frequency in ['Monthly (M)', 'Monthly', 'Monthly, End of Period', 'Monthly, End of Month',
                        'Monthly, Middle of Month']:
-        return relativedelta(months=1)
+        return {'count': 1, 'unit': 'MONTH'}
     elif frequency in ['Quarterly (Q)', 'Quarterly', 'Quarterly, End of Period',
                        "Quarterly, 2nd Month 1st Full Week", 'Quarterly, End of Quarter']:
-        return relativedelta(months=3)
+        return {'count': 1, 'unit': 'QUARTER'}
     elif frequency in ['Semiannual']:
-        return relativedelta(months=6)
+        return {'count': 6, 'unit': 'MONTH'}
     elif frequency in ['Annual (A)', 'Annual', 'Annual, End of Year', 'Annual, Fiscal Year', 'Annual, End of Period']:
-        return relativedelta(years=1)
+        return {'count': 1, 'unit': 'YEAR'}
     else:
         raise Exception('Unknown frequency %s' % frequency)
 
 
-print('value, actual date, expected date, frequency, metric, entity, tags')
+# load series of all metrics in one request
+queries = []
 for metric in metric_list:
-
-    # get metric frequency and transform frequency into relativedelta
-    frequency = metric.tags['frequency']
-    frequency_interval = resolve_frequency(frequency)
-
-    # for each metric load series
     sf = SeriesFilter(metric=metric.name)
     ef = EntityFilter(entity='*')
     df = DateFilter(start_date="1970-01-01T00:00:00Z", end_date=datetime.now())
-    query = SeriesQuery(series_filter=sf, entity_filter=ef, date_filter=df)
-    series_list = svc.query(query)
-
-    # iterate through the retrieved series
-    for series in series_list:
-        data = series.data
-        gap_shift = 0
-        first_sample_date = data[0].get_date()
-
-        # check if series has samples on the last day and it is classified monthly, quarterly or annual
-        is_last_day = calendar.monthrange(first_sample_date.year, first_sample_date.month)[1] == first_sample_date.day \
-                      and frequency_interval in [relativedelta(months=1), relativedelta(months=3),
-                                                 relativedelta(months=6), relativedelta(months=12)]
+    queries.append(SeriesQuery(series_filter=sf, entity_filter=ef, date_filter=df))
+series_list = svc.query(*queries)
 
-        # iterate through the data
-        for i, sample in enumerate(data[:-1]):
+frequencies = {metric.name: metric.tags['frequency'] for metric in metric_list}
 
-            # take into account possible data gap when calculate expected date for the next sample
-            expected_sample_date = first_sample_date + (i + 1 + gap_shift) * frequency_interval
-            actual_sample_date = data[i + 1].get_date()
-            value = data[i + 1].v
-
-            if actual_sample_date != expected_sample_date:
-
-                # exclude data gaps if presented
-                while expected_sample_date + frequency_interval <= actual_sample_date:
-                    gap_shift += 1
-                    expected_sample_date += frequency_interval
-
-                # if series has samples on the last day, update the day
-                if is_last_day:
-                    expected_sample_date = expected_sample_date.replace(
-                        day=calendar.monthrange(expected_sample_date.year, expected_sample_date.month)[1])
-
-                # compare the obtained dates
-                if actual_sample_date != expected_sample_date:
-                    print('%s, %s, %s, %s, %s, %s, %s' % (value, actual_sample_date, expected_sample_date,
-                                                          frequency, series.metric, series.entity, series.tags))
+print('value, actual date, expected date, frequency, metric, entity, tags')
+for series in series_list:
+    frequency = frequencies[series.metric]
+    # samples off the schedule, data gaps which are a multiple of the frequency period are not reported
+    for violation in find_violations(series, resolve_frequency(frequency)):
+        print('%s, %s, %s, %s, %s, %s, %s' % (violation.value, violation.date, violation.expected_date,
+                                              frequency, series.metric, series.entity, series.tags))
@@ -2,7 +2,7 @@ from datetime import datetime
 
 from atsd_client import connect, connect_url
 from atsd_client.utils import print_tags
-from atsd_client.models import SeriesQuery, SeriesFilter, EntityFilter, DateFilter, ControlFilter
+from atsd_client.models import SeriesQuery, SeriesFilter, EntityFilter, DateFilter, ControlFilter, SeriesIndex
 from atsd_client.services import MetricsService, SeriesService
 
 '''
@@ -35,27 +35,19 @@ series_list_asc = svc.query(query)
 query = SeriesQuery(series_filter=sf, entity_filter=ef, date_filter=df, control_filter=ControlFilter(limit=1))
 series_list_desc = svc.query(query)
 
-for series_asc in series_list_asc:
-    if len(series_asc.data) > 0:
-
-        # get corresponding descending series and remove series from desc list
-        index_series_desc = -1
-        for idx, sd in enumerate(series_list_desc):
-            if sd.entity == series_asc.entity and sd.metric == series_asc.entity and sd.tags == series_asc.tags:
-                index_series_desc = idx
-                break
-        series_desc = series_list_desc.pop(index_series_desc)
-
-        # get label from meta information
-        label = series_asc.meta['entity'].label if series_asc.meta['entity'].label is not None else ''
-        # get first and last samples in series to output
-        print('%s,%s,%s,%s,%s,%s,%s' % (series_asc.entity, label, print_tags(series_asc.tags),
-                                              series_asc.get_first_value_date(), series_asc.get_first_value(),
-                                              series_desc.get_first_value_date(), series_desc.get_first_value()))
-
-# print remaining series that are not in ascending list
-for series_desc in series_list_desc:
-    label = series_desc.meta['entity'].label if series_desc.meta['entity'].label is not None else ''
+# match ascending and descending series by metric, entity and tags
+for key, series_asc, series_desc in SeriesIndex.join(series_list_asc, series_list_desc):
+    if series_desc is None or len(series_desc.data) == 0:
+        continue
+    # get label from meta information
+    label = ''
+    if series_asc is not None and series_asc.meta['entity'].label is not None:
+        label = series_asc.meta['entity'].label
+    if series_asc is not None and len(series_asc.data) > 0:
+        first_date, first_value = series_asc.get_first_value_date(), series_asc.get_first_value()
+    else:
+        first_date, first_value = '', ''
+    # get first and last samples in series to output
     print('%s,%s,%s,%s,%s,%s,%s' % (series_desc.entity, label, print_tags(series_desc.tags),
-                                          '', '',
-                                          series_desc.get_first_value_date(), series_desc.get_first_value()))
+                                    first_date, first_value,
+                                    series_desc.get_first_value_date(), series_desc.get_first_value()))
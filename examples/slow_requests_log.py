@@ -0,0 +1,54 @@
+import logging
+import tracemalloc
+
+from atsd_client import connect_url
+from atsd_client.models import SeriesQuery, SeriesFilter, EntityFilter, DateFilter
+from atsd_client.services import SeriesService
+
+'''
+Log requests which take longer than the threshold together with the request id sent to the server,
+timings of each request phase and memory allocated while the response was decoded.
+'''
+
+# Connect to ATSD server
+# connection = connect('/path/to/connection.properties')
+connection = connect_url('https://atsd_hostname:8443', 'username', 'password')
+
+slow_request_seconds = 1.0
+tracemalloc.start()
+
+
+def before_serialize(record):
+    # prefix request ids to find requests of this script in the server log
+    record.request_id = 'slow-requests-log-' + record.request_id
+
+
+def after_receive(record):
+    record.memory_before_decode = tracemalloc.get_traced_memory()[0]
+
+
+def after_decode(record):
+    if record.elapsed < slow_request_seconds:
+        return
+    memory = tracemalloc.get_traced_memory()[0] - getattr(record, 'memory_before_decode', 0)
+    logging.warning('Slow request %s %s id=%s: total=%.3fs serialize=%.3fs send=%.3fs decode=%.3fs '
+                    'sent=%sB received=%sB decode memory=%sB', record.method, record.path, record.request_id,
+                    record.elapsed, record.serialize_time, record.send_time, record.decode_time,
+                    record.request_bytes, record.response_bytes, memory)
+
+
+def on_error(record):
+    logging.error('Request %s %s id=%s failed after %.3fs: %s', record.method, record.path, record.request_id,
+                  record.elapsed, record.error)
+
+
+connection.add_hook('before_serialize', before_serialize)
+connection.add_hook('after_receive', after_receive)
+connection.add_hook('after_decode', after_decode)
+connection.add_hook('on_error', on_error)
+
+svc = SeriesService(connection)
+query = SeriesQuery(series_filter=SeriesFilter(metric='cpu_busy'), entity_filter=EntityFilter(entity='*'),
+                    date_filter=DateFilter(interval={'count': 1, 'unit': 'DAY'}, end_date='now'))
+series = svc.query(query)
+print('Series: %s' % len(series))
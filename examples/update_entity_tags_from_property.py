@@ -1,8 +1,6 @@
 import six
-from datetime import datetime
 
 from atsd_client import connect, connect_url
-from atsd_client.models import PropertiesQuery, EntityFilter, DateFilter
 from atsd_client.services import EntityGroupsService, EntitiesService, PropertiesService
 from atsd_client.utils import print_tags, print_str
 
@@ -29,10 +27,12 @@ entities = [entity for entity in entities_list if entity.tags]
 
 entities_service = EntitiesService(connection)
 
-# prepare property query
-ef = EntityFilter('entity')
-df = DateFilter(start_date="1970-01-01T00:00:00Z", end_date=datetime.now())
-property_query = PropertiesQuery(entity_filter=ef, date_filter=df, type=property_type)
+# load properties of all entities with a few concurrent requests
+properties = properties_service.query_for_entities(entities, property_type)
+properties_by_entity = {}
+# keep the most recent property of each entity, properties with the same date are ordered by key
+for (entity_name, key), prop in sorted(properties.items(), key=lambda item: (item[1].date, item[0])):
+    properties_by_entity[entity_name] = prop
 
 print('entity_name,entity_label,tags')
 for entity in entities:
@@ -40,13 +40,10 @@ for entity in entities:
     for key in entity.tags:
         entity.tags[key] = ''
 
-    # set actual entity and execute property query
-    property_query.set_entity_filter(EntityFilter(entity.name))
-    properties_list = properties_service.query(property_query)
     # set entity tags from property tags
-    if properties_list:
-        property_tags = properties_list[0].tags
-        for key, value in six.iteritems(property_tags):
+    prop = properties_by_entity.get(entity.name)
+    if prop is not None:
+        for key, value in six.iteritems(prop.tags):
             entity.tags['env.%s' % key] = value
 
     print('%s,%s,%s' % (entity.name, print_str(entity.label), pretty_tags))
@@ -0,0 +1,27 @@
+from atsd_client import connect
+from atsd_client.migration import verify
+
+'''
+Compare series of the metrics on the source and target ATSD after migration.
+Servers calculate count, minimum, maximum and sum of samples in daily windows. Windows with different values
+are split until the difference is localized within one minute, only differing intervals are printed.
+'''
+
+# Connect to source ATSD
+# source_connection = connect_url('https://atsd_hostname:8443', 'username', 'password')
+source_connection = connect('/path/to/source.connection.properties')
+
+# Connect to target ATSD
+# target_connection = connect_url('https://atsd_hostname:8443', 'username', 'password')
+target_connection = connect('/path/to/target.connection.properties')
+
+metrics = ['cpu_busy', 'disk_used']
+start_date = '2018-05-01T00:00:00Z'
+end_date = '2018-05-08T00:00:00Z'
+
+mismatches = verify(source_connection, target_connection, metrics, start_date=start_date, end_date=end_date,
+                    window={'count': 1, 'unit': 'DAY'}, min_window={'count': 1, 'unit': 'MINUTE'})
+
+for m in mismatches:
+    print('%s %s %s [%s, %s) source: %s target: %s' % (m.metric, m.entity, m.tags, m.start, m.end, m.source, m.target))
+print('Mismatching intervals: %s' % len(mismatches))
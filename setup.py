@@ -51,7 +51,7 @@ endpoints.'''
 
 setup(
     name='atsd_client',
-    packages=['atsd_client', 'atsd_client.models'],
+    packages=['atsd_client', 'atsd_client.models', 'atsd_client.analytics'],
     version=version,
     python_requires='>={}.{}'.format(*REQUIRED_PYTHON),
     description='Axibase Time Series Database API Client for Python',
@@ -61,7 +61,7 @@ setup(
     license='Apache 2.0',
     install_requires=install_requires,
     extras_require={
-       'analysis': ['pandas']
+       'analysis': ['pandas', 'numpy']
     },
     long_description=long_description,
     long_description_content_type="text/markdown",
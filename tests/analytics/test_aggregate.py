@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import time
+import unittest
+import atsd_client
+from atsd_client.analytics import aggregate
+from atsd_client.models import Series, Sample, SeriesQuery, SeriesFilter, EntityFilter, DateFilter, Aggregate, \
+    AggregateType, TimeUnit, TransformationFilter
+from atsd_client.services import SeriesService
+
+ENTITY = 'pyapi.analytics.entity'
+METRIC = 'pyapi.analytics.metric'
+START = 1546300800000
+END = START + 4 * 3600000
+VALUES = [1, 5, 3, 2, 10, 0, 4, 4, 7, 1, 6, 8]
+PERIOD = {'count': 1, 'unit': TimeUnit.HOUR, 'timezone': 'UTC'}
+TYPES = [AggregateType.COUNT, AggregateType.MIN, AggregateType.MAX, AggregateType.AVG, AggregateType.SUM,
+         AggregateType.FIRST, AggregateType.LAST, AggregateType.DELTA, AggregateType.PERCENTILE_90,
+         AggregateType.MEDIAN, AggregateType.STANDARD_DEVIATION, AggregateType.WAVG, AggregateType.WTAVG,
+         AggregateType.THRESHOLD_COUNT]
+WAIT_TIME = 1
+
+
+def create_series():
+    """
+    Series with samples every 20 minutes.
+    """
+    series = Series(ENTITY, METRIC)
+    for i, value in enumerate(VALUES):
+        series.add_samples(Sample(value, START + i * 1200000))
+    return series
+
+
+class TestAggregate(unittest.TestCase):
+
+    def test_aggregate_values(self):
+        agg = Aggregate(period=PERIOD, types=[AggregateType.COUNT, AggregateType.SUM, AggregateType.MIN,
+                                              AggregateType.MAX, AggregateType.DELTA])
+        count, total, minimum, maximum, delta = aggregate(create_series(), agg, START, END)
+        self.assertEqual([START + i * 3600000 for i in range(4)], [sample.t for sample in total.data])
+        self.assertEqual([3, 3, 3, 3], [sample.v for sample in count.data])
+        self.assertEqual([9, 12, 15, 15], [sample.v for sample in total.data])
+        self.assertEqual([1, 0, 4, 1], [sample.v for sample in minimum.data])
+        self.assertEqual([5, 10, 7, 8], [sample.v for sample in maximum.data])
+        self.assertEqual([2, -3, 7, 1], [sample.v for sample in delta.data])
+
+    def test_aggregate_without_period(self):
+        local = aggregate(create_series(), {'types': [AggregateType.COUNT, AggregateType.AVG]})
+        self.assertEqual(len(VALUES), local[0].get_last_value())
+        self.assertAlmostEqual(sum(VALUES) / float(len(VALUES)), local[1].get_last_value())
+
+
+class TestAggregateServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Insert series with samples every 20 minutes.
+        """
+        cls.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+        cls.service = SeriesService(cls.connection)
+        cls.series = create_series()
+        cls.service.insert(cls.series)
+        time.sleep(WAIT_TIME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.connection.close()
+
+    def test_aggregate(self):
+        agg = Aggregate(period=PERIOD, types=TYPES, threshold={'min': 1, 'max': 6})
+        local = aggregate(self.series, agg, START, END)
+        query = SeriesQuery(series_filter=SeriesFilter(metric=METRIC), entity_filter=EntityFilter(entity=ENTITY),
+                            date_filter=DateFilter(start_date=START, end_date=END),
+                            transformation_filter=TransformationFilter(aggregate=agg))
+        remote = self.service.query(query)
+        self.assertEqual(len(TYPES), len(local))
+        remote_by_type = {s.aggregate['type']: s for s in remote}
+        for s in local:
+            expected = remote_by_type[s.aggregate['type']]
+            self.assertEqual([sample.t for sample in expected.data], [sample.t for sample in s.data])
+            for expected_sample, sample in zip(expected.data, s.data):
+                self.assertAlmostEqual(expected_sample.v, sample.v, msg=s.aggregate['type'])
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import time
+import unittest
+import atsd_client
+from atsd_client.analytics import detect, insert_messages, MaxDeltaDetector, ZScoreDetector, MadDetector, \
+    EwmaDetector
+from atsd_client.models import Series, Sample, MessageQuery, EntityFilter, DateFilter
+from atsd_client.services import MessageService
+
+ENTITY = 'pyapi.analytics.anomaly.entity'
+METRIC = 'pyapi.analytics.anomaly.metric'
+MESSAGE_TYPE = 'pyapi.anomaly'
+START = 1546300800000
+STEP = 3600000
+SPIKE = 30
+WAIT_TIME = 1
+
+
+def create_series():
+    series = Series(ENTITY, METRIC)
+    for i in range(60):
+        series.add_samples(Sample(100 + i % 3 + (50 if i == SPIKE else 0), START + i * STEP))
+    return series
+
+
+class TestAnomaly(unittest.TestCase):
+
+    def test_detectors(self):
+        series = create_series()
+        detectors = [MaxDeltaDetector({'count': 10, 'unit': 'HOUR'}), ZScoreDetector(10), MadDetector(10),
+                     EwmaDetector()]
+        for detector in detectors:
+            anomalies = detect(series, detector)
+            self.assertEqual([START + SPIKE * STEP], [int(a.date.timestamp() * 1000) for a in anomalies],
+                             detector.name)
+            self.assertEqual(150, anomalies[0].value)
+
+
+class TestAnomalyServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.connection.close()
+
+    def test_insert_messages(self):
+        anomalies = detect([create_series()], ZScoreDetector(10))
+        message_service = MessageService(self.connection)
+        self.assertEqual(1, insert_messages(anomalies, message_service, message_type=MESSAGE_TYPE))
+        time.sleep(WAIT_TIME)
+
+        query = MessageQuery(entity_filter=EntityFilter(entity=ENTITY),
+                             date_filter=DateFilter(start_date=START, end_date=START + 60 * STEP), type=MESSAGE_TYPE)
+        messages = message_service.query(query)
+        self.assertEqual(1, len(messages))
+        self.assertEqual(METRIC, messages[0].tags['metric'])
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import time
+import unittest
+import atsd_client
+from dateutil.parser import parse
+from atsd_client.analytics import find_gaps, find_violations
+from atsd_client.models import Series, Sample, SeriesQuery, SeriesFilter, EntityFilter, DateFilter
+from atsd_client.services import SeriesService
+
+ENTITY = 'pyapi.analytics.gaps.entity'
+METRIC = 'pyapi.analytics.gaps.metric'
+# Month ends of 2018 without April and May, and one sample in the middle of August
+DATES = ['2018-01-31T00:00:00Z', '2018-02-28T00:00:00Z', '2018-03-31T00:00:00Z', '2018-06-30T00:00:00Z',
+         '2018-07-31T00:00:00Z', '2018-08-15T00:00:00Z', '2018-08-31T00:00:00Z']
+PERIOD = {'count': 1, 'unit': 'MONTH'}
+WAIT_TIME = 1
+
+
+def create_series():
+    """
+    Monthly series.
+    """
+    series = Series(ENTITY, METRIC)
+    for i, date in enumerate(DATES):
+        series.add_samples(Sample(i, date))
+    return series
+
+
+def check_gaps(test, series):
+    gaps = find_gaps(series, PERIOD)
+    test.assertEqual(1, len(gaps))
+    test.assertEqual(2, gaps[0].missing)
+    test.assertEqual(parse(DATES[2]), gaps[0].start)
+    test.assertEqual(parse(DATES[3]), gaps[0].end)
+
+    violations = find_violations(series, PERIOD)
+    test.assertEqual(1, len(violations))
+    test.assertEqual(5, violations[0].value)
+    test.assertEqual(parse(DATES[6]), violations[0].expected_date)
+
+
+class TestGaps(unittest.TestCase):
+
+    def test_find_gaps(self):
+        check_gaps(self, [create_series()])
+
+
+class TestGapsServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Insert monthly series.
+        """
+        cls.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+        cls.service = SeriesService(cls.connection)
+        cls.service.insert(create_series())
+        time.sleep(WAIT_TIME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.connection.close()
+
+    def test_find_gaps(self):
+        query = SeriesQuery(series_filter=SeriesFilter(metric=METRIC), entity_filter=EntityFilter(entity=ENTITY),
+                            date_filter=DateFilter(start_date='2018-01-01T00:00:00Z', end_date='2019-01-01T00:00:00Z'))
+        check_gaps(self, self.service.query(query))
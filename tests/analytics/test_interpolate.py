@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import time
+import unittest
+import atsd_client
+from atsd_client.analytics import interpolate, align
+from atsd_client.models import Series, Sample, SeriesQuery, SeriesFilter, EntityFilter, DateFilter, Interpolate, \
+    InterpolateFunction, InterpolateBoundary, TimeUnit, TransformationFilter
+from atsd_client.services import SeriesService
+
+ENTITY = 'pyapi.analytics.interpolate.entity'
+METRIC = 'pyapi.analytics.interpolate.metric'
+START = 1546300800000
+END = START + 3600000
+PERIOD = {'count': 10, 'unit': TimeUnit.MINUTE, 'timezone': 'UTC'}
+WAIT_TIME = 1
+
+
+def create_series():
+    """
+    Series with irregular samples.
+    """
+    series = Series(ENTITY, METRIC)
+    for offset, value in [(-300000, 2), (420000, 4), (1500000, 1), (2100000, 9), (3300000, 3), (3900000, 8)]:
+        series.add_samples(Sample(value, START + offset))
+    return series
+
+
+class TestInterpolate(unittest.TestCase):
+
+    def test_interpolate_linear(self):
+        settings = Interpolate(period=PERIOD, function=InterpolateFunction.LINEAR,
+                               boundary=InterpolateBoundary.INNER, fill=False)
+        series = interpolate(create_series(), settings, START, END)[0]
+        self.assertEqual([START + i * 600000 for i in range(1, 6)], [sample.t for sample in series.data])
+        for expected, sample in zip([3.5, 11 / 6.0, 5, 7.5, 4.5], series.data):
+            self.assertAlmostEqual(expected, sample.v)
+
+    def test_align(self):
+        other = Series(ENTITY, METRIC, data=[Sample(0, START), Sample(6, END)])
+        settings = {'period': PERIOD, 'function': InterpolateFunction.LINEAR, 'boundary': InterpolateBoundary.OUTER}
+        grid, values = align([create_series(), other], settings, START, END)
+        self.assertEqual(6, len(grid))
+        self.assertEqual((2, 6), values.shape)
+        self.assertEqual([0, 1, 2, 3, 4, 5], list(values[1]))
+
+
+class TestInterpolateServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Insert series with irregular samples.
+        """
+        cls.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+        cls.service = SeriesService(cls.connection)
+        cls.series = create_series()
+        cls.service.insert(cls.series)
+        time.sleep(WAIT_TIME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.connection.close()
+
+    def check_interpolate(self, function, boundary, fill):
+        settings = Interpolate(period=PERIOD, function=function, boundary=boundary, fill=fill)
+        local = interpolate(self.series, settings, START, END)[0]
+        query = SeriesQuery(series_filter=SeriesFilter(metric=METRIC), entity_filter=EntityFilter(entity=ENTITY),
+                            date_filter=DateFilter(start_date=START, end_date=END),
+                            transformation_filter=TransformationFilter(interpolate=settings))
+        remote = self.service.query(query)[0]
+        self.assertEqual([sample.t for sample in remote.data], [sample.t for sample in local.data])
+        for expected, sample in zip(remote.data, local.data):
+            self.assertAlmostEqual(expected.v, sample.v)
+
+    def test_interpolate_linear(self):
+        self.check_interpolate(InterpolateFunction.LINEAR, InterpolateBoundary.INNER, False)
+
+    def test_interpolate_previous(self):
+        self.check_interpolate(InterpolateFunction.PREVIOUS, InterpolateBoundary.INNER, True)
+
+    def test_interpolate_outer(self):
+        self.check_interpolate(InterpolateFunction.LINEAR, InterpolateBoundary.OUTER, False)
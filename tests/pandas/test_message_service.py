@@ -45,3 +45,14 @@ class TestMessageService(ServiceTestBase):
         self.assertEqual(ENTITY, result.loc[0, 'entity'])
         self.assertEqual(SEVERITY, result.loc[0, 'severity'])
         self.assertEqual(TAG_VALUE, result.loc[0, TAG])
+
+    def test_query_dataframe_categorical(self):
+        ef = EntityFilter(entity=ENTITY)
+        df = DateFilter(interval=INTERVAL, end_date=datetime.now())
+        query = MessageQuery(entity_filter=ef, date_filter=df)
+        result = self.service.query_dataframe(query, categorical=True)
+        self.assertIsNotNone(result)
+        self.assertEqual('category', result['entity'].dtype.name)
+        self.assertEqual('category', result['type'].dtype.name)
+        self.assertEqual('category', result[TAG].dtype.name)
+        self.assertEqual(TAG_VALUE, result.loc[0, TAG])
@@ -42,3 +42,13 @@ class TestPropertiesService(ServiceTestBase):
         self.assertEqual(TYPE, result.loc[0, 'type'])
         self.assertEqual(TAG_VALUE, result.loc[0, TAG])
         self.assertEqual(ENTITY, result.loc[0, 'entity'])
+
+    def test_query_dataframe_categorical(self):
+        ef = EntityFilter(entity=ENTITY)
+        df = DateFilter(start_date=DATE, end_date=datetime.now())
+        query = PropertiesQuery(type=TYPE, entity_filter=ef, date_filter=df)
+        result = self.service.query_dataframe(query, categorical=True)
+        self.assertIsNotNone(result)
+        self.assertEqual('category', result['entity'].dtype.name)
+        self.assertEqual('category', result[KEY_NAME].dtype.name)
+        self.assertEqual(TAG_VALUE, result.loc[0, TAG])
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import time
+import unittest
+import atsd_client
+from atsd_client.bulk import BulkDeleter
+from atsd_client.models import Series, Sample
+from atsd_client.services import EntitiesService, SeriesService, MetricsService
+
+ENTITY_PREFIX = 'pyapi.bulk_deleter.entity_'
+METRIC = 'pyapi.bulk_deleter.metric'
+ENTITY_COUNT = 5
+WAIT_TIME = 1
+
+
+class TestBulkDeleter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+        cls.entities_service = EntitiesService(cls.connection)
+        cls.series_service = SeriesService(cls.connection)
+        cls.metrics_service = MetricsService(cls.connection)
+
+    def setUp(self):
+        """
+        Insert series for each test entity.
+        """
+        for i in range(ENTITY_COUNT):
+            series = Series(ENTITY_PREFIX + str(i), METRIC)
+            series.add_samples(Sample(i, int(time.time() * 1000)))
+            self.series_service.insert(series)
+        time.sleep(WAIT_TIME)
+
+    def test_dry_run(self):
+        progress = []
+        deleter = BulkDeleter(self.connection, dry_run=True, progress=lambda done, total: progress.append(done))
+        result = deleter.delete_entities(expression='name LIKE "%s*"' % ENTITY_PREFIX)
+        self.assertEqual(ENTITY_COUNT, result.matched)
+        self.assertEqual(0, result.processed)
+        self.assertEqual([], progress)
+        self.assertEqual(ENTITY_COUNT, len(self.entities_service.list(expression='name LIKE "%s*"' % ENTITY_PREFIX)))
+
+    def test_delete_metric_series(self):
+        deleter = BulkDeleter(self.connection, batch_size=2, max_workers=2)
+        result = deleter.delete_metric_series(METRIC)
+        self.assertEqual(ENTITY_COUNT, result.matched)
+        self.assertEqual(ENTITY_COUNT, result.processed)
+        self.assertEqual([], result.failed)
+        time.sleep(WAIT_TIME)
+        self.assertEqual([], self.metrics_service.series(METRIC))
+
+    def test_delete_entities_requires_filter(self):
+        deleter = BulkDeleter(self.connection, dry_run=True)
+        with self.assertRaises(ValueError):
+            deleter.delete_entities()
+        with self.assertRaises(ValueError):
+            deleter.delete_entities(min_insert_date='1970-01-01T00:00:00Z')
+
+    def test_delete_entities(self):
+        progress = []
+        deleter = BulkDeleter(self.connection, max_workers=2, rate_limit=10,
+                              progress=lambda done, total: progress.append(done))
+        result = deleter.delete_entities(expression='name LIKE "%s*"' % ENTITY_PREFIX)
+        self.assertEqual(ENTITY_COUNT, result.processed)
+        self.assertEqual(list(range(1, ENTITY_COUNT + 1)), progress)
+        time.sleep(WAIT_TIME)
+        self.assertEqual([], self.entities_service.list(expression='name LIKE "%s*"' % ENTITY_PREFIX))
+
+    @classmethod
+    def tearDownClass(cls):
+        BulkDeleter(cls.connection).delete_entities(expression='name LIKE "%s*"' % ENTITY_PREFIX)
+        cls.connection.close()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import time
+import unittest
+import atsd_client
+from atsd_client.bulk import BulkUpserter
+from atsd_client.models import Entity, Metric
+from atsd_client.services import EntitiesService, MetricsService
+
+ENTITY = 'pyapi.bulk_upserter.entity'
+NEW_ENTITY = 'pyapi.bulk_upserter.new_entity'
+METRIC = 'pyapi.bulk_upserter.metric'
+TAG = 'pyapi.tag'
+WAIT_TIME = 1
+
+
+class TestBulkUpserter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+        cls.entities_service = EntitiesService(cls.connection)
+        cls.metrics_service = MetricsService(cls.connection)
+
+    def setUp(self):
+        """
+        Create entity and metric, remove the new entity.
+        """
+        self.entities_service.create_or_replace(Entity(ENTITY, label='label', tags={TAG: 'a'}))
+        self.metrics_service.create_or_replace(Metric(METRIC, label='label', retention_days=10))
+        self.entities_service.delete(NEW_ENTITY)
+        time.sleep(WAIT_TIME)
+
+    def check_upsert(self, upserter):
+        objects = [Entity(ENTITY, label='label', tags={TAG: 'b'}), Entity(NEW_ENTITY, label='new'),
+                   Metric(METRIC, label='label', retention_days=10)]
+        result = upserter.upsert(objects)
+        # The metric is unchanged
+        self.assertEqual(2, result.matched)
+        self.assertEqual(2, result.processed)
+        time.sleep(WAIT_TIME)
+
+        entity = self.entities_service.get(ENTITY)
+        self.assertEqual('label', entity.label)
+        self.assertEqual('b', entity.tags[TAG])
+        self.assertEqual('new', self.entities_service.get(NEW_ENTITY).label)
+        self.assertEqual(0, upserter.upsert(objects).matched)
+
+    def test_upsert(self):
+        self.check_upsert(BulkUpserter(self.connection, max_workers=2))
+
+    def test_upsert_commands(self):
+        self.check_upsert(BulkUpserter(self.connection, use_commands=True))
+
+    def test_dry_run(self):
+        result = BulkUpserter(self.connection, dry_run=True).upsert([Metric(METRIC, retention_days=20)])
+        self.assertEqual(1, result.matched)
+        self.assertEqual(0, result.processed)
+        self.assertEqual(10, self.metrics_service.get(METRIC).retention_days)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.entities_service.delete(ENTITY)
+        cls.entities_service.delete(NEW_ENTITY)
+        cls.metrics_service.delete(METRIC)
+        cls.connection.close()
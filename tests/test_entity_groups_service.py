@@ -183,6 +183,29 @@ class TestEntityGroupsService(ServiceTestBase):
         self.assertIsNotNone(result)
         self.assertEqual(len(result), 0)
 
+    def test_sync_entities(self):
+        # Delete expression
+        eg = EntityGroup(name=NAME)
+        self.service.create_or_replace(eg)
+
+        prefix = 'pyapi.entity_groups_service.sync_entities.entity_'
+        self.service.set_entities(NAME, [ENTITY, prefix + '1'])
+        time.sleep(self.wait_time)
+
+        desired = [prefix + '1', prefix + '2', prefix + '3']
+        added, removed = self.service.sync_entities(NAME, desired, chunk_size=1)
+        self.assertEqual([prefix + '2', prefix + '3'], added)
+        self.assertEqual([ENTITY], removed)
+
+        time.sleep(self.wait_time)
+
+        result = self.service.get_entities(NAME)
+        self.assertEqual(sorted(desired), sorted(e.name for e in result))
+        self.assertEqual(([], []), self.service.sync_entities(NAME, desired))
+        for name in desired:
+            # Clean up ATSD.
+            self._entity_service.delete(name)
+
     @classmethod
     def tearDownClass(cls):
         """
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+import atsd_client
+from atsd_client.instrumentation import PrometheusExporter, HOOK_EVENTS, endpoint_template
+from atsd_client.services import MetricsService, EntitiesService
+
+METRIC = 'pyapi.instrumentation.missing_metric'
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_endpoint_template(self):
+        self.assertEqual('v1/series/query', endpoint_template('v1/series/query'))
+        self.assertEqual('v1/metrics/{metric}/series', endpoint_template('v1/metrics/cpu_busy/series'))
+        self.assertEqual('v1/entity-groups/{group}/entities/add', endpoint_template('v1/entity-groups/g/entities/add'))
+        self.assertEqual('v1/command', endpoint_template('v1/command?commit=true'))
+        self.assertEqual('v1/{param}/{param}/series', endpoint_template('v1/custom/name/series'))
+
+    def test_stats(self):
+        MetricsService(self.connection).get(METRIC)
+        EntitiesService(self.connection).list(limit=1)
+        EntitiesService(self.connection).list(limit=1)
+        stats = self.connection.stats()
+
+        entities = stats[('GET', 'v1/entities')]
+        self.assertEqual(2, entities.count)
+        self.assertEqual({}, entities.errors)
+        self.assertGreater(entities.response_bytes, 0)
+        self.assertLessEqual(entities.p50, entities.p99)
+        self.assertEqual(2, entities.buckets[-1])
+
+        metric = stats[('GET', 'v1/metrics/{metric}')]
+        self.assertEqual({'404': 1}, metric.errors)
+
+    def test_prometheus_exporter(self):
+        EntitiesService(self.connection).list(limit=1)
+        path = os.path.join(tempfile.mkdtemp(), 'atsd_client.prom')
+        PrometheusExporter(path).export(self.connection.stats())
+        with open(path) as f:
+            content = f.read()
+        self.assertIn('atsd_client_requests_total{endpoint="v1/entities",method="GET"} 1', content)
+        self.assertIn('atsd_client_request_duration_seconds_count{endpoint="v1/entities",method="GET"} 1', content)
+        self.assertIn('atsd_client_decode_seconds_total{endpoint="v1/entities",method="GET"}', content)
+
+    def test_hooks(self):
+        events = []
+        for event in HOOK_EVENTS:
+            self.connection.add_hook(event, lambda record, event=event: events.append((event, record.endpoint)))
+        headers = []
+        self.connection.add_hook('before_send', lambda record: headers.append(record.request.headers))
+        EntitiesService(self.connection).list(limit=1)
+        self.assertEqual([('before_serialize', 'v1/entities'), ('before_send', 'v1/entities'),
+                          ('after_receive', 'v1/entities'), ('after_decode', 'v1/entities')], events)
+        self.assertEqual(32, len(headers[0]['X-Request-ID']))
+
+        del events[:]
+        MetricsService(self.connection).get(METRIC)
+        self.assertEqual(('on_error', 'v1/metrics/{metric}'), events[-1])
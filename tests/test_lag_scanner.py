@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import time
+import unittest
+from datetime import datetime, timedelta
+import atsd_client
+from atsd_client.models import Series, Sample
+from atsd_client.scanner import LagScanner
+from atsd_client.services import SeriesService, MetricsService
+
+ENTITY = 'pyapi.lag_scanner.entity'
+METRIC = 'pyapi.lag_scanner.metric'
+WAIT_TIME = 2
+
+
+class TestLagScanner(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Insert series.
+        """
+        cls.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+        series = Series(ENTITY, METRIC)
+        series.add_samples(Sample(1, datetime.now() - timedelta(hours=1)))
+        SeriesService(cls.connection).insert(series)
+        time.sleep(WAIT_TIME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.connection.close()
+
+    def test_scan_metrics(self):
+        scanner = LagScanner(self.connection, top_k=1)
+        metric = MetricsService(self.connection).get(METRIC)
+        records = list(scanner.scan_metrics([metric], entity=ENTITY))
+        self.assertEqual(1, len(records))
+        self.assertEqual(ENTITY, records[0].entity)
+        self.assertGreaterEqual(records[0].lag, 0)
+        self.assertEqual(records, scanner.worst())
+        # unchanged metric is not requested again
+        self.assertEqual(records[0][:4], list(scanner.scan_metrics([metric], entity=ENTITY))[0][:4])
+
+    def test_scan_metrics_min_lag(self):
+        scanner = LagScanner(self.connection)
+        self.assertEqual([ENTITY], [r.entity for r in scanner.scan_metrics([METRIC], min_lag=30, entity=ENTITY)])
+        self.assertEqual([], list(scanner.scan_metrics([METRIC], min_lag=120, entity=ENTITY)))
+
+    def test_scan_entities(self):
+        scanner = LagScanner(self.connection)
+        records = list(scanner.scan_entities([ENTITY]))
+        self.assertIn(METRIC, [r.metric for r in records])
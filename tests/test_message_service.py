@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
 import time
+import unittest
 from datetime import datetime
+from atsd_client import _jsonutil
 from atsd_client.models import EntityFilter, DateFilter
 from atsd_client.models import Message
-from atsd_client.models import MessageQuery
+from atsd_client.models import MessageQuery, MessageStatisticsQuery, Aggregate, AggregateType, TimeUnit
 from service_test_base import ServiceTestBase
 
 ENTITY = 'pyapi.message_service.entity'
@@ -71,6 +73,35 @@ class TestMessageService(ServiceTestBase):
         self.assertEqual(MESSAGE_2, m.message)
         self.common_checks(m)
 
+    def test_iter_query(self):
+        """
+        Check paged query returns every message once.
+        """
+        query = MessageQuery(entity_filter=ef, date_filter=DateFilter(start_date=DATE, end_date=datetime.now()))
+        result = list(self.service.iter_query(query, page_size=2))
+        self.assertEqual(2, len(result))
+        self.assertEqual({MESSAGE_1, MESSAGE_2}, {m.message for m in result})
+        self.common_checks(result[0])
+
+    def test_iter_query_interval(self):
+        """
+        Check paged query with start date and interval.
+        """
+        query = MessageQuery(entity_filter=ef, date_filter=df)
+        result = list(self.service.iter_query(query, page_size=2))
+        self.assertEqual({MESSAGE_1, MESSAGE_2}, {m.message for m in result})
+
+    def test_statistics(self):
+        """
+        Check message counts are calculated by the server.
+        """
+        aggr = Aggregate(period={'count': 1, 'unit': TimeUnit.HOUR}, types=[AggregateType.COUNT])
+        query = MessageStatisticsQuery(entity_filter=ef, date_filter=df, type=TYPE, aggregate=aggr)
+        result = self.service.statistics(query)
+        self.assertEqual(1, len(result))
+        self.assertEqual(ENTITY, result[0].entity)
+        self.assertEqual(2, sum(result[0].values()))
+
     def common_checks(self, message):
         self.assertEqual(TYPE, message.type)
         self.assertEqual(SOURCE, message.source)
@@ -79,3 +110,24 @@ class TestMessageService(ServiceTestBase):
         self.assertEqual(SEVERITY, message.severity)
         self.assertEqual(TAGS, message.tags)
         self.assertTrue(message.persist)
+
+
+class TestMessageStatisticsQuery(unittest.TestCase):
+
+    def test_serialize(self):
+        """
+        Check statistics query is serialized with a single aggregation type.
+        """
+        query = MessageStatisticsQuery(entity_filter=ef, date_filter=DateFilter(start_date=0, end_date=1), type=TYPE,
+                                       group_keys=['source'])
+        self.assertEqual({'entity': ENTITY, 'startDate': '1970-01-01T00:00:00+00:00',
+                          'endDate': '1970-01-01T00:00:00.001+00:00', 'type': TYPE, 'groupKeys': ['source'],
+                          'aggregate': {'type': 'COUNT'}}, _jsonutil.serialize(query))
+
+        aggr = Aggregate(period={'count': 1, 'unit': TimeUnit.HOUR}, types=[AggregateType.COUNT])
+        query = MessageStatisticsQuery(entity_filter=ef, date_filter=df, aggregate=aggr)
+        self.assertEqual({'type': 'COUNT', 'period': {'count': 1, 'unit': 'HOUR', 'align': 'CALENDAR'}},
+                         _jsonutil.serialize(query)['aggregate'])
+
+        with self.assertRaises(ValueError):
+            MessageStatisticsQuery(entity_filter=ef, date_filter=df, aggregate=Aggregate(None, [AggregateType.MAX]))
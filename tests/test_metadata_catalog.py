@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import time
+import unittest
+import atsd_client
+from atsd_client.catalog import MetadataCatalog
+from atsd_client.models import Entity, EntityGroup
+from atsd_client.services import EntitiesService, EntityGroupsService
+
+ENTITY = 'pyapi.metadata_catalog.entity'
+LABEL = 'pyapi.metadata_catalog.label'
+TAG = 'pyapi.tag'
+TAG_VALUE = 'pyapi.tag-value'
+GROUP = 'pyapi.metadata_catalog.group'
+WAIT_TIME = 1
+
+
+class TestMetadataCatalog(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Create entity and entity group containing the entity.
+        """
+        cls.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+        EntitiesService(cls.connection).create_or_replace(Entity(ENTITY, label=LABEL, tags={TAG: TAG_VALUE}))
+        groups_service = EntityGroupsService(cls.connection)
+        groups_service.create_or_replace(EntityGroup(GROUP))
+        groups_service.add_entities(GROUP, [ENTITY])
+        time.sleep(WAIT_TIME)
+
+    @classmethod
+    def tearDownClass(cls):
+        EntityGroupsService(cls.connection).delete(GROUP)
+        cls.connection.close()
+
+    def test_lookups(self):
+        catalog = MetadataCatalog(self.connection)
+        catalog.refresh(full=True)
+        self.assertEqual(LABEL, catalog.entity_label(ENTITY))
+        self.assertIn(ENTITY, catalog.group_members(GROUP))
+        self.assertIn(GROUP, catalog.entity_groups(ENTITY))
+
+    def test_persistence(self):
+        catalog = MetadataCatalog(self.connection, ':memory:')
+        catalog.refresh(full=True)
+        catalog.refresh()
+        self.assertEqual(LABEL, catalog.entity_label(ENTITY))
+        catalog.close()
+
+    def test_tag_index(self):
+        catalog = MetadataCatalog(self.connection)
+        catalog.refresh(full=True)
+        index = catalog.entity_tag_index()
+        self.assertIn(ENTITY, index.equals(TAG, TAG_VALUE.upper()))
+        self.assertIn(ENTITY, index.prefix(TAG, 'pyapi.tag'))
+        self.assertIn(ENTITY, index.match(TAG, '*tag-val?e'))
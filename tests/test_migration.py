@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import time
+import unittest
+import atsd_client
+from atsd_client.migration import replicate, verify, Transform
+from atsd_client.models import Series, Sample, SeriesQuery, SeriesFilter, EntityFilter, DateFilter
+from atsd_client.services import SeriesService
+
+ENTITY = 'pyapi.migration.entity'
+METRIC = 'pyapi.migration.metric'
+TARGET_METRIC = 'pyapi.migration.target_metric'
+TAGS = {'pyapi.tag': 'pyapi.tag-value', 'pyapi.drop': 'value'}
+START = 1514764800000
+HOUR = 3600000
+SAMPLE_COUNT = 48
+WAIT_TIME = 2
+
+
+class TestMigration(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Insert two days of hourly samples.
+        """
+        cls.connection = atsd_client.connect_url('https://localhost:8443', 'axibase', 'axibase')
+        cls.series_service = SeriesService(cls.connection)
+        series = Series(ENTITY, METRIC, tags=TAGS)
+        for i in range(SAMPLE_COUNT):
+            series.add_samples(Sample(i, START + i * HOUR))
+        cls.series_service.insert(series)
+        time.sleep(WAIT_TIME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.connection.close()
+
+    def test_replicate(self):
+        checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+        transform = Transform(metric=TARGET_METRIC, rename_tags={'pyapi.tag': 'pyapi.new-tag'},
+                              drop_tags=['pyapi.drop'], time_shift={'count': 1, 'unit': 'HOUR'})
+        options = dict(window={'count': 6, 'unit': 'HOUR'}, max_readers=2, max_writers=2, transform=transform,
+                       checkpoint=checkpoint)
+        result = replicate(self.connection, self.connection, [METRIC], entity=ENTITY, start_date=START,
+                           end_date=START + SAMPLE_COUNT * HOUR, **options)
+        self.assertEqual([], result.failed)
+        self.assertEqual(8, result.chunks)
+        self.assertEqual(SAMPLE_COUNT, result.samples)
+        time.sleep(WAIT_TIME)
+
+        query = SeriesQuery(series_filter=SeriesFilter(TARGET_METRIC), entity_filter=EntityFilter(ENTITY),
+                            date_filter=DateFilter(start_date=START, end_date=START + (SAMPLE_COUNT + 1) * HOUR))
+        series = self.series_service.query(query)
+        self.assertEqual(1, len(series))
+        self.assertEqual({'pyapi.new-tag': 'pyapi.tag-value'}, series[0].tags)
+        self.assertEqual([START + (i + 1) * HOUR for i in range(SAMPLE_COUNT)], [s.t for s in series[0].data])
+
+        # copied series are skipped on repeated run
+        result = replicate(self.connection, self.connection, [METRIC], entity=ENTITY, start_date=START,
+                           end_date=START + SAMPLE_COUNT * HOUR, **options)
+        self.assertEqual(0, result.chunks)
+        self.assertEqual(1, result.skipped)
+
+        verify_options = dict(window={'count': 1, 'unit': 'DAY'}, min_window={'count': 1, 'unit': 'HOUR'},
+                              transform=transform)
+        self.assertEqual([], verify(self.connection, self.connection, [METRIC], entity=ENTITY, start_date=START,
+                                    end_date=START + SAMPLE_COUNT * HOUR, **verify_options))
+
+        # changed sample is found by bisection
+        changed = Series(ENTITY, TARGET_METRIC, tags={'pyapi.new-tag': 'pyapi.tag-value'})
+        changed.add_samples(Sample(-1, START + 11 * HOUR))
+        self.series_service.insert(changed)
+        time.sleep(WAIT_TIME)
+        mismatches = verify(self.connection, self.connection, [METRIC], entity=ENTITY, start_date=START,
+                            end_date=START + SAMPLE_COUNT * HOUR, **verify_options)
+        self.assertEqual(1, len(mismatches))
+        self.assertLessEqual(mismatches[0].start, START + 10 * HOUR)
+        self.assertGreater(mismatches[0].end, START + 10 * HOUR)
+        self.assertLessEqual(mismatches[0].end - mismatches[0].start, HOUR)
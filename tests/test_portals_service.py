@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+from atsd_client.exceptions import ServerException
+from service_test_base import ServiceTestBase
+
+PORTAL = 'pyapi.portals_service.missing_portal'
+
+
+class TestPortalsService(ServiceTestBase):
+
+    def test_get_portal_requires_id_or_name(self):
+        with self.assertRaises(ValueError):
+            self.service.get_portal(entity='pyapi.entity')
+
+    def test_export_many(self):
+        requests = [{'name': PORTAL, 'entity': 'pyapi.entity-%s' % i, 'portal_file': 'unused.png'} for i in range(3)]
+        result = self.service.export_many(requests, max_workers=2, timeout=30)
+        self.assertEqual(3, len(result))
+        for error in result:
+            self.assertIsInstance(error, ServerException)
@@ -5,6 +5,7 @@ from datetime import datetime
 from atsd_client.models import EntityFilter, DateFilter
 from atsd_client.models import Property
 from atsd_client.models import PropertiesQuery
+from atsd_client.services import PropertiesService
 from service_test_base import ServiceTestBase
 
 
@@ -62,6 +63,42 @@ class TestPropertiesService(ServiceTestBase):
         p = result[0]
         self.assertEqual(TYPE, p)
 
+    def test_url_query(self):
+        result = self.service.url_query(ENTITY, TYPE)
+        self.assertIsNotNone(result)
+        self.assertGreater(len(result), 0)
+        self.common_checks(result[0])
+        # repeated request is revalidated against the response cache
+        self.assertEqual(len(result), len(self.service.url_query(ENTITY, TYPE)))
+
+    def test_query_for_entities(self):
+        entities = [ENTITY, 'pyapi.properties_service.missing_entity']
+        result = self.service.query_for_entities(entities, TYPE, batch_size=1, max_workers=2)
+        self.assertEqual(1, len(result))
+        self.common_checks(result[(ENTITY, ((KEY_NAME, KEY_VALUE),))])
+
+    def test_insert_dedup(self):
+        service = PropertiesService(self.connection, dedup_ttl=60)
+        sent = []
+        post = self.connection.post
+        self.connection.post = lambda path, data, params=None: sent.append(list(data)) or post(path, data, params)
+        try:
+            prop = Property(TYPE, ENTITY, TAGS, KEY, datetime.now())
+            self.assertTrue(service.insert(prop))
+            self.assertEqual(1, len(service.write_cache))
+            # unchanged property is not sent again
+            self.assertTrue(service.insert(Property(TYPE, ENTITY, dict(TAGS), dict(KEY), datetime.now())))
+            self.assertEqual([[prop]], sent)
+            # changed property is sent
+            changed = Property(TYPE, ENTITY, {TAG: 'changed'}, KEY, datetime.now())
+            self.assertTrue(service.insert(changed))
+            self.assertEqual([[prop], [changed]], sent)
+            # restore the inserted tags
+            self.assertTrue(service.insert(Property(TYPE, ENTITY, TAGS, KEY, datetime.now())))
+            self.assertEqual(3, len(sent))
+        finally:
+            del self.connection.post
+
     def common_checks(self, prop):
         self.assertEqual(TYPE, prop.type)
         self.assertEqual(ENTITY, prop.entity)
@@ -7,11 +7,12 @@ from datetime import timedelta
 from atsd_client import models
 from atsd_client.exceptions import DataParseException
 from atsd_client.models import AggregateType, SeriesFilter, EntityFilter, DateFilter, VersioningFilter, Aggregate, \
-    TransformationFilter, Group, Rate, SampleFilter
-from atsd_client.models import Series
+    TransformationFilter, Group, Rate, SampleFilter, ControlFilter
+from atsd_client.models import Series, SeriesIndex, SeriesKey
 from atsd_client.models import SeriesQuery
 from atsd_client.models import TimeUnit, Sample
 
+from atsd_client.services import _deserialize_series
 from service_test_base import ServiceTestBase
 
 ENTITY = 'pyapi.entity'
@@ -53,6 +54,36 @@ class TestSeriesService(ServiceTestBase):
         self.assertEqual({TAG: TAG_VALUE}, series.tags)
         self.assertEqual([sample], series.data)
 
+    def test_series_key_join(self):
+        """
+        Check series are matched by metric, entity and tags regardless of tag order.
+        """
+        first = [Series(ENTITY, METRIC, tags={TAG: TAG_VALUE, 'a': 'b'}), Series(ENTITY, METRIC)]
+        second = [Series(ENTITY, METRIC, tags={'a': 'b', TAG: TAG_VALUE})]
+        self.assertEqual(first[0].series_key(), second[0].series_key())
+        self.assertEqual(SeriesKey.of(METRIC, ENTITY), first[1].series_key())
+        self.assertNotIn('key:', repr(first[0]))
+
+        joined = SeriesIndex.join(first, second)
+        self.assertEqual(2, len(joined))
+        self.assertEqual((first[0].series_key(), first[0], second[0]), joined[0])
+        self.assertEqual((first[1].series_key(), first[1], None), joined[1])
+
+    def test_deserialize_shared_meta(self):
+        """
+        Check entity and metric metadata is decoded once for each name and the response is not modified.
+        """
+        meta = {'entity': {'name': ENTITY, 'tags': {TAG: TAG_VALUE}}, 'metric': {'name': METRIC}}
+        response = [{'entity': ENTITY, 'metric': METRIC, 'tags': {TAG: str(i)}, 'data': [], 'meta': meta}
+                    for i in range(2)]
+        first, second = _deserialize_series(response)
+        self.assertEqual(ENTITY, first.meta['entity'].name)
+        self.assertEqual({TAG: TAG_VALUE}, first.meta['entity'].tags)
+        self.assertEqual(METRIC, first.meta['metric'].name)
+        self.assertIs(first.meta['entity'], second.meta['entity'])
+        self.assertIs(first.meta['metric'], second.meta['metric'])
+        self.assertIsInstance(response[0]['meta']['entity'], dict)
+
     def test_insert_retrieve_series(self):
         val = random.randint(0, VALUE - 1)
 
@@ -130,6 +161,73 @@ class TestSeriesService(ServiceTestBase):
         self.assertIsNotNone(last_sample.version)
         self.assertEqual(last_sample.version['status'], test_status)
 
+    def test_csv_insert(self):
+        val = random.randint(0, VALUE - 1)
+        now = datetime.now()
+        lines = ['time,%s' % METRIC, '%d,%s' % (int(time.time() * 1000), val)]
+
+        self.assertTrue(self.service.csv_insert(ENTITY, iter(lines), tags={TAG: TAG_VALUE}, chunk_size=1))
+        time.sleep(WAIT_TIME)
+
+        sf = SeriesFilter(metric=METRIC, tags={TAG: [TAG_VALUE]})
+        ef = EntityFilter(entity=ENTITY)
+        df = DateFilter(start_date=now - timedelta(hours=1), end_date=datetime.now())
+        series = self.service.query(SeriesQuery(series_filter=sf, entity_filter=ef, date_filter=df))
+        self.assertGreater(len(series), 0)
+        self.assertEqual(val, series[0].get_last_value())
+
+    def test_url_query(self):
+        val = random.randint(0, VALUE - 1)
+        insert_series_sample(self.service, val)
+        time.sleep(WAIT_TIME)
+
+        now = datetime.now()
+        series = self.service.url_query(ENTITY, METRIC, start_date=now - timedelta(hours=1), end_date=now,
+                                        tags={TAG: TAG_VALUE})
+        self.assertGreater(len(series), 0)
+        self.assertEqual(val, series[0].get_last_value())
+
+        # changes of returned series do not affect responses revalidated against the response cache
+        series[0].tags[TAG] = 'changed'
+        series[0].data.clear()
+        cached = self.service.url_query(ENTITY, METRIC, start_date=now - timedelta(hours=1), end_date=now,
+                                        tags={TAG: TAG_VALUE})
+        self.assertEqual({TAG: TAG_VALUE}, cached[0].tags)
+        self.assertEqual(val, cached[0].get_last_value())
+
+    def test_time_format(self):
+        """
+        Check milliseconds are requested only for queries without control filter, time format of the control filter
+        is sent as is and sample dates are decoded in each format.
+        """
+        t = int(time.time() * 1000) - 60000
+        series = Series(ENTITY, METRIC, tags={TAG: TAG_VALUE})
+        series.add_samples(Sample(VALUE, t))
+        self.service.insert(series)
+        time.sleep(WAIT_TIME)
+
+        requests = []
+        post = self.connection.post
+        self.connection.post = lambda path, data, params=None: requests.append(data) or post(path, data, params)
+        try:
+            samples = []
+            for control_filter in [None, ControlFilter(), ControlFilter(time_format='milliseconds')]:
+                query = SeriesQuery(series_filter=SeriesFilter(metric=METRIC, tags={TAG: [TAG_VALUE]}),
+                                    entity_filter=EntityFilter(entity=ENTITY),
+                                    date_filter=DateFilter(start_date=t, end_date=t + 1),
+                                    control_filter=control_filter)
+                result = self.service.query(query)
+                self.assertEqual(1, len(result[0].data))
+                samples.append(result[0].data[0])
+        finally:
+            del self.connection.post
+
+        self.assertEqual(['milliseconds', 'iso', 'milliseconds'], [r[0]['timeFormat'] for r in requests])
+        for sample in samples:
+            self.assertEqual(t, round(sample.t))
+            self.assertEqual(VALUE, sample.v)
+            self.assertEqual(series.data[0].get_date(), sample.get_date())
+
     def test_series_data_field_empty(self):
         series = Series(entity=ENTITY,
                         metric=METRIC)